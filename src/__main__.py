@@ -1,19 +1,174 @@
+import argparse
+import cProfile
 from enum import Enum
+import os
+import pstats
+import sys
 import time
+from typing import Optional
 
 import helpers
-from puzzle_agent import PuzzleAgent, PuzzleAgentType
+from puzzle_agent import PuzzleAgent, PuzzleAgentType, PuzzleNodeStorage
 from puzzle_agent_result import PuzzleAgentFailure, PuzzleAgentSolution
+from puzzle_distance_table import PuzzleDistanceTable
+from puzzle_heuristic import PatternDatabaseHeuristic, PuzzleHeuristicType
 from puzzle_problem import PuzzleProblem
+from puzzle_search_budget import PuzzleSearchBudget
+from puzzle_solution_cache import PuzzleSolutionCache
+import puzzle_stream_solver
+from puzzle_symmetry import PuzzleSymmetry
+
+# The goal state configuration.
+GOAL_STATE = [
+  [1, 2, 3],
+  [8, 0, 4],
+  [7, 6, 5]
+]
+
+# The default number of hotspots printed when profiling.
+DEFAULT_PROFILE_TOP = 20
 
 def main() -> None:
-  # The goal state configuration.
-  GOAL_STATE = [
-    [1, 2, 3],
-    [8, 0, 4],
-    [7, 6, 5]
-  ]
+  arguments = parse_arguments()
+
+  if (arguments.profile is not None):
+    profile(arguments)
+  else:
+    run(arguments)
 
+def run(arguments: argparse.Namespace) -> None:
+  '''
+  Build the pattern databases or the distance table if asked to, or run the batch solver if there
+  is an input, or the interactive menu.
+  '''
+  if (arguments.build_pattern_databases is not None):
+    build_pattern_databases(arguments)
+  elif (arguments.build_distance_table is not None):
+    build_distance_table(arguments)
+  elif (arguments.input is not None):
+    solve_batch(arguments)
+  else:
+    run_menu()
+
+def parse_arguments() -> argparse.Namespace:
+  '''
+  Parse the command line arguments. Without an input, the interactive menu is run.
+  '''
+  parser = argparse.ArgumentParser(prog='puzzle', description='Solve sliding puzzles interactively, or in batch from a JSONL or CSV stream.')
+  parser.add_argument('--input', help='the file of problems to solve, or - for the standard input')
+  parser.add_argument('--output', default='-', help='the file to write the results to, or - for the standard output (default)')
+  parser.add_argument('--format', choices=['jsonl', 'csv'], help='the format of the input and output (default: from the input extension, or jsonl)')
+  parser.add_argument('--agent', choices=[type.name.lower() for type in PuzzleAgentType], default='informed', help='the agent type (default: informed)')
+  parser.add_argument('--heuristic', choices=[type.name.lower() for type in PuzzleHeuristicType], default='manhattan_distance', help='the heuristic of informed agents (default: manhattan_distance)')
+  parser.add_argument('--storage', choices=[storage.name.lower() for storage in PuzzleNodeStorage], default='objects', help='the node storage of breadth-first and A* searches (default: objects)')
+  parser.add_argument('--beam-width', type=helpers.positive_int, default=PuzzleAgent.DEFAULT_BEAM_WIDTH, help=f'the number of states kept per layer by the beam agent (default: {PuzzleAgent.DEFAULT_BEAM_WIDTH})')
+  parser.add_argument('--weight', type=helpers.weight, default=PuzzleAgent.DEFAULT_WEIGHT, help=f'the weight of the heuristic of the weighted agent, and the initial weight of the anytime agent (default: {PuzzleAgent.DEFAULT_WEIGHT})')
+  parser.add_argument('--max-expanded-nodes', type=helpers.positive_int, help='give up on a problem after expanding this many nodes')
+  parser.add_argument('--max-frontier-size', type=helpers.positive_int, help='give up on a problem once its frontier holds this many nodes')
+  parser.add_argument('--time-limit', type=helpers.positive_float, help='give up on a problem after searching for this many seconds')
+  parser.add_argument('--workers', type=helpers.positive_int, default=1, help='the number of worker processes (default: 1)')
+  parser.add_argument('--pattern-database', action='append', dest='pattern_databases', help='a pattern database file to load (repeatable)')
+  parser.add_argument('--pattern-database-directory', help='the directory the pattern databases of each goal are saved to and loaded from, so they are built once')
+  parser.add_argument('--build-pattern-databases', metavar='DIRECTORY', help='build the pattern databases of the goal, save them to the directory and print their paths')
+  parser.add_argument('--goal', help='the goal board of the built pattern databases or distance table, such as "1 2 3/8 0 4/7 6 5" (default: that board)')
+  parser.add_argument('--distance-table', action='append', dest='distance_tables', help='a distance table file to load (repeatable)')
+  parser.add_argument('--distance-table-directory', help='the directory the distance tables of each goal are saved to and loaded from, so they are built once')
+  parser.add_argument('--build-distance-table', metavar='DIRECTORY', help='build the distance table of the goal, save it to the directory and print its path')
+  parser.add_argument('--cache', help='the sqlite file of the solutions found so far, reused across runs')
+  parser.add_argument('--cache-size', type=helpers.non_negative_int, default=PuzzleSolutionCache.DEFAULT_MAX_SIZE, help=f'the number of solutions kept in memory (default: {PuzzleSolutionCache.DEFAULT_MAX_SIZE}, 0 to disable the cache)')
+
+  parser.add_argument('--profile', metavar='FILE', help='run under cProfile, write the pstats to the file and print the top hotspots to the standard error')
+  parser.add_argument('--profile-top', type=helpers.positive_int, default=DEFAULT_PROFILE_TOP, help=f'the number of hotspots printed when profiling (default: {DEFAULT_PROFILE_TOP})')
+
+  return parser.parse_args()
+
+def profile(arguments: argparse.Namespace) -> None:
+  '''
+  Run under cProfile, writing the stats to the profile file, which can be read with `pstats` or
+  viewers such as snakeviz, and printing the functions that take the most time of their own.
+
+  Worker processes are not profiled, so problems are solved in this process.
+  '''
+  if (arguments.workers != 1):
+    print('# Profiling solves in a single process, ignoring --workers', file=sys.stderr)
+    arguments.workers = 1
+
+  profiler = cProfile.Profile()
+
+  try:
+    profiler.runcall(run, arguments)
+  finally:
+    profiler.dump_stats(arguments.profile)
+    stats = pstats.Stats(profiler, stream=sys.stderr)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(arguments.profile_top)
+
+def solve_batch(arguments: argparse.Namespace) -> None:
+  '''
+  Solve the problems of the input stream, writing one result line per problem to the output stream.
+  '''
+  format: Optional[str] = arguments.format
+
+  if (format is None):
+    format = 'csv' if os.path.splitext(arguments.input)[1].lower() == '.csv' else 'jsonl'
+
+  agent = PuzzleAgent(
+    PuzzleAgentType[arguments.agent.upper()],
+    PuzzleHeuristicType[arguments.heuristic.upper()],
+    arguments.pattern_databases,
+    arguments.distance_tables,
+    PuzzleSolutionCache(arguments.cache_size, arguments.cache) if arguments.cache_size > 0 or arguments.cache is not None else None,
+    PuzzleNodeStorage[arguments.storage.upper()],
+    arguments.beam_width,
+    get_budget(arguments),
+    arguments.weight,
+    pattern_database_directory=arguments.pattern_database_directory,
+    distance_table_directory=arguments.distance_table_directory,
+  )
+
+  input = puzzle_stream_solver.open_stream(arguments.input, 'r')
+  output = puzzle_stream_solver.open_stream(arguments.output, 'w')
+
+  try:
+    puzzle_stream_solver.solve_stream(agent, input, output, format, GOAL_STATE, arguments.workers)
+  finally:
+    for stream in (input, output):
+      if (stream.fileno() > 2):
+        stream.close()
+
+def get_budget(arguments: argparse.Namespace) -> Optional[PuzzleSearchBudget]:
+  '''
+  Get the budget of each search, or None when no limit is given, so searches skip its checks.
+  '''
+  if (arguments.max_expanded_nodes is None and arguments.max_frontier_size is None and arguments.time_limit is None):
+    return None
+
+  return PuzzleSearchBudget(arguments.max_expanded_nodes, arguments.max_frontier_size, arguments.time_limit)
+
+def build_pattern_databases(arguments: argparse.Namespace) -> None:
+  '''
+  Build the pattern databases of the default patterns for the goal, skipping those already in the
+  directory, and print their paths, to pass with --pattern-database. The databases of 4x4 boards
+  take tens of minutes to build.
+  '''
+  goal_state = puzzle_stream_solver.parse_board(arguments.goal) if arguments.goal is not None else GOAL_STATE
+
+  for path in PatternDatabaseHeuristic.get_database_paths(goal_state, arguments.build_pattern_databases, build_large_boards=True):
+    print(path)
+
+def build_distance_table(arguments: argparse.Namespace) -> None:
+  '''
+  Build the distance table of the canonical goal of the goal, unless it is already in the directory,
+  and print its path, to pass with --distance-table.
+  '''
+  goal_state = puzzle_stream_solver.parse_board(arguments.goal) if arguments.goal is not None else GOAL_STATE
+  (canonical_goal_state, _) = PuzzleSymmetry.canonicalize_goal(goal_state)
+
+  print(PuzzleDistanceTable.get_path(canonical_goal_state, arguments.build_distance_table))
+
+def run_menu() -> None:
+  '''
+  Run the interactive menu.
+  '''
   # Whether the program is running.
   running: bool = True
 
@@ -0,0 +1,377 @@
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Optional
+
+import helpers
+from puzzle_agent import PuzzleAgent, PuzzleAgentType, PuzzleNodeStorage
+from puzzle_agent_result import PuzzleAgentSolution
+from puzzle_heuristic import PuzzleHeuristicType
+from puzzle_problem import PuzzleProblem, PuzzleState
+from puzzle_search_budget import PuzzleSearchBudget
+from puzzle_stream_solver import format_board, parse_board
+
+# The goal state of the random and depth instance sets, unless given.
+GOAL_STATE = [
+  [1, 2, 3],
+  [8, 0, 4],
+  [7, 6, 5]
+]
+
+# The agents benchmarked unless given, as agent type, heuristic type and node storage names.
+DEFAULT_AGENTS = [
+  'informed:manhattan_distance',
+  'informed:manhattan_distance:arena',
+  'informed:linear_conflict',
+  'iterative_deepening:manhattan_distance',
+  'bidirectional',
+  'uninformed',
+]
+
+# The relative increase of a latency percentile over the baseline flagged as a regression, unless given.
+DEFAULT_THRESHOLD = 0.1
+
+# The increase of a latency percentile over the baseline, in seconds, below which it is never flagged, unless given.
+DEFAULT_MIN_DIFFERENCE = 0.001
+
+# The number of times each instance is solved, keeping the fastest time, unless given.
+DEFAULT_REPEATS = 3
+
+def main() -> None:
+  parser = argparse.ArgumentParser(prog='benchmark', description='Benchmark the puzzle agents on a fixed set of instances.')
+  parser.add_argument('--set', choices=['random', 'depth', 'walk', 'file'], default='random', help='the instance set (default: random)')
+  parser.add_argument('--count', type=helpers.positive_int, default=50, help='the number of instances of random, depth and walk sets (default: 50)')
+  parser.add_argument('--depth', type=helpers.non_negative_int, default=20, help='the solution length of depth instances, and the number of moves of walk instances (default: 20)')
+  parser.add_argument('--seed', type=int, default=0, help='the seed of random, depth and walk sets (default: 0)')
+  parser.add_argument('--instances', help='the file of instances of the file set, one board per line (see `load_instances`)')
+  parser.add_argument('--goal', help='the goal board, such as "1 2 3/8 0 4/7 6 5" (default: that board, or tiles in order from the blank for files)')
+  parser.add_argument('--agent', action='append', dest='agents', help=f'an agent to benchmark, as agent, agent:heuristic or agent:heuristic:storage (repeatable, default: {", ".join(DEFAULT_AGENTS)})')
+  parser.add_argument('--time-limit', type=helpers.positive_float, help='give up on an instance after searching for this many seconds')
+  parser.add_argument('--repeats', type=helpers.positive_int, default=DEFAULT_REPEATS, help=f'solve each instance this many times and keep the fastest time (default: {DEFAULT_REPEATS})')
+  parser.add_argument('--memory', action='store_true', help='measure the peak memory of each solve, in a separate untimed run')
+  parser.add_argument('--output', help='the JSON file to write the results to')
+  parser.add_argument('--baseline', help='a JSON file of earlier results to compare with')
+  parser.add_argument('--threshold', type=helpers.non_negative_float, default=DEFAULT_THRESHOLD, help=f'the latency increase over the baseline flagged as a regression (default: {DEFAULT_THRESHOLD})')
+  parser.add_argument('--min-difference', type=helpers.non_negative_float, default=DEFAULT_MIN_DIFFERENCE, help=f'the latency increase over the baseline, in seconds, below which it is not flagged (default: {DEFAULT_MIN_DIFFERENCE})')
+  arguments = parser.parse_args()
+
+  (instance_set, problems) = create_instances(arguments)
+  budget = PuzzleSearchBudget(time_limit=arguments.time_limit) if arguments.time_limit is not None else None
+  results = [run(name, create_agent(name, budget), problems, arguments.memory, arguments.repeats) for name in (arguments.agents or DEFAULT_AGENTS)]
+
+  report = {
+    'instances': instance_set,
+    'environment': {
+      'python': platform.python_version(),
+      'implementation': platform.python_implementation(),
+      'machine': platform.machine(),
+      'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    },
+    'results': results,
+  }
+
+  show_results(report)
+
+  if (arguments.output is not None):
+    with open(arguments.output, 'w') as file:
+      json.dump(report, file, indent=2)
+
+  if (arguments.baseline is not None):
+    with open(arguments.baseline) as file:
+      baseline = json.load(file)
+
+    regressions = compare(report, baseline, arguments.threshold, arguments.min_difference)
+
+    if (len(regressions) > 0):
+      sys.exit(1)
+
+def create_instances(arguments: argparse.Namespace) -> tuple[dict[str, Any], list[PuzzleProblem]]:
+  '''
+  Create the problems of the instance set given in the arguments, along with the description of the set.
+  '''
+  goal_state = parse_board(arguments.goal) if arguments.goal is not None else None
+
+  if (arguments.set == 'file'):
+    if (arguments.instances is None):
+      raise SystemExit('The file set needs --instances')
+
+    problems = load_instances(arguments.instances, goal_state)
+    instance_set = {'set': 'file', 'path': arguments.instances}
+  elif (arguments.set == 'depth'):
+    goal_state = goal_state or GOAL_STATE
+    problems = generate_depth_instances(goal_state, arguments.depth, arguments.count, arguments.seed)
+    instance_set = {'set': 'depth', 'depth': arguments.depth, 'count': arguments.count, 'seed': arguments.seed}
+  elif (arguments.set == 'walk'):
+    goal_state = goal_state or GOAL_STATE
+    problems = generate_walk_instances(goal_state, arguments.depth, arguments.count, arguments.seed)
+    instance_set = {'set': 'walk', 'moves': arguments.depth, 'count': arguments.count, 'seed': arguments.seed}
+  else:
+    goal_state = goal_state or GOAL_STATE
+    problems = generate_random_instances(goal_state, arguments.count, arguments.seed)
+    instance_set = {'set': 'random', 'count': arguments.count, 'seed': arguments.seed}
+
+  instance_set['goal'] = format_board(problems[0].goal_state) if len(problems) > 0 else None
+  instance_set['size'] = len(problems)
+
+  return (instance_set, problems)
+
+def generate_random_instances(goal_state: list[list[int]], count: int, seed: int) -> list[PuzzleProblem]:
+  '''
+  Generate random solvable problems, the same ones for the same seed.
+  '''
+  random.seed(seed)
+
+  return [PuzzleProblem(PuzzleProblem.generate_random_solvable_state(goal_state), goal_state) for _ in range(count)]
+
+def generate_depth_instances(goal_state: list[list[int]], depth: int, count: int, seed: int) -> list[PuzzleProblem]:
+  '''
+  Generate problems whose shortest solution has the given length: all of them, or a sample of the
+  given count, the same one for the same seed.
+
+  The states at that distance from the goal are found with a breadth-first search from the goal,
+  so this is only practical on small boards.
+  '''
+  rows = len(goal_state)
+  columns = len(goal_state[0])
+  goal_problem = PuzzleProblem(goal_state, goal_state)
+  state = goal_problem.encoded_goal_state
+
+  # The states of the current layer, and the states of all the layers so far.
+  layer: list[tuple[PuzzleState, int]] = [(state, PuzzleProblem.get_blank_index(state, goal_problem.cells))]
+  seen: set[PuzzleState] = {state}
+
+  for _ in range(depth):
+    next_layer: list[tuple[PuzzleState, int]] = []
+
+    for (state, blank) in layer:
+      for (_, target) in goal_problem.moves(blank):
+        (_, child_state) = goal_problem.result(state, blank, target)
+
+        if (child_state not in seen):
+          seen.add(child_state)
+          next_layer.append((child_state, target))
+
+    layer = next_layer
+
+  states = sorted(state for (state, _) in layer)
+
+  if (count < len(states)):
+    states = sorted(random.Random(seed).sample(states, count))
+
+  return [PuzzleProblem(PuzzleProblem.decode_state(state, rows, columns), goal_state) for state in states]
+
+def generate_walk_instances(goal_state: list[list[int]], moves: int, count: int, seed: int) -> list[PuzzleProblem]:
+  '''
+  Generate problems by making random moves from the goal, the same ones for the same seed. Unlike
+  depth instances, these scale to any board, but their shortest solution may be shorter.
+  '''
+  random.seed(seed)
+
+  return [PuzzleProblem(PuzzleProblem.generate_random_walk_state(goal_state, moves), goal_state) for _ in range(count)]
+
+def load_instances(path: str, goal_state: Optional[list[list[int]]] = None) -> list[PuzzleProblem]:
+  '''
+  Load the problems of a file of square boards, one per line, as the tiles in row-major order with
+  0 for the blank, optionally preceded by an instance number. Blank lines and lines starting with #
+  are skipped.
+
+  The goal state is the tiles in order from the blank, as in the Korf 100 instances, unless given.
+  '''
+  problems: list[PuzzleProblem] = []
+
+  with open(path) as file:
+    for line in file:
+      if (line.strip() == '' or line.lstrip().startswith('#')):
+        continue
+
+      tiles = [int(tile) for tile in line.split()]
+      size = math.isqrt(len(tiles))
+
+      # Drop the instance number.
+      if (size * size != len(tiles)):
+        tiles = tiles[1:]
+        size = math.isqrt(len(tiles))
+
+      initial_state = [tiles[i:i+size] for i in range(0, len(tiles), size)]
+      problem_goal_state = goal_state or [list(range(row * size, (row + 1) * size)) for row in range(size)]
+      problems.append(PuzzleProblem(initial_state, problem_goal_state))
+
+  return problems
+
+def create_agent(name: str, budget: Optional[PuzzleSearchBudget]) -> PuzzleAgent:
+  '''
+  Create the agent of a name given as agent, agent:heuristic or agent:heuristic:storage.
+  '''
+  (type_name, _, heuristic_name) = name.partition(':')
+  (heuristic_name, _, storage_name) = heuristic_name.partition(':')
+
+  return PuzzleAgent(
+    PuzzleAgentType[type_name.upper()],
+    PuzzleHeuristicType[(heuristic_name or 'manhattan_distance').upper()],
+    storage=PuzzleNodeStorage[(storage_name or 'objects').upper()],
+    budget=budget,
+  )
+
+def run(name: str, agent: PuzzleAgent, problems: list[PuzzleProblem], measure_memory: bool, repeats: int = 1) -> dict[str, Any]:
+  '''
+  Solve every problem with the agent and get the stats of the run.
+
+  Each problem is solved the given number of times, and its latency is the fastest of them, which
+  leaves out most of the noise of the machine before the percentiles are taken.
+  '''
+  print(f'# Running {name} on {len(problems)} instances', file=sys.stderr)
+
+  # Build the heuristic and tables of the agent before timing.
+  if (len(problems) > 0):
+    agent.solve(problems[0])
+
+  latencies: list[float] = []
+  expanded_nodes = 0
+  path_costs = 0
+  solved = 0
+  solved_time = 0.0
+
+  for problem in problems:
+    result = agent.solve(problem)
+    latency = result.time_taken
+
+    for _ in range(repeats - 1):
+      latency = min(latency, agent.solve(problem).time_taken)
+
+    latencies.append(latency)
+
+    if (isinstance(result, PuzzleAgentSolution)):
+      solved += 1
+      solved_time += latency
+      expanded_nodes += result.expanded_nodes
+      path_costs += result.node.path_cost
+
+  peak_memory: Optional[int] = None
+
+  # Tracing slows the searches down, so memory is measured apart from latency.
+  if (measure_memory):
+    peak_memory = 0
+
+    for problem in problems:
+      tracemalloc.start()
+      agent.solve(problem)
+      peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+      tracemalloc.stop()
+
+  total_time = sum(latencies)
+
+  return {
+    'name': name,
+    'agent': agent.type.name.lower(),
+    'heuristic': agent.heuristic_type.name.lower() if agent.type in PuzzleAgent.HEURISTIC_TYPES else None,
+    'storage': agent.storage.name.lower(),
+    'instances': len(problems),
+    'repeats': repeats,
+    'solved': solved,
+    'failed': len(problems) - solved,
+    'latency': {
+      'mean': total_time / len(latencies) if len(latencies) > 0 else None,
+      'p50': percentile(latencies, 50),
+      'p95': percentile(latencies, 95),
+      'p99': percentile(latencies, 99),
+      'max': max(latencies, default=None),
+    },
+    'total_time': total_time,
+    'expanded_nodes': expanded_nodes,
+    'nodes_per_second': expanded_nodes / solved_time if solved_time > 0 else None,
+    'path_cost': path_costs,
+    'peak_memory': peak_memory,
+  }
+
+def percentile(values: list[float], rank: float) -> Optional[float]:
+  '''
+  Get the percentile of the values with the nearest-rank method, or None without values.
+  '''
+  if (len(values) == 0):
+    return None
+
+  ordered = sorted(values)
+
+  return ordered[max(math.ceil(rank / 100 * len(ordered)), 1) - 1]
+
+def show_results(report: dict[str, Any]) -> None:
+  '''
+  Show the results of a benchmark as a table.
+  '''
+  print(f'# Instances: {json.dumps(report["instances"])}\n')
+  print(f'{"agent":<40} {"solved":>8} {"p50 ms":>10} {"p95 ms":>10} {"p99 ms":>10} {"nodes/s":>12} {"peak MiB":>10}')
+
+  for result in report['results']:
+    latency = result['latency']
+    peak_memory = f'{result["peak_memory"] / 2**20:.1f}' if result['peak_memory'] is not None else '-'
+    nodes_per_second = f'{result["nodes_per_second"]:.0f}' if result['nodes_per_second'] is not None else '-'
+
+    print(
+      f'{result["name"]:<40} {result["solved"]:>4}/{result["instances"]:<3} '
+      f'{format_milliseconds(latency["p50"]):>10} {format_milliseconds(latency["p95"]):>10} {format_milliseconds(latency["p99"]):>10} '
+      f'{nodes_per_second:>12} {peak_memory:>10}'
+    )
+
+def format_milliseconds(seconds: Optional[float]) -> str:
+  '''
+  Format a duration in seconds as milliseconds.
+  '''
+  return f'{seconds * 1000:.2f}' if seconds is not None else '-'
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], threshold: float, min_difference: float = DEFAULT_MIN_DIFFERENCE) -> list[str]:
+  '''
+  Compare the results of a benchmark with a baseline, showing and returning the regressions: latency
+  percentiles higher than the threshold allows, by at least the minimum difference in seconds, fewer
+  solved instances, or more expanded nodes.
+  '''
+  if (report['instances'] != baseline['instances']):
+    print('\n# The baseline was run on other instances, skipping the comparison')
+
+    return []
+
+  baseline_results = {result['name']: result for result in baseline['results']}
+  regressions: list[str] = []
+
+  print('\n# Comparison with the baseline\n')
+
+  for result in report['results']:
+    baseline_result = baseline_results.get(result['name'])
+
+    if (baseline_result is None):
+      print(f'{result["name"]}: not in the baseline')
+      continue
+
+    changes: list[str] = []
+
+    for key in ('p50', 'p95', 'p99'):
+      (value, baseline_value) = (result['latency'][key], baseline_result['latency'][key])
+
+      if (value is None or baseline_value is None or baseline_value == 0):
+        continue
+
+      change = value / baseline_value - 1
+      changes.append(f'{key} {change:+.1%}')
+
+      if (change > threshold and value - baseline_value >= min_difference):
+        regressions.append(f'{result["name"]}: {key} latency {change:+.1%}')
+
+    if (result['solved'] < baseline_result['solved']):
+      regressions.append(f'{result["name"]}: {baseline_result["solved"] - result["solved"]} fewer solved')
+
+    if (result['expanded_nodes'] > baseline_result['expanded_nodes'] and result['solved'] == baseline_result['solved']):
+      regressions.append(f'{result["name"]}: {result["expanded_nodes"] - baseline_result["expanded_nodes"]} more expanded nodes')
+
+    print(f'{result["name"]}: {", ".join(changes)}')
+
+  for regression in regressions:
+    print(f'> Regression: {regression}')
+
+  return regressions
+
+if __name__ == '__main__':
+  main()
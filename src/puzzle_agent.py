@@ -1,14 +1,36 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import copy
 from enum import Enum
-from typing import Union
+import heapq
+import math
+import os
+import tempfile
+import time
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
 
 from puzzle_agent_result import (
   PuzzleAgentFailure,
   PuzzleAgentFailureType,
   PuzzleAgentSolution,
 )
+from puzzle_batch_expander import PuzzleBatchExpander
+from puzzle_distance_table import PuzzleDistanceTable
+from puzzle_heuristic import PatternDatabaseHeuristic, PuzzleHeuristic, PuzzleHeuristicType
 from puzzle_node import PuzzleNode
+from puzzle_node_arena import PuzzleNodeArena
 from puzzle_node_priority_queue import PuzzleNodePriorityQueue
-from puzzle_problem import PuzzleProblem
+from puzzle_problem import PuzzleAction, PuzzleProblem, PuzzleState
+from puzzle_search_budget import PuzzleSearchBudget
+from puzzle_search_stats import PuzzleSearchInstrumentation, PuzzleSearchStats
+from puzzle_search_tree import PuzzleSearchTree
+from puzzle_solution_cache import PuzzleSolutionCache
+from puzzle_symmetry import PuzzleSymmetry
 
 class PuzzleAgentType(Enum):
   '''
@@ -16,127 +38,1475 @@ class PuzzleAgentType(Enum):
   '''
   INFORMED = 0
   UNINFORMED = 1
+  ITERATIVE_DEEPENING = 2
+  BIDIRECTIONAL = 3
+  DISTANCE_TABLE = 4
+  BEAM = 5
+  WEIGHTED = 6
+  GREEDY = 7
+  ANYTIME = 8
+
+class PuzzleNodeStorage(Enum):
+  '''
+  The storage of the nodes of breadth-first and A* searches.
+  '''
+  OBJECTS = 0
+  ARENA = 1
 
 class PuzzleAgent:
   '''
   The agent for the puzzle problem.
   '''
 
+  # The default number of states kept per layer by beam search.
+  DEFAULT_BEAM_WIDTH = 1000
+
+  # The default weight of the cost to the goal in weighted and anytime searches.
+  DEFAULT_WEIGHT = 2.0
+
+  # The decrease of the weight between two searches of anytime search.
+  ANYTIME_WEIGHT_STEP = 0.5
+
+  # The agent types that search with a heuristic.
+  HEURISTIC_TYPES = [
+    PuzzleAgentType.INFORMED,
+    PuzzleAgentType.ITERATIVE_DEEPENING,
+    PuzzleAgentType.BEAM,
+    PuzzleAgentType.WEIGHTED,
+    PuzzleAgentType.GREEDY,
+    PuzzleAgentType.ANYTIME,
+  ]
+
   # The type of agent.
   type: PuzzleAgentType
 
-  def __init__(self, type: PuzzleAgentType):
+  # The type of heuristic used by informed search.
+  heuristic_type: PuzzleHeuristicType
+
+  # The pattern database files used by the pattern database heuristic. Built on demand when empty.
+  pattern_database_paths: list[str]
+
+  # The directory the pattern databases of each goal are saved to and loaded from when no files are
+  # given, so they are built once across processes and runs. None to keep them in memory.
+  pattern_database_directory: Optional[str]
+
+  # The distance table files used by the distance table agent. Built on demand when missing for a goal.
+  distance_table_paths: list[str]
+
+  # The directory the distance tables of each canonical goal are saved to and loaded from when no
+  # file is given for a goal, so they are built once across processes and runs. None to keep them in memory.
+  distance_table_directory: Optional[str]
+
+  # The solutions already found, looked up before searching. None to always search.
+  cache: Optional[PuzzleSolutionCache]
+
+  # The storage of the nodes of breadth-first and A* searches.
+  storage: PuzzleNodeStorage
+
+  # The number of states kept per layer by beam search.
+  beam_width: int
+
+  # The limits of each search. None for no limits.
+  budget: Optional[PuzzleSearchBudget]
+
+  # The weight of the cost to the goal in weighted search, and the initial weight of anytime search.
+  weight: float
+
+  # The stats and callbacks collected from each search. None for no instrumentation.
+  instrumentation: Optional[PuzzleSearchInstrumentation]
+
+  def __init__(
+    self,
+    type: PuzzleAgentType,
+    heuristic_type: PuzzleHeuristicType = PuzzleHeuristicType.MANHATTAN_DISTANCE,
+    pattern_database_paths: Optional[list[str]] = None,
+    distance_table_paths: Optional[list[str]] = None,
+    cache: Optional[PuzzleSolutionCache] = None,
+    storage: PuzzleNodeStorage = PuzzleNodeStorage.OBJECTS,
+    beam_width: int = DEFAULT_BEAM_WIDTH,
+    budget: Optional[PuzzleSearchBudget] = None,
+    weight: float = DEFAULT_WEIGHT,
+    instrumentation: Optional[PuzzleSearchInstrumentation] = None,
+    pattern_database_directory: Optional[str] = None,
+    distance_table_directory: Optional[str] = None,
+  ):
     self.type = type
+    self.heuristic_type = heuristic_type
+    self.pattern_database_paths = pattern_database_paths or []
+    self.distance_table_paths = distance_table_paths or []
+    self.cache = cache
+    self.storage = storage
+    self.beam_width = beam_width
+    self.budget = budget
+    self.weight = weight
+    self.instrumentation = instrumentation
+    self.pattern_database_directory = pattern_database_directory
+    self.distance_table_directory = distance_table_directory
+
+    if (not math.isfinite(weight) or weight < 1):
+      raise ValueError(f'The weight must be a finite number of at least 1: {weight}')
 
   def solve(self, problem: PuzzleProblem) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
     '''
-    Solve the puzzle problem using the given agent type.
+    Solve the puzzle problem using the given agent type, recording the time taken on the result.
+
+    When the agent has a cache, a problem solved before is answered from it without searching,
+    and new solutions are stored in it. Anytime agents keep the last solution of `solve_anytime`.
+    '''
+    result = self.lookup(problem)
+
+    if (result is not None):
+      self.notify(result)
+
+      return result
+
+    # Anytime searches report each solution as soon as they find it.
+    if (self.type == PuzzleAgentType.ANYTIME):
+      result = PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+
+      for result in self.solve_anytime(problem):
+        pass
+
+      self.store(problem, result)
+
+      return result
+
+    start_time = time.perf_counter()
+    result = self.__solve(problem)
+    result.time_taken = time.perf_counter() - start_time
+    self.store(problem, result)
+    self.notify(result)
+
+    return result
+
+  def lookup(self, problem: PuzzleProblem) -> Optional[PuzzleAgentSolution]:
+    '''
+    Get the solution of the problem from the cache, if any.
+    '''
+    if (self.cache is None):
+      return None
+
+    start_time = time.perf_counter()
+    actions = self.cache.get(problem, self.get_cache_algorithm())
+
+    if (actions is None):
+      return None
+
+    solution = PuzzleAgentSolution(problem, PuzzleNode.from_actions(problem, actions), expanded_nodes=0)
+    solution.time_taken = time.perf_counter() - start_time
+
+    return solution
+
+  def store(self, problem: PuzzleProblem, result: Union[PuzzleAgentSolution, PuzzleAgentFailure]) -> None:
+    '''
+    Store the solution of the problem in the cache, if any.
+    '''
+    if (self.cache is not None and isinstance(result, PuzzleAgentSolution)):
+      self.cache.put(problem, self.get_cache_algorithm(), result.get_actions())
+
+  def get_cache_algorithm(self) -> str:
+    '''
+    Get the algorithm of the solutions of the agent in the cache.
+
+    Optimal agents all find solutions of the same cost, so their type is enough. The solutions of
+    the others depend on their settings, which are part of the algorithm: the heuristic and weight
+    of weighted, greedy and anytime searches, the beam width of beam search, and the budget of
+    anytime search, which keeps the best solution found within it.
+    '''
+    if (self.type == PuzzleAgentType.WEIGHTED):
+      return f'{self.type.name}:{self.heuristic_type.name}:{self.weight}'
+
+    if (self.type == PuzzleAgentType.GREEDY):
+      return f'{self.type.name}:{self.heuristic_type.name}'
+
+    if (self.type == PuzzleAgentType.BEAM):
+      return f'{self.type.name}:{self.heuristic_type.name}:{self.beam_width}'
+
+    if (self.type == PuzzleAgentType.ANYTIME):
+      budget = self.budget or PuzzleSearchBudget()
+
+      return f'{self.type.name}:{self.heuristic_type.name}:{self.weight}:{budget.max_expanded_nodes}:{budget.max_frontier_size}:{budget.time_limit}'
+
+    return self.type.name
+
+  def notify(self, result: Union[PuzzleAgentSolution, PuzzleAgentFailure]) -> None:
+    '''
+    Call the solution callback of the instrumentation with the result, if any and if it is a solution.
+    '''
+    if (self.instrumentation is not None and self.instrumentation.on_solution is not None and isinstance(result, PuzzleAgentSolution)):
+      self.instrumentation.on_solution(result)
+
+  def solve_anytime(self, problem: PuzzleProblem) -> Iterator[Union[PuzzleAgentSolution, PuzzleAgentFailure]]:
+    '''
+    Solve the puzzle problem with anytime search, yielding each solution shorter than the previous
+    one as soon as it is found, with the time taken so far. The last solution is the best found
+    before the time limit of the budget of the agent, if any. See `anytime_repairing_a_star_search`.
+
+    Yields the failure of the search instead if no solution is found. When the agent has an
+    instrumentation, each result carries the stats of the search so far, and each solution is passed
+    to the solution callback as it is yielded.
+    '''
+    stats = PuzzleSearchStats() if self.instrumentation is not None else None
+    start_time = time.perf_counter()
+
+    if not problem.is_solvable():
+      results: Iterable[Union[PuzzleAgentSolution, PuzzleAgentFailure]] = [PuzzleAgentFailure(PuzzleAgentFailureType.UNSOLVABLE)]
+    else:
+      results = self.anytime_repairing_a_star_search(problem, stats)
+
+    for result in results:
+      result.time_taken = time.perf_counter() - start_time
+
+      if (stats is not None):
+        result.stats = copy.copy(stats)
+        result.stats.expansion_time = result.time_taken - stats.heuristic_time - stats.queue_time
+
+      self.notify(result)
+
+      yield result
+
+  def __solve(self, problem: PuzzleProblem) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Solve the puzzle problem using the given agent type, collecting the stats of the search on the
+    result when the agent has an instrumentation.
+    '''
+    if (self.instrumentation is None):
+      return self.__search(problem, None)
+
+    stats = PuzzleSearchStats()
+    start_time = time.perf_counter()
+    result = self.__search(problem, stats)
+    stats.expansion_time = time.perf_counter() - start_time - stats.heuristic_time - stats.queue_time
+    result.stats = stats
+
+    return result
+
+  def __search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats]) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Search for the solution of the puzzle problem using the given agent type.
     '''
     # Check if the initial state can reach the goal state.
-    if not PuzzleProblem.can_reach_goal(problem.initial_state, problem.goal_state):
+    if not problem.is_solvable():
       return PuzzleAgentFailure(PuzzleAgentFailureType.UNSOLVABLE)
 
     # Apply an informed search algorithm.
     if (self.type == PuzzleAgentType.INFORMED):
-      return self.a_star_search(problem)
+      if (self.storage == PuzzleNodeStorage.ARENA):
+        return self.a_star_search_in_arena(problem, stats)
+
+      return self.a_star_search(problem, stats)
+
+    # Apply an informed search algorithm with bounded memory.
+    if (self.type == PuzzleAgentType.ITERATIVE_DEEPENING):
+      return self.iterative_deepening_a_star_search(problem, stats)
+
+    # Look the solution up in the distance table of the goal.
+    if (self.type == PuzzleAgentType.DISTANCE_TABLE):
+      return self.distance_table_lookup(problem)
+
+    # Apply an informed search algorithm that trades solution cost for speed.
+    if (self.type == PuzzleAgentType.WEIGHTED):
+      return self.weighted_a_star_search(problem, stats)
+
+    if (self.type == PuzzleAgentType.GREEDY):
+      return self.greedy_best_first_search(problem, stats)
+
+    # Apply an informed search algorithm that keeps the best states of each layer.
+    if (self.type == PuzzleAgentType.BEAM):
+      return self.beam_search(problem, stats)
+
+    # Apply an uninformed search algorithm from both ends.
+    if (self.type == PuzzleAgentType.BIDIRECTIONAL):
+      return self.bidirectional_search(problem, stats)
 
     # Apply an uninformed search algorithm.
-    return self.breadth_first_search(problem)
+    if (self.storage == PuzzleNodeStorage.ARENA):
+      return self.breadth_first_search_in_arena(problem, stats)
+
+    return self.breadth_first_search(problem, stats)
+
+  def solve_many(
+    self,
+    problems: Iterable[PuzzleProblem],
+    workers: Optional[int] = None,
+    ordered: bool = True,
+    return_exceptions: bool = False,
+  ) -> Iterator[tuple[int, Union[PuzzleAgentSolution, PuzzleAgentFailure, Exception]]]:
+    '''
+    Solve many puzzle problems in parallel, yielding the index of each problem along with its result.
+
+    The problems are spread across a pool of worker processes, one per CPU by default. Each worker
+    receives the agent once, so the heuristics and tables it builds or loads are reused by every
+    problem it solves. Results are yielded in input order, or as they complete when not ordered.
+    At most a few problems per worker are read ahead, so the problems can be an unbounded stream.
+    The cache of the agent, if any, is used by this process only: cached problems are never sent
+    to the workers, and the solutions found by the workers are stored in it. Likewise, workers only
+    collect the stats of their searches, and the callbacks of the instrumentation, if any, are only
+    called with solutions in this process.
+
+    Pattern databases and distance tables built on demand are built in this process, once per goal,
+    and saved to the directories of the agent, or a directory of the run, from which the workers load them.
+
+    An error solving a problem, in this process or in a worker, ends the iteration, unless
+    `return_exceptions` is set, in which case the error is yielded as the result of the problem.
+    '''
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+
+    # Solve in this process when there is a single worker.
+    if (workers == 1):
+      for index, problem in enumerate(problems):
+        try:
+          result: Union[PuzzleAgentSolution, PuzzleAgentFailure, Exception] = self.solve(problem)
+        except Exception as error:
+          if (not return_exceptions):
+            raise
+
+          result = error
+
+        yield (index, result)
+
+      return
+
+    with tempfile.TemporaryDirectory(prefix='puzzle-') as directory:
+      yield from self.__solve_in_pool(problems, workers, ordered, return_exceptions, self.get_worker_agent(directory))
+
+  def __solve_in_pool(
+    self,
+    problems: Iterable[PuzzleProblem],
+    workers: int,
+    ordered: bool,
+    return_exceptions: bool,
+    worker_agent: 'PuzzleAgent',
+  ) -> Iterator[tuple[int, Union[PuzzleAgentSolution, PuzzleAgentFailure, Exception]]]:
+    '''
+    Solve many puzzle problems in a pool of worker processes. See `solve_many`.
+    '''
+    # The maximum number of problems submitted and not yielded yet.
+    max_pending = workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker, initargs=(worker_agent,)) as executor:
+      # The index and problem of each submitted problem, by future.
+      pending: dict[Future, tuple[int, PuzzleProblem]] = {}
+
+      # The results completed ahead of their turn, by index, when ordered.
+      completed: dict[int, Union[PuzzleAgentSolution, PuzzleAgentFailure, Exception]] = {}
+
+      # The goals whose files were built, by rows, columns and encoded goal state.
+      built_goals: set[tuple[int, int, PuzzleState]] = set()
+
+      for index, problem in enumerate(problems):
+        solution = self.lookup(problem)
+
+        if (solution is not None):
+          self.notify(solution)
+          completed[index] = solution
+          continue
+
+        try:
+          goal = (problem.rows, problem.columns, problem.encoded_goal_state)
+
+          if (goal not in built_goals and worker_agent.saves_files(problem)):
+            worker_agent.build_files(problem)
+            built_goals.add(goal)
+
+          pending[executor.submit(_solve_in_worker, problem)] = (index, problem)
+        except Exception as error:
+          if (not return_exceptions):
+            raise
+
+          completed[index] = error
+
+        while len(pending) + len(completed) >= max_pending:
+          for (result_index, result) in self.__collect(pending, completed, ordered, return_exceptions):
+            yield (result_index, result)
+
+      while len(pending) + len(completed) > 0:
+        for (result_index, result) in self.__collect(pending, completed, ordered, return_exceptions):
+          yield (result_index, result)
+
+  def get_worker_agent(self, directory: Optional[str] = None) -> 'PuzzleAgent':
+    '''
+    Get a copy of the agent for worker processes: without the cache, which is used by this process
+    only, and without the callbacks of the instrumentation, which are called in this process only.
 
-  def breadth_first_search(self, problem: PuzzleProblem) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    Unless the agent has them, the copy saves its pattern databases and distance tables to the given
+    directory, if any, where this process builds them ahead with `build_files`.
+    '''
+    worker_agent = copy.copy(self)
+    worker_agent.cache = None
+
+    if (worker_agent.pattern_database_directory is None):
+      worker_agent.pattern_database_directory = directory
+
+    if (worker_agent.distance_table_directory is None):
+      worker_agent.distance_table_directory = directory
+
+    if (self.instrumentation is not None):
+      worker_agent.instrumentation = PuzzleSearchInstrumentation()
+
+    return worker_agent
+
+  def __collect(
+    self,
+    pending: dict[Future, tuple[int, PuzzleProblem]],
+    completed: dict[int, Union[PuzzleAgentSolution, PuzzleAgentFailure, Exception]],
+    ordered: bool,
+    return_exceptions: bool,
+  ) -> Iterator[tuple[int, Union[PuzzleAgentSolution, PuzzleAgentFailure, Exception]]]:
+    '''
+    Wait for pending results and yield those whose turn has come.
+    '''
+    if (len(pending) > 0):
+      (done, _) = wait(pending, return_when=FIRST_COMPLETED)
+
+      for future in done:
+        (index, problem) = pending.pop(future)
+        error = future.exception()
+
+        if (error is not None):
+          if (not return_exceptions):
+            raise error
+
+          completed[index] = error
+          continue
+
+        result = future.result()
+        completed[index] = result
+        self.store(problem, result)
+        self.notify(result)
+
+    if (not ordered):
+      for index in list(completed):
+        yield (index, completed.pop(index))
+
+      return
+
+    # The lowest index not yielded yet is either pending or completed.
+    next_index = min([index for (index, _) in pending.values()] + list(completed))
+
+    while next_index in completed:
+      yield (next_index, completed.pop(next_index))
+      next_index += 1
+
+  def get_first_check(self) -> int:
+    '''
+    Get the number of expanded nodes at which a search checks its budget first. See `PuzzleSearchBudget`.
+    '''
+    return self.budget.get_next_check(0) if self.budget is not None else PuzzleSearchBudget.NO_CHECK
+
+  def get_heuristic(self, problem: PuzzleProblem) -> PuzzleHeuristic:
+    '''
+    Get the heuristic of the agent for the puzzle problem.
+    '''
+    if (self.__saves_pattern_databases()):
+      return PuzzleHeuristic.create(self.heuristic_type, problem.goal_state, self.get_pattern_database_paths(problem))
+
+    return PuzzleHeuristic.create(self.heuristic_type, problem.goal_state, self.pattern_database_paths)
+
+  def saves_files(self, problem: PuzzleProblem) -> bool:
+    '''
+    Whether the agent saves pattern databases or a distance table for the problem to its directories.
+    '''
+    return self.__saves_pattern_databases() or self.__saves_distance_tables(problem)
+
+  def build_files(self, problem: PuzzleProblem) -> None:
+    '''
+    Build and save the missing pattern databases and distance table of the goal of the problem, if
+    the agent saves them, so the processes loading them do not build them.
+    '''
+    self.get_pattern_database_paths(problem)
+    self.get_distance_table_paths(problem)
+
+  def get_pattern_database_paths(self, problem: PuzzleProblem) -> list[str]:
+    '''
+    Get the pattern database files of the goal of the problem in the pattern database directory of
+    the agent, building and saving them if missing. Empty if the agent does not save its databases.
+    '''
+    if (not self.__saves_pattern_databases()):
+      return []
+
+    return PatternDatabaseHeuristic.get_database_paths(problem.goal_state, self.pattern_database_directory)
+
+  def __saves_pattern_databases(self) -> bool:
+    '''
+    Whether the agent searches with pattern databases that it saves to its directory: when it has a
+    directory and no database files are given.
+    '''
+    return (
+      self.type in PuzzleAgent.HEURISTIC_TYPES and
+      self.heuristic_type == PuzzleHeuristicType.PATTERN_DATABASE and
+      len(self.pattern_database_paths) == 0 and
+      self.pattern_database_directory is not None
+    )
+
+  def get_distance_table_paths(self, problem: PuzzleProblem) -> list[str]:
+    '''
+    Get the distance table files of the agent, along with the file of the table of the canonical
+    goal of the problem in the distance table directory of the agent, building and saving it if
+    missing. Only the files of the agent when it does not save its tables, or one of them was built
+    for the goal itself.
+    '''
+    if (not self.__saves_distance_tables(problem)):
+      return self.distance_table_paths
+
+    if (PuzzleDistanceTable.find(problem.goal_state, self.distance_table_paths) is not None):
+      return self.distance_table_paths
+
+    (canonical_goal_state, _) = PuzzleSymmetry.canonicalize_goal(problem.goal_state)
+
+    return self.distance_table_paths + [PuzzleDistanceTable.get_path(canonical_goal_state, self.distance_table_directory)]
+
+  def __saves_distance_tables(self, problem: PuzzleProblem) -> bool:
+    '''
+    Whether the agent looks the problem up in a distance table that it saves to its directory: when
+    it has a directory and the board has a table.
+    '''
+    return (
+      self.type == PuzzleAgentType.DISTANCE_TABLE and
+      problem.cells <= PuzzleDistanceTable.MAX_CELLS and
+      self.distance_table_directory is not None
+    )
+
+  def breadth_first_search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
     '''
     Breadth-first search for the puzzle problem.
+
+    The frontier is a queue of encoded states, and the search tree only records how each state was
+    reached. Nodes are built for the solution path once the goal is found.
     '''
-    node = PuzzleNode(state=problem.initial_state, path_cost=0)
+    timed = stats is not None
+    (stats, on_expand) = self.__instrument(problem, stats)
+    state = problem.encoded_initial_state
 
     # The initial state is the goal state.
-    if (problem.goal_test(node.state)):
-      return PuzzleAgentSolution(node, expanded_nodes=0)
+    if (problem.goal_test(state)):
+      return PuzzleAgentSolution(problem, PuzzleNode.root_node(problem), expanded_nodes=0)
+
+    # The states that have been explored or are in the frontier.
+    tree = PuzzleSearchTree.create(problem)
+    tree.add(tree.key(state), -1, None)
+
+    # The states to be explored, with their blank index and key.
+    frontier: deque[tuple[PuzzleState, int, int]] = deque([(state, PuzzleProblem.get_blank_index(state, problem.cells), tree.key(state))])
+    (pop, push) = (frontier.popleft, frontier.append)
+
+    if (timed):
+      (pop, push) = stats.time_queue(pop, push)
+
+    expanded_nodes = 0
+    start_time = time.perf_counter()
+    next_check = self.get_first_check()
 
-    # The list of nodes to be explored.
-    frontier: list[PuzzleNode] = [node]
+    try:
+      # Explore the states.
+      while len(frontier) > 0:
+        # Check the budget of the search at each checkpoint.
+        if (expanded_nodes >= next_check):
+          failure = self.budget.check(start_time, expanded_nodes, len(frontier))
 
-    # The set of frontier states.
-    frontier_states: set[tuple[tuple[int, ...], ...]] = set()
+          if (failure is not None):
+            return failure
 
-    # The set of states that have been explored.
-    explored: set[tuple[tuple[int, ...], ...]] = set()
+          next_check = self.budget.get_next_check(expanded_nodes)
 
-    # Explore the nodes.
-    while len(frontier) > 0:
-      # Get the node to explore.
-      node = frontier.pop(0)
-      node_state_tuple = problem.state_to_tuple(node.state)
-      explored.add(node_state_tuple)
+        # Get the state to explore.
+        (state, blank, key) = pop()
+        expanded_nodes += 1
 
-      # Remove the node from the frontier states.
-      if (node_state_tuple in frontier_states):
-        frontier_states.remove(node_state_tuple)
+        if (on_expand is not None):
+          on_expand(state, blank, len(frontier) + 1)
 
-      # Explore the child nodes for the actions.
-      for action in problem.actions(node.state):
-        child = PuzzleNode.child_node(problem, node, action)
-        child_state_tuple = problem.state_to_tuple(child.state)
+        # Explore the child states for the moves.
+        for (action, target) in problem.moves(blank):
+          (_, child_state) = problem.result(state, blank, target)
+          child_key = tree.key(child_state)
 
-        # If the state is not explored and not in frontier, then is a new state to check.
-        if ((child_state_tuple not in explored) and (child_state_tuple not in frontier_states)):
-          if (problem.goal_test(child.state)):
-            return PuzzleAgentSolution(child, expanded_nodes=len(explored))
+          # If the state is explored or in the frontier, then it is a duplicate.
+          if (child_key in tree):
+            continue
+
+          tree.add(child_key, key, action)
+
+          if (problem.goal_test(child_state)):
+            node = PuzzleNode.from_actions(problem, tree.get_actions(child_key))
+
+            return PuzzleAgentSolution(problem, node, expanded_nodes=expanded_nodes)
 
           # Add the child to the frontier.
-          frontier.append(child)
-          frontier_states.add(child_state_tuple)
-    
-    return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+          push((child_state, target, child_key))
+
+      return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+    finally:
+      if (stats is not None):
+        stats.duplicate_nodes = stats.generated_nodes - (len(tree) - 1)
+
+      tree.close()
+
+  def __instrument(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats]) -> tuple[Optional[PuzzleSearchStats], Optional[Callable[[PuzzleState, int, int, int], None]]]:
+    '''
+    Get the stats of a search, if given, or counted in a throwaway object when the agent has an
+    instrumentation, along with the function searches call with each node they expand, if any.
+
+    The function takes the state and blank index of the node, the size of the frontier, and the
+    blank index of the parent of the node when the search never moves the blank back there, or -1.
+    It counts the children of the node as generated and calls the callbacks of the instrumentation
+    with the node and its children. Searches count their duplicates from the nodes they stored once
+    they end, so they check nothing for each generated node, and only the presence of the function
+    for each expanded node.
+    '''
+    instrumentation = self.instrumentation
+
+    if (instrumentation is None and stats is None):
+      return (None, None)
+
+    stats = stats or PuzzleSearchStats()
+    (on_expand, on_generate) = (instrumentation.on_expand, instrumentation.on_generate) if instrumentation is not None else (None, None)
+
+    def expand(state: PuzzleState, blank: int, frontier_size: int, previous_blank: int = -1) -> None:
+      if (frontier_size > stats.max_frontier_size):
+        stats.max_frontier_size = frontier_size
 
-  def a_star_search(self, problem: PuzzleProblem) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+      if (on_expand is not None):
+        on_expand(state)
+
+      for (_, target) in problem.moves(blank):
+        if (target != previous_blank):
+          stats.generated_nodes += 1
+
+          if (on_generate is not None):
+            on_generate(problem.result(state, blank, target)[1])
+
+    return (stats, expand)
+
+  def __get_search_heuristic(self, problem: PuzzleProblem, stats: PuzzleSearchStats, timed: bool) -> PuzzleHeuristic:
+    '''
+    Get the heuristic of the agent for a search. When the search is timed, the heuristic adds the
+    time it takes to the stats, and so does getting it, which may build it.
+    '''
+    if (not timed):
+      return self.get_heuristic(problem)
+
+    start_time = time.perf_counter()
+    heuristic = self.get_heuristic(problem)
+    stats.heuristic_time += time.perf_counter() - start_time
+
+    return stats.time_heuristic(heuristic)
+
+  def breadth_first_search_in_arena(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Breadth-first search for the puzzle problem, with the nodes stored in a `PuzzleNodeArena`.
+
+    Nodes are added to the arena in the order they are generated, which is the order they are
+    expanded in, so the frontier is the range of nodes not expanded yet and needs no queue.
+    '''
+    (stats, on_expand) = self.__instrument(problem, stats)
+    state = problem.encoded_initial_state
+
+    # The initial state is the goal state.
+    if (problem.goal_test(state)):
+      return PuzzleAgentSolution(problem, PuzzleNode.root_node(problem), expanded_nodes=0)
+
+    arena = PuzzleNodeArena(problem)
+    arena.add(state, PuzzleProblem.get_blank_index(state, problem.cells), PuzzleNodeArena.NO_PARENT, PuzzleNodeArena.NO_ACTION, 0, 0)
+
+    (states, blanks, path_costs) = (arena.states, arena.blanks, arena.path_costs)
+
+    # The states that have been explored or are in the frontier.
+    seen: set[PuzzleState] = {state}
+
+    # The index of the next node to explore.
+    index = 0
+
+    start_time = time.perf_counter()
+    next_check = self.get_first_check()
+
+    try:
+      while index < len(arena):
+        # Check the budget of the search at each checkpoint.
+        if (index >= next_check):
+          failure = self.budget.check(start_time, index, len(arena) - index)
+
+          if (failure is not None):
+            return failure
+
+          next_check = self.budget.get_next_check(index)
+
+        state = states[index]
+        blank = blanks[index]
+
+        if (on_expand is not None):
+          on_expand(state, blank, len(arena) - index)
+
+        for (action, target) in problem.moves(blank):
+          (step_cost, child_state) = problem.result(state, blank, target)
+
+          if (child_state in seen):
+            continue
+
+          seen.add(child_state)
+          child_index = arena.add(child_state, target, index, action.value, path_costs[index] + step_cost, 0)
+
+          if (problem.goal_test(child_state)):
+            node = PuzzleNode.from_actions(problem, arena.get_actions(child_index))
+
+            return PuzzleAgentSolution(problem, node, expanded_nodes=index + 1)
+
+        index += 1
+
+      return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+    finally:
+      if (stats is not None):
+        stats.duplicate_nodes = stats.generated_nodes - (len(arena) - 1)
+
+  def bidirectional_search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Bidirectional breadth-first search for the puzzle problem.
+
+    Grows one frontier from the initial state and one from the goal state, a whole layer at a
+    time, always expanding the smaller one. Once a layer reaches a state seen from the other end,
+    the shortest of the paths through the states met in that layer is the solution.
+    '''
+    (stats, on_expand) = self.__instrument(problem, stats)
+
+    if (problem.goal_test(problem.encoded_initial_state)):
+      return PuzzleAgentSolution(problem, PuzzleNode.root_node(problem), expanded_nodes=0)
+
+    # The parent state, the action from the parent state and the depth of each state seen from the initial state.
+    forward_parents: dict[PuzzleState, tuple[Optional[PuzzleState], Optional[PuzzleAction], int]] = {
+      problem.encoded_initial_state: (None, None, 0),
+    }
+
+    # The next state towards the goal, the action to reach it and the depth of each state seen from the goal state.
+    backward_parents: dict[PuzzleState, tuple[Optional[PuzzleState], Optional[PuzzleAction], int]] = {
+      problem.encoded_goal_state: (None, None, 0),
+    }
+
+    # The states and blank indexes of the last layer of each search.
+    forward_frontier = [(problem.encoded_initial_state, PuzzleProblem.get_blank_index(problem.encoded_initial_state, problem.cells))]
+    backward_frontier = [(problem.encoded_goal_state, PuzzleProblem.get_blank_index(problem.encoded_goal_state, problem.cells))]
+
+    expanded_nodes = 0
+    start_time = time.perf_counter()
+    next_check = self.get_first_check()
+
+    try:
+      while len(forward_frontier) > 0 and len(backward_frontier) > 0:
+        is_forward = len(forward_frontier) <= len(backward_frontier)
+        (frontier, parents, other_parents) = (forward_frontier, forward_parents, backward_parents) if is_forward else (backward_frontier, backward_parents, forward_parents)
+        other_frontier = backward_frontier if is_forward else forward_frontier
+
+        next_frontier: list[tuple[PuzzleState, int]] = []
+
+        # The state where both searches meet on the shortest path so far, and the length of that path.
+        meeting_state: Optional[PuzzleState] = None
+        meeting_cost = math.inf
+
+        for (state, blank) in frontier:
+          # Check the budget of the search at each checkpoint. The layer being expanded turns into the next one.
+          if (expanded_nodes >= next_check):
+            failure = self.budget.check(start_time, expanded_nodes, len(other_frontier) + len(next_frontier))
+
+            if (failure is not None):
+              return failure
+
+            next_check = self.budget.get_next_check(expanded_nodes)
+
+          expanded_nodes += 1
+          depth = parents[state][2]
+
+          if (on_expand is not None):
+            on_expand(state, blank, len(other_frontier) + len(next_frontier))
+
+          for (action, target) in problem.moves(blank):
+            (step_cost, child_state) = problem.result(state, blank, target)
+
+            if (child_state in parents):
+              continue
+
+            # The backward search stores the action that leads back towards the goal.
+            parents[child_state] = (state, action if is_forward else action.reverse(), depth + step_cost)
+            next_frontier.append((child_state, target))
+
+            if (child_state in other_parents):
+              cost = depth + step_cost + other_parents[child_state][2]
+
+              if (cost < meeting_cost):
+                meeting_state = child_state
+                meeting_cost = cost
+
+        frontier_size = len(other_frontier) + len(next_frontier)
+
+        if (stats is not None and frontier_size > stats.max_frontier_size):
+          stats.max_frontier_size = frontier_size
+
+        if (meeting_state is not None):
+          actions = self.__join_paths(meeting_state, forward_parents, backward_parents)
+
+          return PuzzleAgentSolution(problem, PuzzleNode.from_actions(problem, actions), expanded_nodes=expanded_nodes)
+
+        if (is_forward):
+          forward_frontier = next_frontier
+        else:
+          backward_frontier = next_frontier
+
+      return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+    finally:
+      if (stats is not None):
+        stats.duplicate_nodes = stats.generated_nodes - (len(forward_parents) - 1) - (len(backward_parents) - 1)
+
+  @staticmethod
+  def __join_paths(
+    meeting_state: PuzzleState,
+    forward_parents: dict[PuzzleState, tuple[Optional[PuzzleState], Optional[PuzzleAction], int]],
+    backward_parents: dict[PuzzleState, tuple[Optional[PuzzleState], Optional[PuzzleAction], int]],
+  ) -> list[PuzzleAction]:
+    '''
+    Get the actions from the initial state to the goal state through the state where both searches met.
+    '''
+    actions: list[PuzzleAction] = []
+    (state, action, _) = forward_parents[meeting_state]
+
+    # Walk back to the initial state.
+    while (action is not None):
+      actions.append(action)
+      (state, action, _) = forward_parents[state]
+
+    actions.reverse()
+    (state, action, _) = backward_parents[meeting_state]
+
+    # Walk on to the goal state.
+    while (action is not None):
+      actions.append(action)
+      (state, action, _) = backward_parents[state]
+
+    return actions
+
+  def distance_table_lookup(self, problem: PuzzleProblem) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Follow the best actions stored in the distance table of the goal, without searching.
+
+    A table already loaded or built for the goal itself, such as one of the distance table files of
+    the agent, is used as is. Otherwise, tables are kept for canonical goals (see
+    `PuzzleSymmetry.canonicalize`), so every goal with the blank in a symmetric cell shares one. The
+    table is built with a single backward search the first time a canonical goal is seen, unless one
+    of the files was built for it, or it is saved in the distance table directory of the agent.
+    Boards larger than `PuzzleDistanceTable.MAX_CELLS` have no table.
+    '''
+    if (problem.cells > PuzzleDistanceTable.MAX_CELLS):
+      return PuzzleAgentFailure(PuzzleAgentFailureType.NOT_IMPLEMENTED)
+
+    paths = self.get_distance_table_paths(problem)
+    table = PuzzleDistanceTable.find(problem.goal_state, paths)
+
+    if (table is not None):
+      actions = table.get_actions(problem)
+    else:
+      (canonical_problem, symmetry) = PuzzleSymmetry.canonicalize(problem)
+      table = PuzzleDistanceTable.create(canonical_problem.goal_state, paths)
+      canonical_actions = table.get_actions(canonical_problem)
+      actions = symmetry.restore_actions(canonical_actions) if canonical_actions is not None else None
+
+    if (actions is None):
+      return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+
+    return PuzzleAgentSolution(problem, PuzzleNode.from_actions(problem, actions), expanded_nodes=0)
+
+  def a_star_search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
     '''
     A* search for the puzzle problem.
     '''
-    node = PuzzleNode(state=problem.initial_state, path_cost=0)
-    
+    return self.best_first_search(problem, stats=stats)
+
+  def weighted_a_star_search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Weighted A* search for the puzzle problem: A* with the cost to the goal multiplied by the weight
+    of the agent. Expands fewer nodes than A*, and the solution is at most weight times longer than
+    the shortest.
+    '''
+    weight = self.weight
+
+    return self.best_first_search(problem, lambda node: node.path_cost + weight * node.cost_to_goal, stats)
+
+  def greedy_best_first_search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Greedy best-first search for the puzzle problem: expands the node closest to the goal first,
+    ignoring the path cost. Usually the fastest search, with no bound on the solution cost.
+    '''
+    return self.best_first_search(problem, lambda node: node.cost_to_goal, stats)
+
+  def best_first_search(
+    self,
+    problem: PuzzleProblem,
+    priority: Optional[Callable[[PuzzleNode], float]] = None,
+    stats: Optional[PuzzleSearchStats] = None,
+  ) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Best-first search for the puzzle problem, expanding the node with the lowest priority first:
+    the estimated solution cost, as in A*, unless given.
+    '''
+    timed = stats is not None
+    (stats, on_expand) = self.__instrument(problem, stats)
+    heuristic = self.__get_search_heuristic(problem, stats, timed)
+    node = PuzzleNode.root_node(problem, heuristic)
+
     # The open priority queue with the initial state as the first element.
-    frontier = PuzzleNodePriorityQueue()
-    frontier.append(node)
+    frontier = PuzzleNodePriorityQueue(priority)
+    (pop, push, replace, find_by_state) = (frontier.pop, frontier.append, frontier.replace, frontier.find_by_state)
 
-    # The set of frontier states.
-    frontier_states: set[tuple[tuple[int, ...], ...]] = set()
+    if (timed):
+      (pop, push, replace, find_by_state) = stats.time_queue(pop, push, replace, find_by_state)
+
+    push(node)
 
     # The set of explored states.
-    explored: set[tuple[tuple[int, ...], ...]] = set()
+    explored: set[PuzzleState] = set()
 
-    while not frontier.empty():
-      # Get the node with the lowest cost.
-      node = frontier.pop()
-      node_state_tuple = problem.state_to_tuple(node.state)
+    start_time = time.perf_counter()
+    next_check = self.get_first_check()
 
-      # If the node is the goal state, then return the solution.
-      if (problem.goal_test(node.state)):
-        return PuzzleAgentSolution(node, expanded_nodes=len(explored))
+    try:
+      while not frontier.empty():
+        # Check the budget of the search at each checkpoint.
+        if (len(explored) >= next_check):
+          failure = self.budget.check(start_time, len(explored), len(frontier))
 
-      # Remove the node from the frontier states.
-      if (node_state_tuple in frontier_states):
-        frontier_states.remove(node_state_tuple)
+          if (failure is not None):
+            return failure
 
-      explored.add(node_state_tuple)
+          next_check = self.budget.get_next_check(len(explored))
 
-      for action in problem.actions(node.state):
-        child = PuzzleNode.child_node(problem, node, action, calculate_cost_to_goal=True)
-        child_state_tuple = problem.state_to_tuple(child.state)
+        # Get the node with the lowest cost.
+        node = pop()
+
+        # If the node is the goal state, then return the solution.
+        if (problem.goal_test(node.state)):
+          return PuzzleAgentSolution(problem, node, expanded_nodes=len(explored))
+
+        explored.add(node.state)
+
+        if (on_expand is not None):
+          on_expand(node.state, node.blank, len(frontier) + 1)
+
+        for (action, target) in problem.moves(node.blank):
+          child = PuzzleNode.child_node(problem, node, action, target, heuristic)
+
+          if (child.state in explored):
+            continue
 
-        if ((child_state_tuple not in explored) and (child_state_tuple not in frontier_states)):
-          # Add the child to the frontier.
-          frontier.append(child)
-          frontier_states.add(child_state_tuple)
-        elif (child_state_tuple in frontier_states):
           # Get the frontier node with the same state.
-          frontier_node = frontier.find_by_state(child.state)
-
-          # Wether the current element in the frontier should be replaced.
-          should_replace = isinstance(frontier_node, PuzzleNode) and (child.estimated_solution_cost < frontier_node.estimated_solution_cost)
-          
-          # Replace the frontier node as long as the new estimated solution cost is lower.
-          if should_replace:
-            frontier.replace(frontier_node, child)
-    
-    return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
\ No newline at end of file
+          frontier_node = find_by_state(child.state)
+
+          if (frontier_node is None):
+            # Add the child to the frontier.
+            push(child)
+          elif (child.path_cost < frontier_node.path_cost):
+            # Replace the frontier node as long as the new path cost, and so estimated solution cost, is lower.
+            replace(frontier_node, child)
+
+            if (stats is not None):
+              stats.replaced_nodes += 1
+
+      return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+    finally:
+      if (stats is not None):
+        stats.duplicate_nodes = stats.generated_nodes - (frontier.count_appended() - 1)
+
+  def a_star_search_in_arena(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    A* search for the puzzle problem, with the nodes stored in a `PuzzleNodeArena`.
+
+    The frontier is a heap of plain integers, each packing the estimated solution cost of a node
+    above its index, so ties are broken in insertion order as in `PuzzleNodePriorityQueue`. The
+    only other structure is the index of the cheapest node of each seen state, explored or not: a
+    child is only added when it reaches its state with a lower path cost, and the nodes it replaces
+    stay in the heap until they reach the top, where they are skipped. The frontier size counts
+    them, as they take memory until then.
+    '''
+    timed = stats is not None
+    (stats, on_expand) = self.__instrument(problem, stats)
+    heuristic = self.__get_search_heuristic(problem, stats, timed)
+    tile_bits = problem.tile_bits
+    (push, pop) = (heapq.heappush, heapq.heappop)
+
+    if (timed):
+      (push, pop) = stats.time_queue(push, pop)
+
+    # The bits of the node index in a frontier entry.
+    INDEX_BITS = 32
+    index_mask = (1 << INDEX_BITS) - 1
+
+    state = problem.encoded_initial_state
+    cost_to_goal = heuristic.estimate(state)
+
+    arena = PuzzleNodeArena(problem)
+    index = arena.add(state, PuzzleProblem.get_blank_index(state, problem.cells), PuzzleNodeArena.NO_PARENT, PuzzleNodeArena.NO_ACTION, 0, cost_to_goal)
+
+    (states, blanks, path_costs, costs_to_goal) = (arena.states, arena.blanks, arena.path_costs, arena.costs_to_goal)
+
+    frontier = [(cost_to_goal << INDEX_BITS) | index]
+
+    # The index of the node with the lowest path cost of each seen state.
+    best_indexes: dict[PuzzleState, int] = {state: index}
+
+    expanded_nodes = 0
+    start_time = time.perf_counter()
+    next_check = self.get_first_check()
+
+    try:
+      while len(frontier) > 0:
+        # Check the budget of the search at each checkpoint.
+        if (expanded_nodes >= next_check):
+          failure = self.budget.check(start_time, expanded_nodes, len(frontier))
+
+          if (failure is not None):
+            return failure
+
+          next_check = self.budget.get_next_check(expanded_nodes)
+
+        index = pop(frontier) & index_mask
+        state = states[index]
+
+        # Skip the entries of replaced nodes.
+        if (best_indexes[state] != index):
+          continue
+
+        if (problem.goal_test(state)):
+          return PuzzleAgentSolution(problem, PuzzleNode.from_actions(problem, arena.get_actions(index)), expanded_nodes=expanded_nodes)
+
+        expanded_nodes += 1
+        blank = blanks[index]
+        path_cost = path_costs[index]
+        cost_to_goal = costs_to_goal[index]
+
+        if (on_expand is not None):
+          on_expand(state, blank, len(frontier) + 1)
+
+        for (action, target) in problem.moves(blank):
+          (step_cost, child_state) = problem.result(state, blank, target)
+          child_path_cost = path_cost + step_cost
+          best_index = best_indexes.get(child_state)
+
+          # Add the child as long as it reaches its state with a lower path cost, replacing the node of the state.
+          if (best_index is not None and child_path_cost >= path_costs[best_index]):
+            continue
+
+          tile = PuzzleProblem.get_tile(state, target, tile_bits)
+          child_cost_to_goal = heuristic.update(cost_to_goal, child_state, tile, target, blank)
+          child_index = arena.add(child_state, target, index, action.value, child_path_cost, child_cost_to_goal)
+          best_indexes[child_state] = child_index
+          push(frontier, ((child_path_cost + child_cost_to_goal) << INDEX_BITS) | child_index)
+
+          if (best_index is not None and stats is not None):
+            stats.replaced_nodes += 1
+
+      return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+    finally:
+      if (stats is not None):
+        stats.duplicate_nodes = stats.generated_nodes - (len(arena) - 1)
+
+  def anytime_repairing_a_star_search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Iterator[Union[PuzzleAgentSolution, PuzzleAgentFailure]]:
+    '''
+    Anytime repairing A* (ARA*) search for the puzzle problem, yielding each solution shorter than
+    the previous one.
+
+    Runs weighted A* searches with a weight decreasing from the weight of the agent down to 1. Each
+    search reuses the path costs found by the previous ones, and only expands again the states whose
+    path cost improved since they were last expanded. Stops once the solution is proven optimal, or
+    when the budget is exceeded, yielding the failure of the search only if no solution was found.
+    The stats, if any, are up to date whenever a result is yielded, and cover every search so far.
+    '''
+    timed = stats is not None
+    (stats, on_expand) = self.__instrument(problem, stats)
+    heuristic = self.__get_search_heuristic(problem, stats, timed)
+    tile_bits = problem.tile_bits
+    (push, pop) = (heapq.heappush, heapq.heappop)
+
+    if (timed):
+      (push, pop) = stats.time_queue(push, pop)
+    goal_state = problem.encoded_goal_state
+    state = problem.encoded_initial_state
+
+    # The path cost, cost to the goal, blank index, parent state and action of each state seen.
+    nodes: dict[PuzzleState, tuple[int, int, int, Optional[PuzzleState], Optional[PuzzleAction]]] = {
+      state: (0, heuristic.estimate(state), PuzzleProblem.get_blank_index(state, problem.cells), None, None),
+    }
+
+    # The states to expand in the current search.
+    open_states: set[PuzzleState] = {state}
+
+    # The states expanded in the current search.
+    closed_states: set[PuzzleState] = set()
+
+    # The states whose path cost improved after they were expanded in the current search.
+    inconsistent_states: set[PuzzleState] = set()
+
+    weight = max(self.weight, 1)
+
+    # The heap of (priority, path cost, state) entries of the open states. Entries of states that
+    # were expanded or improved since stay in the heap until they reach the top, where they are skipped.
+    frontier = [(nodes[state][0] + weight * nodes[state][1], nodes[state][0], state)]
+
+    expanded_nodes = 0
+    best_path_cost = math.inf
+    start_time = time.perf_counter()
+    next_check = self.get_first_check()
+
+    def count_duplicates() -> None:
+      '''
+      Count the generated nodes that did not improve the path cost of their state as duplicates.
+      '''
+      if (stats is not None):
+        stats.duplicate_nodes = stats.generated_nodes - (len(nodes) - 1) - stats.replaced_nodes
+
+    while True:
+      # Expand the open states until none of them can lead to a better solution.
+      while len(frontier) > 0:
+        (priority, path_cost, state) = frontier[0]
+
+        if (state not in open_states or nodes[state][0] != path_cost):
+          pop(frontier)
+          continue
+
+        if (goal_state in nodes and nodes[goal_state][0] <= priority):
+          break
+
+        # Check the budget of the search at each checkpoint.
+        if (expanded_nodes >= next_check):
+          failure = self.budget.check(start_time, expanded_nodes, len(open_states))
+
+          if (failure is not None):
+            if (best_path_cost == math.inf):
+              count_duplicates()
+              yield failure
+
+            return
+
+          next_check = self.budget.get_next_check(expanded_nodes)
+
+        pop(frontier)
+        open_states.remove(state)
+        closed_states.add(state)
+        expanded_nodes += 1
+
+        (_, cost_to_goal, blank, _, _) = nodes[state]
+
+        if (on_expand is not None):
+          on_expand(state, blank, len(open_states) + 1)
+
+        for (action, target) in problem.moves(blank):
+          (step_cost, child_state) = problem.result(state, blank, target)
+          child_path_cost = path_cost + step_cost
+          child = nodes.get(child_state)
+
+          if (child is not None and child[0] <= child_path_cost):
+            continue
+
+          if (child is None):
+            tile = PuzzleProblem.get_tile(state, target, tile_bits)
+            child_cost_to_goal = heuristic.update(cost_to_goal, child_state, tile, target, blank)
+          else:
+            child_cost_to_goal = child[1]
+
+            if (stats is not None):
+              stats.replaced_nodes += 1
+
+          nodes[child_state] = (child_path_cost, child_cost_to_goal, target, state, action)
+
+          if (child_state in closed_states):
+            inconsistent_states.add(child_state)
+          else:
+            open_states.add(child_state)
+            push(frontier, (child_path_cost + weight * child_cost_to_goal, child_path_cost, child_state))
+
+      count_duplicates()
+
+      if (goal_state not in nodes):
+        yield PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND, expanded_nodes=expanded_nodes)
+
+        return
+
+      if (nodes[goal_state][0] < best_path_cost):
+        best_path_cost = nodes[goal_state][0]
+        yield PuzzleAgentSolution(problem, PuzzleNode.from_actions(problem, self.__get_anytime_actions(nodes, goal_state)), expanded_nodes=expanded_nodes)
+
+      # No state left to expand can lead to a shorter solution.
+      lower_bound = min((nodes[state][0] + nodes[state][1] for state in open_states | inconsistent_states), default=math.inf)
+
+      if (weight == 1 or best_path_cost <= lower_bound):
+        return
+
+      # Search again with a lower weight, from the open and inconsistent states.
+      weight = max(weight - PuzzleAgent.ANYTIME_WEIGHT_STEP, 1)
+      open_states |= inconsistent_states
+      inconsistent_states = set()
+      closed_states = set()
+      frontier = [(nodes[state][0] + weight * nodes[state][1], nodes[state][0], state) for state in open_states]
+      heapq.heapify(frontier)
+
+  @staticmethod
+  def __get_anytime_actions(
+    nodes: dict[PuzzleState, tuple[int, int, int, Optional[PuzzleState], Optional[PuzzleAction]]],
+    state: PuzzleState,
+  ) -> list[PuzzleAction]:
+    '''
+    Get the actions from the initial state to the state found by an anytime search.
+    '''
+    actions: list[PuzzleAction] = []
+    (_, _, _, state, action) = nodes[state]
+
+    while (action is not None):
+      actions.append(action)
+      (_, _, _, state, action) = nodes[state]
+
+    actions.reverse()
+
+    return actions
+
+  def beam_search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Beam search for the puzzle problem.
+
+    Expands a whole layer of states at a time with a `PuzzleBatchExpander`, and keeps the children
+    not seen before with the lowest estimated cost to the goal, up to the beam width. Much faster
+    than A* on hard problems, but the solution found is not always the shortest, and a narrow beam
+    can miss the goal altogether. Requires NumPy, and boards of at most `PuzzleBatchExpander.MAX_CELLS` cells.
+
+    Stats and callbacks are collected a layer at a time. The frontier is the layer being expanded,
+    and the children dropped for the width of the beam are not duplicates.
+    '''
+    if (numpy is None or problem.cells > PuzzleBatchExpander.MAX_CELLS):
+      return PuzzleAgentFailure(PuzzleAgentFailureType.NOT_IMPLEMENTED)
+
+    if (problem.goal_test(problem.encoded_initial_state)):
+      return PuzzleAgentSolution(problem, PuzzleNode.root_node(problem), expanded_nodes=0)
+
+    timed = stats is not None
+    (stats, _) = self.__instrument(problem, stats)
+    (on_expand, on_generate) = (self.instrumentation.on_expand, self.instrumentation.on_generate) if self.instrumentation is not None else (None, None)
+    heuristic_start_time = time.perf_counter()
+    expander = PuzzleBatchExpander(problem, self.get_heuristic(problem))
+
+    if (timed):
+      stats.heuristic_time += time.perf_counter() - heuristic_start_time
+
+    goal_state = numpy.uint64(problem.encoded_goal_state)
+
+    # The tiles and blank indexes of the states of the current layer.
+    tiles = expander.decode(numpy.array([problem.encoded_initial_state], dtype=numpy.uint64))
+    blanks = numpy.array([PuzzleProblem.get_blank_index(problem.encoded_initial_state, problem.cells)])
+
+    # The parent index and action value of the states of each layer after the first.
+    layers: list[tuple[list[int], list[int]]] = []
+
+    # The states kept in any layer so far, sorted so whole layers are looked up at once.
+    seen = numpy.array([problem.encoded_initial_state], dtype=numpy.uint64)
+
+    expanded_nodes = 0
+    start_time = time.perf_counter()
+    next_check = self.get_first_check()
+
+    while len(tiles) > 0:
+      # Check the budget of the search at each checkpoint.
+      if (expanded_nodes >= next_check):
+        failure = self.budget.check(start_time, expanded_nodes, len(tiles))
+
+        if (failure is not None):
+          return failure
+
+        next_check = self.budget.get_next_check(expanded_nodes)
+
+      expanded_nodes += len(tiles)
+
+      (child_tiles, child_blanks, parents, actions) = expander.expand(tiles, blanks)
+      child_states = expander.encode(child_tiles)
+
+      if (stats is not None):
+        stats.generated_nodes += len(child_states)
+        stats.max_frontier_size = max(stats.max_frontier_size, len(tiles))
+
+        if (on_expand is not None):
+          for state in expander.encode(tiles).tolist():
+            on_expand(state)
+
+        if (on_generate is not None):
+          for state in child_states.tolist():
+            on_generate(state)
+
+      # Keep the first child of each state, and only the states not seen before.
+      (child_states, first_indexes) = numpy.unique(child_states, return_index=True)
+      seen_indexes = numpy.minimum(numpy.searchsorted(seen, child_states), len(seen) - 1)
+      is_new = seen[seen_indexes] != child_states
+      (child_states, kept_indexes) = (child_states[is_new], first_indexes[is_new])
+
+      if (stats is not None):
+        stats.duplicate_nodes += len(child_tiles) - len(child_states)
+
+      (goal_indexes,) = numpy.nonzero(child_states == goal_state)
+
+      if (len(goal_indexes) > 0):
+        kept_indexes = kept_indexes[goal_indexes[:1]]
+      elif (len(kept_indexes) > self.beam_width):
+        # Keep the children with the lowest estimated cost to the goal.
+        heuristic_start_time = time.perf_counter()
+        costs_to_goal = expander.estimate(child_tiles[kept_indexes])
+
+        if (timed):
+          stats.heuristic_time += time.perf_counter() - heuristic_start_time
+
+        best_indexes = numpy.argpartition(costs_to_goal, self.beam_width)[:self.beam_width]
+        (child_states, kept_indexes) = (child_states[best_indexes], kept_indexes[best_indexes])
+
+      layers.append((parents[kept_indexes].tolist(), actions[kept_indexes].tolist()))
+
+      if (len(goal_indexes) > 0):
+        return PuzzleAgentSolution(problem, PuzzleNode.from_actions(problem, self.__get_beam_actions(layers)), expanded_nodes=expanded_nodes)
+
+      child_states = numpy.sort(child_states)
+      seen = numpy.insert(seen, numpy.searchsorted(seen, child_states), child_states)
+      (tiles, blanks) = (child_tiles[kept_indexes], child_blanks[kept_indexes])
+
+    return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+
+  @staticmethod
+  def __get_beam_actions(layers: list[tuple[list[int], list[int]]]) -> list[PuzzleAction]:
+    '''
+    Get the actions from the initial state to the first state of the last layer of a beam search.
+    '''
+    actions: list[PuzzleAction] = []
+    index = 0
+
+    for (parents, layer_actions) in reversed(layers):
+      actions.append(PuzzleAction(layer_actions[index]))
+      index = parents[index]
+
+    actions.reverse()
+
+    return actions
+
+  def iterative_deepening_a_star_search(self, problem: PuzzleProblem, stats: Optional[PuzzleSearchStats] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Iterative deepening A* (IDA*) search for the puzzle problem.
+
+    Runs depth-first searches bounded by the estimated solution cost, raising the bound to the
+    lowest cost that exceeded it until the goal is found. Moves are applied and undone on a single
+    board, and no explored set is kept, so memory grows only with the depth of the solution. The
+    previous move is never undone, so its state is not generated, and the frontier size is the
+    depth of the path.
+    '''
+    timed = stats is not None
+    (stats, on_expand) = self.__instrument(problem, stats)
+    heuristic = self.__get_search_heuristic(problem, stats, timed)
+    move_table = [problem.moves(blank) for blank in range(problem.cells)]
+    tile_bits = problem.tile_bits
+    goal_state = problem.encoded_goal_state
+
+    # The board, updated in place along the current path.
+    tiles = PuzzleProblem.get_tiles(problem.encoded_initial_state, problem.cells)
+
+    # The actions of the current path.
+    path: list[PuzzleAction] = []
+
+    # The marker returned when the goal is found.
+    FOUND = -1
+
+    # The marker returned when the budget is exceeded.
+    EXCEEDED = -2
+
+    cost_to_goal = heuristic.estimate(problem.encoded_initial_state)
+    bound = cost_to_goal
+    expanded_nodes = 0
+    start_time = time.perf_counter()
+    next_check = self.get_first_check()
+
+    # The failure of the search once the budget is exceeded.
+    failure: Optional[PuzzleAgentFailure] = None
+
+    def search(state: PuzzleState, blank: int, previous_blank: int, path_cost: int, cost_to_goal: int) -> float:
+      '''
+      Search below the state, returning FOUND, EXCEEDED or the lowest estimated solution cost over the bound.
+      '''
+      nonlocal expanded_nodes, next_check, failure
+
+      estimated_solution_cost = path_cost + cost_to_goal
+
+      if (estimated_solution_cost > bound):
+        return estimated_solution_cost
+
+      if (state == goal_state):
+        return FOUND
+
+      # Check the budget of the search at each checkpoint.
+      if (expanded_nodes >= next_check):
+        failure = self.budget.check(start_time, expanded_nodes, len(path))
+
+        if (failure is not None):
+          return EXCEEDED
+
+        next_check = self.budget.get_next_check(expanded_nodes)
+
+      expanded_nodes += 1
+      next_bound = math.inf
+
+      if (on_expand is not None):
+        on_expand(state, blank, len(path), previous_blank)
+
+      for (action, target) in move_table[blank]:
+        # Never undo the previous move.
+        if (target == previous_blank):
+          continue
+
+        tile = tiles[target]
+        child_state = state - (tile << (target * tile_bits)) + (tile << (blank * tile_bits))
+        child_cost_to_goal = heuristic.update(cost_to_goal, child_state, tile, target, blank)
+
+        # Move the tile into the blank cell.
+        tiles[blank] = tile
+        tiles[target] = 0
+        path.append(action)
+
+        result = search(child_state, target, blank, path_cost + 1, child_cost_to_goal)
+
+        if (result == FOUND or result == EXCEEDED):
+          return result
+
+        # Undo the move.
+        path.pop()
+        tiles[target] = tile
+        tiles[blank] = 0
+
+        next_bound = min(next_bound, result)
+
+      return next_bound
+
+    while True:
+      result = search(problem.encoded_initial_state, tiles.index(0), -1, 0, cost_to_goal)
+
+      if (result == FOUND):
+        return PuzzleAgentSolution(problem, PuzzleNode.from_actions(problem, path), expanded_nodes=expanded_nodes)
+
+      if (result == EXCEEDED):
+        return failure
+
+      # No state exceeded the bound, so the goal is unreachable.
+      if (result == math.inf):
+        return PuzzleAgentFailure(PuzzleAgentFailureType.SOLUTION_NOT_FOUND)
+
+      bound = result
+
+
+# The agent of the worker process. See `PuzzleAgent.solve_many`.
+_worker_agent: Optional[PuzzleAgent] = None
+
+def _initialize_worker(agent: PuzzleAgent) -> None:
+  '''
+  Keep the agent for the problems solved by the worker process.
+  '''
+  global _worker_agent
+
+  _worker_agent = agent
+
+def _solve_in_worker(problem: PuzzleProblem) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+  '''
+  Solve a problem with the agent of the worker process.
+  '''
+  return _worker_agent.solve(problem)
@@ -1,33 +1,95 @@
 from enum import Enum
+from typing import Any, Optional
 
 from puzzle_node import PuzzleNode
-from puzzle_problem import PuzzleProblem
+from puzzle_problem import PuzzleAction, PuzzleProblem
+from puzzle_search_stats import PuzzleSearchStats
 
 class PuzzleAgentSolution:
   '''
   The solution to the problem.
   '''
 
+  # The problem that was solved.
+  problem: PuzzleProblem
+
   # The node that represents the solution.
   node: PuzzleNode
 
   # The number of expanded nodes.
   expanded_nodes: int
 
-  def __init__(self, node: PuzzleNode, expanded_nodes: int):
+  # The time taken to solve the problem, in seconds.
+  time_taken: float
+
+  # The stats of the search, if collected. See `PuzzleSearchInstrumentation`.
+  stats: Optional[PuzzleSearchStats]
+
+  # The actions from the initial state to the goal state, once asked for. See `get_actions`.
+  __actions: Optional[list[PuzzleAction]]
+
+  # The states from the initial state to the goal state, once asked for. See `get_states`.
+  __states: Optional[list[list[list[int]]]]
+
+  def __init__(self, problem: PuzzleProblem, node: PuzzleNode, expanded_nodes: int):
+    self.problem = problem
     self.node = node
     self.expanded_nodes = expanded_nodes
+    self.time_taken = 0
+    self.stats = None
+    self.__actions = None
+    self.__states = None
+
+  def __getstate__(self) -> dict[str, Any]:
+    '''
+    Get the state of the solution to pickle, such as to return it from a worker process: the actions
+    stand in for the node, whose chain of parents is too deep to pickle on long paths.
+    '''
+    return {
+      'problem': self.problem,
+      'actions': self.get_actions(),
+      'expanded_nodes': self.expanded_nodes,
+      'time_taken': self.time_taken,
+      'stats': self.stats,
+    }
+
+  def __setstate__(self, state: dict[str, Any]) -> None:
+    '''
+    Restore a pickled solution, rebuilding its node from the actions.
+    '''
+    self.__init__(state['problem'], PuzzleNode.from_actions(state['problem'], state['actions']), state['expanded_nodes'])
+    self.time_taken = state['time_taken']
+    self.stats = state['stats']
+    self.__actions = state['actions']
+
+  def get_actions(self) -> list[PuzzleAction]:
+    '''
+    Get the actions from the initial state to the goal state, walking the path of the solution node once.
+    '''
+    if (self.__actions is None):
+      self.__actions = self.node.get_actions()
+
+    return self.__actions
+
+  def get_states(self) -> list[list[list[int]]]:
+    '''
+    Get the states from the initial state to the goal state, decoding the path of the solution node once.
+    '''
+    if (self.__states is None):
+      self.__states = self.node.get_states(self.problem)
+
+    return self.__states
 
   def show(self) -> None:
     '''
     Show the solution.
     '''
-    states = self.node.get_states()
+    states = self.get_states()
 
     for step, state in enumerate(states):
       for row_index, row in enumerate(state):
-        row_format = '|' + ' '.join(['{}'] * PuzzleProblem.BOARD_SIZE) + '|'
-        print(f'{f'Step {step}' if row_index == 0 else ''}\t{row_format.format(*row)}')
+        step_label = f'Step {step}' if row_index == 0 else ''
+        print(f'{step_label}\t{PuzzleProblem.format_row(row, self.problem.cells)}')
 
       if (step < len(states) - 1):
         print()
@@ -40,6 +102,7 @@ class PuzzleAgentFailureType(Enum):
   SOLUTION_NOT_FOUND = 1
   NOT_IMPLEMENTED = 2
   UNSOLVABLE_FROM_INITIAL_STATE = 3
+  BUDGET_EXCEEDED = 4
 
 class PuzzleAgentFailure:
   '''
@@ -49,16 +112,37 @@ class PuzzleAgentFailure:
   # The type of failure.
   type: PuzzleAgentFailureType
 
+  # The time taken to give up on the problem, in seconds.
+  time_taken: float
+
+  # The number of nodes expanded before giving up.
+  expanded_nodes: int
+
+  # The number of nodes in the frontier when giving up.
+  frontier_size: int
+
+  # The limit of the search budget that was exceeded, if any.
+  limit: Optional[str]
+
+  # The stats of the search, if collected. See `PuzzleSearchInstrumentation`.
+  stats: Optional[PuzzleSearchStats]
+
   # The set of failures and their reasons.
   _reasons: dict[PuzzleAgentFailureType, str] = {
     PuzzleAgentFailureType.UNSOLVABLE: "The problem is unsolvable.",
     PuzzleAgentFailureType.SOLUTION_NOT_FOUND: "No solution was found.",
     PuzzleAgentFailureType.NOT_IMPLEMENTED: "The method is not implemented.",
-    PuzzleAgentFailureType.UNSOLVABLE_FROM_INITIAL_STATE: "The initial state cannot reach the goal state."
+    PuzzleAgentFailureType.UNSOLVABLE_FROM_INITIAL_STATE: "The initial state cannot reach the goal state.",
+    PuzzleAgentFailureType.BUDGET_EXCEEDED: "The search budget was exceeded.",
   }
 
-  def __init__(self, type: PuzzleAgentFailureType):
+  def __init__(self, type: PuzzleAgentFailureType, expanded_nodes: int = 0, frontier_size: int = 0, limit: Optional[str] = None):
     self.type = type
+    self.time_taken = 0
+    self.expanded_nodes = expanded_nodes
+    self.frontier_size = frontier_size
+    self.limit = limit
+    self.stats = None
 
   def get_reason(self) -> str:
     reason = self._reasons[self.type]
@@ -66,4 +150,7 @@ class PuzzleAgentFailure:
     if (reason is None):
       return "Unknown failure."
 
+    if (self.limit is not None):
+      return f'{reason[:-1]} ({self.limit}).'
+
     return reason
\ No newline at end of file
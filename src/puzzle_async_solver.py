@@ -0,0 +1,274 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+import os
+import tempfile
+from typing import Callable, Optional, Union
+
+from puzzle_agent import PuzzleAgent, _initialize_worker, _solve_in_worker
+from puzzle_agent_result import PuzzleAgentFailure, PuzzleAgentSolution
+from puzzle_problem import PuzzleProblem, PuzzleState
+
+class QueueFull(asyncio.QueueFull):
+  '''
+  Raised by `PuzzleAsyncSolver.solve` when a new search is requested while `max_queued` searches
+  are already waiting for a slot in the pool.
+  '''
+
+class PuzzleAsyncSolver:
+  '''
+  Solves puzzle problems for asyncio code, without blocking the event loop: each search runs in a
+  pool of worker processes, which receive the agent once, as in `PuzzleAgent.solve_many`.
+
+  Requests for the same problem made while it is being solved share a single search. At most
+  `max_pending` searches are submitted to the pool at once, and further requests wait for one of
+  them to complete, up to `max_queued` of them: beyond that, new searches are rejected with
+  `QueueFull`, while requests answered by the cache or joining a search in flight are not. A
+  request whose callers all gave up, by cancellation or timeout, is withdrawn from the pool if it
+  has not started yet. A search that has started runs to its end, so use a time limit in the
+  budget of the agent to bound it.
+
+  The cache of the agent, if any, is used by this process only, and solutions found by the workers
+  are stored in it. Pattern databases and distance tables built on demand are built once per goal,
+  in a thread of this process, and saved to the directories of the agent, or a directory of the
+  solver, from which the workers load them. Another executor, such as a `ThreadPoolExecutor`, can
+  stand in for the pool, in which case the agent solves the problems in this process.
+  '''
+
+  # The default number of searches submitted to the pool at once, per worker.
+  DEFAULT_PENDING_PER_WORKER = 2
+
+  # The default number of searches waiting for a slot in the pool, per worker.
+  DEFAULT_QUEUED_PER_WORKER = 16
+
+  # The agent that solves the problems.
+  agent: PuzzleAgent
+
+  # The number of searches submitted to the pool at once.
+  max_pending: int
+
+  # The number of searches waiting for a slot in the pool, beyond which new searches are rejected.
+  max_queued: int
+
+  # The executor running the searches.
+  __executor: Executor
+
+  # Whether the executor was created by the solver, and is shut down with it.
+  __owns_executor: bool
+
+  # The function solving a problem in the executor.
+  __solve_function: Callable[[PuzzleProblem], Union[PuzzleAgentSolution, PuzzleAgentFailure]]
+
+  # The agent solving the problems in the executor.
+  __worker_agent: PuzzleAgent
+
+  # The directory of the pattern databases and distance tables built for the workers, removed on
+  # close.
+  __directory: tempfile.TemporaryDirectory
+
+  # The build of the pattern databases and distance table of each goal, by goal key, kept once
+  # completed so later searches for the goal skip it. See `__build`.
+  __builds: dict[tuple[int, int, PuzzleState], asyncio.Future]
+
+  # The slots of the searches submitted to the pool. Created on first use, in the event loop.
+  __slots: Optional[asyncio.Semaphore]
+
+  # The search of each problem being solved, by problem key. See `__key`.
+  __searches: dict[tuple[int, int, PuzzleState, PuzzleState], asyncio.Task]
+
+  # The number of callers waiting for each search, by problem key.
+  __callers: dict[tuple[int, int, PuzzleState, PuzzleState], int]
+
+  # The keys of the searches started but not holding a slot in the pool yet.
+  __queued: set[tuple[int, int, PuzzleState, PuzzleState]]
+
+  # The number of slots held by searches.
+  __running: int
+
+  def __init__(
+    self,
+    agent: PuzzleAgent,
+    workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    max_queued: Optional[int] = None,
+  ):
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+
+    self.agent = agent
+    self.max_pending = max_pending if max_pending is not None else workers * PuzzleAsyncSolver.DEFAULT_PENDING_PER_WORKER
+    self.max_queued = max_queued if max_queued is not None else workers * PuzzleAsyncSolver.DEFAULT_QUEUED_PER_WORKER
+
+    if (workers < 1 or self.max_pending < 1 or self.max_queued < 1):
+      raise ValueError(f'The workers, pending and queued searches must be at least 1: {workers}, {self.max_pending}, {self.max_queued}')
+
+    self.__owns_executor = executor is None
+    self.__directory = tempfile.TemporaryDirectory(prefix='puzzle-')
+    self.__worker_agent = agent.get_worker_agent(self.__directory.name)
+    self.__builds = {}
+
+    if (executor is None):
+      self.__executor = ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker, initargs=(self.__worker_agent,))
+      self.__solve_function = _solve_in_worker
+    else:
+      self.__executor = executor
+      self.__solve_function = self.__worker_agent.solve
+
+    self.__slots = None
+    self.__searches = {}
+    self.__callers = {}
+    self.__queued = set()
+    self.__running = 0
+
+  async def __aenter__(self) -> 'PuzzleAsyncSolver':
+    return self
+
+  async def __aexit__(self, *_) -> None:
+    self.close()
+
+  def __len__(self) -> int:
+    return len(self.__searches)
+
+  def close(self) -> None:
+    '''
+    Shut the pool of worker processes down, dropping the searches that have not started. An executor
+    given to the solver is left to its owner. The pattern databases and distance tables built for
+    the workers are removed.
+    '''
+    if (self.__owns_executor):
+      self.__executor.shutdown(wait=False, cancel_futures=True)
+
+    self.__directory.cleanup()
+
+  async def solve(self, problem: PuzzleProblem, timeout: Optional[float] = None) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Solve the puzzle problem in the pool, or join the search of an identical request in flight.
+
+    Raises `asyncio.TimeoutError` if the result is not ready after the timeout, in seconds, counting
+    the time spent waiting for a slot in the pool, and `QueueFull` if the problem needs a new search
+    while `max_queued` searches are waiting for a slot.
+    '''
+    solution = self.agent.lookup(problem)
+
+    if (solution is not None):
+      self.agent.notify(solution)
+
+      return solution
+
+    key = PuzzleAsyncSolver.__key(problem)
+    search = self.__searches.get(key)
+
+    if (search is None):
+      # The searches not holding a slot yet take the free slots first, and the others wait.
+      waiting = len(self.__queued) - (self.max_pending - self.__running)
+
+      if (waiting >= self.max_queued):
+        raise QueueFull(f'{waiting} searches are already waiting for a slot in the pool')
+
+      search = asyncio.ensure_future(self.__search(problem, key))
+      self.__searches[key] = search
+      self.__callers[key] = 0
+      self.__queued.add(key)
+      search.add_done_callback(lambda _: self.__forget(key, search))
+
+    self.__callers[key] += 1
+
+    try:
+      # Shield the search from the cancellation of this caller, as others may be waiting for it.
+      return await asyncio.wait_for(asyncio.shield(search), timeout)
+    finally:
+      self.__leave(key, search)
+
+  async def __search(self, problem: PuzzleProblem, key: tuple[int, int, PuzzleState, PuzzleState]) -> Union[PuzzleAgentSolution, PuzzleAgentFailure]:
+    '''
+    Solve the puzzle problem in the pool once a slot is free, storing the result in the cache of the
+    agent.
+    '''
+    loop = asyncio.get_running_loop()
+
+    if (self.__slots is None):
+      self.__slots = asyncio.Semaphore(self.max_pending)
+
+    if (self.__worker_agent.saves_files(problem)):
+      await self.__build(problem)
+
+    await self.__slots.acquire()
+    self.__queued.discard(key)
+    self.__running += 1
+
+    try:
+      future = self.__executor.submit(self.__solve_function, problem)
+    except BaseException:
+      self.__release()
+      raise
+
+    # Free the slot once the search completes or is withdrawn, not when its callers give up, so a
+    # search still running in the pool keeps its slot.
+    def release(_) -> None:
+      if (not loop.is_closed()):
+        loop.call_soon_threadsafe(self.__release)
+
+    future.add_done_callback(release)
+
+    # Cancelling the wrapper cancels the future, which withdraws the search if it has not started.
+    result = await asyncio.wrap_future(future)
+    self.agent.store(problem, result)
+    self.agent.notify(result)
+
+    return result
+
+  async def __build(self, problem: PuzzleProblem) -> None:
+    '''
+    Build the missing pattern databases and distance table of the goal of the problem in a thread,
+    before the workers need them. Searches for the same goal wait for a single build, and searches
+    for other goals do not wait for it. A failed build is forgotten, so the next search retries it.
+    '''
+    key = (problem.rows, problem.columns, problem.encoded_goal_state)
+    build = self.__builds.get(key)
+
+    if (build is None):
+      build = asyncio.get_running_loop().run_in_executor(None, self.__worker_agent.build_files, problem)
+      self.__builds[key] = build
+
+      def forget(_) -> None:
+        if ((build.cancelled() or build.exception() is not None) and self.__builds.get(key) is build):
+          del self.__builds[key]
+
+      build.add_done_callback(forget)
+
+    # Shield the build from the cancellation of this search, as others may be waiting for it.
+    await asyncio.shield(build)
+
+  def __release(self) -> None:
+    '''
+    Free the slot of a search.
+    '''
+    self.__running -= 1
+    self.__slots.release()
+
+  def __leave(self, key: tuple[int, int, PuzzleState, PuzzleState], search: asyncio.Task) -> None:
+    '''
+    Remove a caller from a search, cancelling the search when no caller is left waiting for it.
+    '''
+    if (self.__searches.get(key) is not search):
+      return
+
+    self.__callers[key] -= 1
+
+    if (self.__callers[key] == 0 and not search.done()):
+      search.cancel()
+
+  def __forget(self, key: tuple[int, int, PuzzleState, PuzzleState], search: asyncio.Task) -> None:
+    '''
+    Forget a completed search, so later requests for its problem start a new one.
+    '''
+    if (self.__searches.get(key) is search):
+      del self.__searches[key]
+      del self.__callers[key]
+      self.__queued.discard(key)
+
+  @staticmethod
+  def __key(problem: PuzzleProblem) -> tuple[int, int, PuzzleState, PuzzleState]:
+    '''
+    Get the key of a problem, shared by identical problems.
+    '''
+    return (problem.rows, problem.columns, problem.encoded_initial_state, problem.encoded_goal_state)
@@ -0,0 +1,197 @@
+import itertools
+from typing import Any
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from puzzle_heuristic import (
+  LinearConflictHeuristic,
+  ManhattanDistanceHeuristic,
+  MisplacedTilesHeuristic,
+  PuzzleHeuristic,
+  longest_increasing_subsequence,
+)
+from puzzle_problem import PuzzleAction, PuzzleProblem
+
+class PuzzleBatchExpander:
+  '''
+  Expands blocks of states at once with NumPy, for searches that work a whole layer at a time.
+
+  A block is an array with a row of tiles per state. Successors are generated by swapping the blank
+  with its neighbours along each action for the whole block, and the misplaced tiles, Manhattan
+  distance and linear conflict heuristics are evaluated for the whole block from lookup tables.
+  Other heuristics are evaluated state by state.
+
+  Requires NumPy, which is an optional dependency.
+  '''
+
+  # The largest board supported: encoded states must fit in 64 bits.
+  MAX_CELLS = 16
+
+  # The problem of the states.
+  problem: PuzzleProblem
+
+  # The heuristic of the states.
+  heuristic: PuzzleHeuristic
+
+  # The target index of each action from each blank index, or -1 when the action is not valid.
+  __targets: Any
+
+  # The bit offset of each cell in an encoded state.
+  __shifts: Any
+
+  # The lookup tables of the heuristic, if it is evaluated by block. See `__build_tables`.
+  __tables: dict[str, Any]
+
+  def __init__(self, problem: PuzzleProblem, heuristic: PuzzleHeuristic):
+    if (numpy is None):
+      raise ImportError('Batch expansion requires NumPy')
+
+    if (problem.cells > PuzzleBatchExpander.MAX_CELLS):
+      raise AssertionError(f'Batch expansion is limited to boards of {PuzzleBatchExpander.MAX_CELLS} cells')
+
+    self.problem = problem
+    self.heuristic = heuristic
+    self.__targets = numpy.full((len(PuzzleAction), problem.cells), -1, dtype=numpy.int64)
+
+    for blank, moves in enumerate(PuzzleProblem.get_move_table(problem.rows, problem.columns)):
+      for (action, target) in moves:
+        self.__targets[action.value, blank] = target
+
+    self.__shifts = numpy.arange(problem.cells, dtype=numpy.uint64) * numpy.uint64(problem.tile_bits)
+    self.__tables = self.__build_tables()
+
+  def decode(self, states: Any) -> Any:
+    '''
+    Get the tiles of a block of encoded states.
+    '''
+    mask = numpy.uint64((1 << self.problem.tile_bits) - 1)
+
+    return ((states[:, None] >> self.__shifts) & mask).astype(numpy.uint8)
+
+  def encode(self, tiles: Any) -> Any:
+    '''
+    Get the encoded states of a block of tiles.
+    '''
+    # The tiles take disjoint bits, so adding them is the same as combining their bits.
+    return (tiles.astype(numpy.uint64) << self.__shifts).sum(axis=1, dtype=numpy.uint64)
+
+  def expand(self, tiles: Any, blanks: Any) -> tuple[Any, Any, Any, Any]:
+    '''
+    Generate the successors of a block of states, given their tiles and blank indexes.
+
+    Returns the tiles and blank indexes of the successors, along with the index of the state each
+    one was generated from and the value of the action that generated it.
+    '''
+    child_tiles = []
+    child_blanks = []
+    parents = []
+    actions = []
+
+    for action in PuzzleAction:
+      targets = self.__targets[action.value, blanks]
+      (action_parents,) = numpy.nonzero(targets >= 0)
+      action_targets = targets[action_parents]
+      action_blanks = blanks[action_parents]
+      rows = numpy.arange(len(action_parents))
+
+      # Move the target tiles into the blank cells.
+      action_tiles = tiles[action_parents]
+      action_tiles[rows, action_blanks] = action_tiles[rows, action_targets]
+      action_tiles[rows, action_targets] = 0
+
+      child_tiles.append(action_tiles)
+      child_blanks.append(action_targets)
+      parents.append(action_parents)
+      actions.append(numpy.full(len(action_parents), action.value, dtype=numpy.int8))
+
+    return (numpy.concatenate(child_tiles), numpy.concatenate(child_blanks), numpy.concatenate(parents), numpy.concatenate(actions))
+
+  def estimate(self, tiles: Any) -> Any:
+    '''
+    Estimate the cost to reach the goal from a block of states, given their tiles.
+    '''
+    tables = self.__tables
+
+    if (len(tables) == 0):
+      states = self.encode(tiles)
+
+      return numpy.fromiter((self.heuristic.estimate(state) for state in states.tolist()), dtype=numpy.int64, count=len(states))
+
+    cells = numpy.arange(self.problem.cells)
+    costs = tables['costs'][tiles, cells].sum(axis=1)
+
+    if ('row_keys' in tables):
+      (rows, columns) = (self.problem.rows, self.problem.columns)
+      row_codes = (tables['row_keys'][tiles, cells].reshape(-1, rows, columns) * tables['row_weights']).sum(axis=2)
+      column_codes = (tables['column_keys'][tiles, cells].reshape(-1, rows, columns) * tables['column_weights']).sum(axis=1)
+      costs += 2 * (tables['row_removals'][row_codes].sum(axis=1) + tables['column_removals'][column_codes].sum(axis=1))
+
+    return costs
+
+  def __build_tables(self) -> dict[str, Any]:
+    '''
+    Build the lookup tables of the heuristic, if it can be evaluated by block.
+
+    The cost of each tile in each cell is looked up in `costs`. For the linear conflict, each line
+    of a state is coded by the goal position of its tiles that belong to it, and the number of tiles
+    to remove from the line is looked up by code.
+    '''
+    heuristic = self.heuristic
+    (rows, columns, cells) = (self.problem.rows, self.problem.columns, self.problem.cells)
+
+    if (type(heuristic) is MisplacedTilesHeuristic):
+      costs = [[int(tile != 0 and heuristic.goal_indexes[tile] != index) for index in range(cells)] for tile in range(cells)]
+
+      return {'costs': numpy.array(costs, dtype=numpy.int64)}
+
+    if (type(heuristic) is ManhattanDistanceHeuristic):
+      return {'costs': numpy.array(heuristic.distances, dtype=numpy.int64)}
+
+    if (type(heuristic) is not LinearConflictHeuristic):
+      return {}
+
+    # The goal column of each tile in each cell of its goal row, and the goal row of each tile in
+    # each cell of its goal column. Other tiles take the code of a tile that does not belong.
+    row_keys = numpy.full((cells, cells), columns, dtype=numpy.int64)
+    column_keys = numpy.full((cells, cells), rows, dtype=numpy.int64)
+
+    for tile in range(1, cells):
+      (goal_row, goal_column) = divmod(heuristic.goal_indexes[tile], columns)
+
+      for index in range(cells):
+        (row, column) = divmod(index, columns)
+
+        if (row == goal_row):
+          row_keys[tile, index] = goal_column
+
+        if (column == goal_column):
+          column_keys[tile, index] = goal_row
+
+    return {
+      'costs': numpy.array(heuristic.distances, dtype=numpy.int64),
+      'row_keys': row_keys,
+      'row_weights': (columns + 1) ** numpy.arange(columns, dtype=numpy.int64),
+      'row_removals': _build_removals(columns),
+      'column_keys': column_keys,
+      'column_weights': ((rows + 1) ** numpy.arange(rows, dtype=numpy.int64))[:, None],
+      'column_removals': _build_removals(rows),
+    }
+
+def _build_removals(line_size: int) -> Any:
+  '''
+  Build the number of tiles to remove from a line so the rest are in goal order, by line code.
+
+  A line code has a base line_size + 1 digit per cell, lowest first: the goal position of the tile
+  in the line, or line_size for a tile that does not belong to the line.
+  '''
+  removals = numpy.zeros((line_size + 1) ** line_size, dtype=numpy.int64)
+
+  for code, digits in enumerate(itertools.product(range(line_size + 1), repeat=line_size)):
+    # The product enumerates the highest digit first.
+    positions = [position for position in reversed(digits) if position < line_size]
+    removals[code] = len(positions) - longest_increasing_subsequence(positions)
+
+  return removals
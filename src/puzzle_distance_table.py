@@ -0,0 +1,215 @@
+from collections import deque
+import math
+import mmap
+import os
+import struct
+from typing import Optional, Union
+
+from puzzle_problem import PuzzleAction, PuzzleProblem, PuzzleState
+
+class PuzzleDistanceTable:
+  '''
+  The distance to a goal state and the first action of a shortest path from every state of a board.
+
+  Each state takes one byte, indexed by permutation rank: the distance in the high 6 bits and the
+  action in the low 2 bits. States that cannot reach the goal are marked as unreachable.
+  '''
+
+  # The largest board with a distance table: 9! bytes for the 8-puzzle.
+  MAX_CELLS = 9
+
+  # The entry of the states that cannot reach the goal.
+  UNREACHABLE = 255
+
+  # The identifier at the start of a distance table file.
+  FILE_MAGIC = b'PDT1'
+
+  # The layout of the file header: magic, rows and columns.
+  FILE_HEADER = struct.Struct('<4sBB')
+
+  # The distance tables already built or loaded, by goal. See `create`.
+  __tables: dict[tuple[PuzzleState, int, int], 'PuzzleDistanceTable'] = {}
+
+  # The distance table files already loaded. See `find`.
+  __loaded_paths: set[str] = set()
+
+  # The goal state of the board.
+  goal_state: list[list[int]]
+
+  # The number of cells of the board.
+  cells: int
+
+  # The entry of each state, by rank. Memory-mapped when loaded from a file.
+  entries: Union[bytearray, memoryview]
+
+  def __init__(self, goal_state: list[list[int]], entries: Union[bytearray, memoryview]):
+    self.goal_state = goal_state
+    self.cells = len(goal_state) * len(goal_state[0])
+    self.entries = entries
+
+  @staticmethod
+  def create(goal_state: list[list[int]], paths: Optional[list[str]] = None) -> 'PuzzleDistanceTable':
+    '''
+    Get the distance table of the goal state: loaded from the first of the files built for it, if any, or built.
+
+    Tables are loaded or built once per goal and shared by every problem.
+    '''
+    table = PuzzleDistanceTable.find(goal_state, paths)
+
+    if (table is None):
+      table = PuzzleDistanceTable.build(goal_state)
+      PuzzleDistanceTable.__tables[PuzzleDistanceTable.__key(goal_state)] = table
+
+    return table
+
+  @staticmethod
+  def find(goal_state: list[list[int]], paths: Optional[list[str]] = None) -> Optional['PuzzleDistanceTable']:
+    '''
+    Get the distance table of the goal state if it was already built or loaded, or if one of the
+    files was built for it, without building it.
+
+    Each file is loaded once, and the first file of each goal wins.
+    '''
+    for path in (paths or []):
+      if (path not in PuzzleDistanceTable.__loaded_paths):
+        table = PuzzleDistanceTable.load(path)
+        PuzzleDistanceTable.__tables.setdefault(PuzzleDistanceTable.__key(table.goal_state), table)
+        PuzzleDistanceTable.__loaded_paths.add(path)
+
+    return PuzzleDistanceTable.__tables.get(PuzzleDistanceTable.__key(goal_state))
+
+  @staticmethod
+  def __key(goal_state: list[list[int]]) -> tuple[PuzzleState, int, int]:
+    '''
+    Get the key of the table of a goal state.
+    '''
+    return (PuzzleProblem.encode_state(goal_state), len(goal_state), len(goal_state[0]))
+
+  @staticmethod
+  def build(goal_state: list[list[int]]) -> 'PuzzleDistanceTable':
+    '''
+    Build the distance table of the goal state with a backward breadth-first search from it.
+    '''
+    rows = len(goal_state)
+    columns = len(goal_state[0])
+    cells = rows * columns
+
+    if (cells > PuzzleDistanceTable.MAX_CELLS):
+      raise AssertionError(f'Distance tables are limited to boards of {PuzzleDistanceTable.MAX_CELLS} cells')
+
+    move_table = PuzzleProblem.get_move_table(rows, columns)
+    tile_bits = PuzzleProblem.get_tile_bits(cells)
+    entries = bytearray([PuzzleDistanceTable.UNREACHABLE]) * math.factorial(cells)
+
+    state = PuzzleProblem.encode_state(goal_state)
+    entries[PuzzleProblem.rank_state(state, cells)] = 0
+
+    # The states to expand, with their blank index and distance.
+    queue: deque[tuple[PuzzleState, int, int]] = deque([(state, PuzzleProblem.get_blank_index(state, cells), 0)])
+
+    while len(queue) > 0:
+      (state, blank, distance) = queue.popleft()
+
+      for (action, target) in move_table[blank]:
+        tile = PuzzleProblem.get_tile(state, target, tile_bits)
+        child_state = state - (tile << (target * tile_bits)) + (tile << (blank * tile_bits))
+        child_rank = PuzzleProblem.rank_state(child_state, cells)
+
+        if (entries[child_rank] == PuzzleDistanceTable.UNREACHABLE):
+          # The reverse action leads from the child state back towards the goal.
+          entries[child_rank] = ((distance + 1) << 2) | action.reverse().value
+          queue.append((child_state, target, distance + 1))
+
+    return PuzzleDistanceTable(goal_state, entries)
+
+  @staticmethod
+  def get_path(goal_state: list[list[int]], directory: str) -> str:
+    '''
+    Get the file of the table of the goal state in the directory, building and saving it if missing,
+    so it is built once and shared by every process and run that loads it.
+    '''
+    (rows, columns) = (len(goal_state), len(goal_state[0]))
+    goal_name = '-'.join(str(tile) for row in goal_state for tile in row)
+    path = os.path.join(directory, f'pdt-{rows}x{columns}-{goal_name}.bin')
+    os.makedirs(directory, exist_ok=True)
+
+    if (not os.path.exists(path)):
+      PuzzleDistanceTable.create(goal_state).save(path)
+
+    return path
+
+  @staticmethod
+  def load(path: str) -> 'PuzzleDistanceTable':
+    '''
+    Load a table saved with `save`.
+
+    The entries are memory-mapped read-only, so every process that loads the same file shares its pages.
+    Raises an `AssertionError` if the file is not a distance table, or does not hold an entry per state.
+    '''
+    with open(path, 'rb') as file:
+      if (os.fstat(file.fileno()).st_size < PuzzleDistanceTable.FILE_HEADER.size):
+        raise AssertionError(f'Invalid distance table file: {path}')
+
+      entries = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (magic, rows, columns) = PuzzleDistanceTable.FILE_HEADER.unpack_from(entries)
+
+    if (magic != PuzzleDistanceTable.FILE_MAGIC or rows * columns > PuzzleDistanceTable.MAX_CELLS):
+      raise AssertionError(f'Invalid distance table file: {path}')
+
+    offset = PuzzleDistanceTable.FILE_HEADER.size
+    goal_tiles = list(entries[offset:offset + rows * columns])
+    offset += rows * columns
+
+    # A truncated file would otherwise fail in the middle of a lookup.
+    if (len(entries) != offset + math.factorial(rows * columns)):
+      raise AssertionError(f'Truncated distance table file: {path}')
+
+    goal_state = [goal_tiles[i:i+columns] for i in range(0, len(goal_tiles), columns)]
+
+    return PuzzleDistanceTable(goal_state, memoryview(entries)[offset:])
+
+  def save(self, path: str) -> None:
+    '''
+    Save the table to a file. The file is written under a temporary name and then renamed, so
+    processes loading it never see a partial file.
+    '''
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+
+    with open(temporary_path, 'wb') as file:
+      file.write(PuzzleDistanceTable.FILE_HEADER.pack(PuzzleDistanceTable.FILE_MAGIC, len(self.goal_state), len(self.goal_state[0])))
+      file.write(bytes(tile for row in self.goal_state for tile in row))
+      file.write(self.entries)
+
+    os.replace(temporary_path, path)
+
+  def get_distance(self, state: PuzzleState) -> Optional[int]:
+    '''
+    Get the distance from the state to the goal, or None if the goal cannot be reached.
+    '''
+    entry = self.entries[PuzzleProblem.rank_state(state, self.cells)]
+
+    return None if entry == PuzzleDistanceTable.UNREACHABLE else entry >> 2
+
+  def get_actions(self, problem: PuzzleProblem) -> Optional[list[PuzzleAction]]:
+    '''
+    Get the actions of a shortest path from the initial state of the problem to the goal, or None if
+    the goal cannot be reached.
+    '''
+    state = problem.encoded_initial_state
+    blank = PuzzleProblem.get_blank_index(state, problem.cells)
+    actions: list[PuzzleAction] = []
+
+    while not problem.goal_test(state):
+      entry = self.entries[PuzzleProblem.rank_state(state, self.cells)]
+
+      if (entry == PuzzleDistanceTable.UNREACHABLE):
+        return None
+
+      action = PuzzleAction(entry & 3)
+      target = next(target for (move_action, target) in problem.moves(blank) if move_action == action)
+      (_, state) = problem.result(state, blank, target)
+      blank = target
+      actions.append(action)
+
+    return actions
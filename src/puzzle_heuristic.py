@@ -0,0 +1,464 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from enum import Enum
+import os
+from typing import Optional
+
+from puzzle_pattern_database import PuzzlePatternDatabase
+from puzzle_problem import PuzzleProblem, PuzzleState
+from puzzle_symmetry import PuzzleSymmetry
+
+class PuzzleHeuristicType(Enum):
+  '''
+  The type of heuristic for the puzzle problem.
+  '''
+  MISPLACED_TILES = 0
+  MANHATTAN_DISTANCE = 1
+  LINEAR_CONFLICT = 2
+  WALKING_DISTANCE = 3
+  PATTERN_DATABASE = 4
+
+class PuzzleHeuristic(ABC):
+  '''
+  An admissible estimate of the cost to reach a goal state.
+  '''
+
+  # The largest number of heuristics kept for reuse. See `create`.
+  MAX_CACHED_HEURISTICS = 64
+
+  # The heuristics built most recently, by type, goal and pattern database files, least recently used first. See `create`.
+  __heuristics: OrderedDict[tuple[PuzzleHeuristicType, PuzzleState, int, int, tuple[str, ...]], 'PuzzleHeuristic'] = OrderedDict()
+
+  # The goal state of the board.
+  goal_state: list[list[int]]
+
+  # The number of rows of the board.
+  rows: int
+
+  # The number of columns of the board.
+  columns: int
+
+  # The number of cells of the board.
+  cells: int
+
+  # The row-major index of the goal cell of each tile.
+  goal_indexes: list[int]
+
+  def __init__(self, goal_state: list[list[int]]):
+    self.goal_state = goal_state
+    self.rows = len(goal_state)
+    self.columns = len(goal_state[0])
+    self.cells = self.rows * self.columns
+    self.goal_indexes = [0] * self.cells
+
+    for index, tile in enumerate(tile for row in goal_state for tile in row):
+      self.goal_indexes[tile] = index
+
+  @staticmethod
+  def create(type: PuzzleHeuristicType, goal_state: list[list[int]], pattern_database_paths: Optional[list[str]] = None) -> 'PuzzleHeuristic':
+    '''
+    Get the heuristic of the given type for the goal state.
+
+    Pattern database heuristics load their databases from the given files, if any, instead of building them.
+    Heuristics are shared by every problem with the same goal, and the `MAX_CACHED_HEURISTICS` used
+    most recently are kept. Their largest tables are shared across goals, and outlive them.
+    '''
+    paths = tuple(pattern_database_paths or []) if type == PuzzleHeuristicType.PATTERN_DATABASE else ()
+    key = (type, PuzzleProblem.encode_state(goal_state), len(goal_state), len(goal_state[0]), paths)
+    heuristics = PuzzleHeuristic.__heuristics
+    heuristic = heuristics.get(key)
+
+    if (heuristic is not None):
+      heuristics.move_to_end(key)
+
+      return heuristic
+
+    if (len(paths) > 0):
+      heuristic = PatternDatabaseHeuristic(goal_state, [PuzzlePatternDatabase.load(path) for path in paths])
+    else:
+      heuristic = _heuristic_classes[type](goal_state)
+
+    heuristics[key] = heuristic
+
+    # Drop the least recently used heuristic.
+    if (len(heuristics) > PuzzleHeuristic.MAX_CACHED_HEURISTICS):
+      heuristics.popitem(last=False)
+
+    return heuristic
+
+  @abstractmethod
+  def estimate(self, state: PuzzleState) -> int:
+    '''
+    Estimate the cost to reach the goal from the state.
+    '''
+
+  def update(self, cost_to_goal: int, state: PuzzleState, tile: int, from_index: int, to_index: int) -> int:
+    '''
+    Estimate the cost to reach the goal from a state reached by moving a tile between two cells,
+    given the estimate of the previous state.
+    '''
+    return self.estimate(state)
+
+class MisplacedTilesHeuristic(PuzzleHeuristic):
+  '''
+  The number of tiles out of their goal cell.
+  '''
+
+  def estimate(self, state: PuzzleState) -> int:
+    goal_indexes = self.goal_indexes
+
+    return sum(1 for index, tile in enumerate(PuzzleProblem.get_tiles(state, self.cells)) if tile != 0 and goal_indexes[tile] != index)
+
+  def update(self, cost_to_goal: int, state: PuzzleState, tile: int, from_index: int, to_index: int) -> int:
+    goal_index = self.goal_indexes[tile]
+
+    return cost_to_goal - (from_index != goal_index) + (to_index != goal_index)
+
+class ManhattanDistanceHeuristic(PuzzleHeuristic):
+  '''
+  The sum of the distances of the tiles to their goal cells.
+  '''
+
+  # The Manhattan distance of each tile from each cell to its goal cell, indexed by tile and cell.
+  distances: list[list[int]]
+
+  def __init__(self, goal_state: list[list[int]]):
+    super().__init__(goal_state)
+
+    cells = self.cells
+    self.distances = [[0] * cells for _ in range(cells)]
+
+    # The blank tile is always at distance 0.
+    for tile in range(1, cells):
+      (goal_x, goal_y) = divmod(self.goal_indexes[tile], self.columns)
+
+      for index in range(cells):
+        (x, y) = divmod(index, self.columns)
+        self.distances[tile][index] = abs(x - goal_x) + abs(y - goal_y)
+
+  def estimate(self, state: PuzzleState) -> int:
+    distances = self.distances
+
+    return sum(distances[tile][index] for index, tile in enumerate(PuzzleProblem.get_tiles(state, self.cells)))
+
+  def update(self, cost_to_goal: int, state: PuzzleState, tile: int, from_index: int, to_index: int) -> int:
+    distances = self.distances[tile]
+
+    return cost_to_goal - distances[from_index] + distances[to_index]
+
+class LinearConflictHeuristic(ManhattanDistanceHeuristic):
+  '''
+  The Manhattan distance plus two moves for each tile that must leave its goal row or column
+  to let other tiles of that line pass.
+  '''
+
+  def estimate(self, state: PuzzleState) -> int:
+    tiles = PuzzleProblem.get_tiles(state, self.cells)
+
+    return super().estimate(state) + 2 * (self.__count_row_removals(tiles) + self.__count_column_removals(tiles))
+
+  def update(self, cost_to_goal: int, state: PuzzleState, tile: int, from_index: int, to_index: int) -> int:
+    return self.estimate(state)
+
+  def __count_row_removals(self, tiles: list[int]) -> int:
+    '''
+    Count the tiles to remove from their goal rows so the rest are in goal order.
+    '''
+    removals = 0
+
+    for row in range(self.rows):
+      # The goal columns of the tiles of the row that belong to it, in board order.
+      goal_columns: list[int] = []
+
+      for index in range(row * self.columns, (row + 1) * self.columns):
+        tile = tiles[index]
+
+        if (tile != 0 and self.goal_indexes[tile] // self.columns == row):
+          goal_columns.append(self.goal_indexes[tile] % self.columns)
+
+      removals += len(goal_columns) - longest_increasing_subsequence(goal_columns)
+
+    return removals
+
+  def __count_column_removals(self, tiles: list[int]) -> int:
+    '''
+    Count the tiles to remove from their goal columns so the rest are in goal order.
+    '''
+    removals = 0
+
+    for column in range(self.columns):
+      # The goal rows of the tiles of the column that belong to it, in board order.
+      goal_rows: list[int] = []
+
+      for index in range(column, self.cells, self.columns):
+        tile = tiles[index]
+
+        if (tile != 0 and self.goal_indexes[tile] % self.columns == column):
+          goal_rows.append(self.goal_indexes[tile] // self.columns)
+
+      removals += len(goal_rows) - longest_increasing_subsequence(goal_rows)
+
+    return removals
+
+class WalkingDistanceHeuristic(PuzzleHeuristic):
+  '''
+  The walking distance: the number of vertical moves needed to bring every tile to its goal row,
+  plus the number of horizontal moves needed to bring every tile to its goal column, where each
+  is solved exactly on a relaxed board that only tracks how many tiles of each goal line are in
+  each line.
+
+  The tables grow quickly with the board: about 25,000 relaxed states on 4x4 boards, built in a
+  fraction of a second, but too many to build on 5x5 boards. Boards larger than `MAX_CELLS` have no
+  walking distance.
+  '''
+
+  # The largest board with walking distances: 16 cells for the 15-puzzle.
+  MAX_CELLS = 16
+
+  # The walking distances of each board, by line count, line size and goal blank line. They only
+  # depend on the line of the blank in the goal, so they are shared by every goal with it.
+  __distances: dict[tuple[int, int, int], dict[tuple[tuple[int, ...], int], int]] = {}
+
+  # The walking distances of the rows, by line counts and blank row.
+  row_distances: dict[tuple[tuple[int, ...], int], int]
+
+  # The walking distances of the columns, by line counts and blank column.
+  column_distances: dict[tuple[tuple[int, ...], int], int]
+
+  def __init__(self, goal_state: list[list[int]]):
+    super().__init__(goal_state)
+
+    if (self.cells > WalkingDistanceHeuristic.MAX_CELLS):
+      raise ValueError(f'Walking distances are limited to boards of {WalkingDistanceHeuristic.MAX_CELLS} cells')
+
+    (blank_row, blank_column) = divmod(self.goal_indexes[0], self.columns)
+    self.row_distances = WalkingDistanceHeuristic.__get_distances(self.rows, self.columns, blank_row)
+    self.column_distances = WalkingDistanceHeuristic.__get_distances(self.columns, self.rows, blank_column)
+
+  @staticmethod
+  def __get_distances(line_count: int, line_size: int, goal_blank_line: int) -> dict[tuple[tuple[int, ...], int], int]:
+    '''
+    Get the walking distances of a board, built once per board and goal blank line.
+    '''
+    key = (line_count, line_size, goal_blank_line)
+    distances = WalkingDistanceHeuristic.__distances.get(key)
+
+    if (distances is None):
+      distances = _build_walking_distances(line_count, line_size, goal_blank_line)
+      WalkingDistanceHeuristic.__distances[key] = distances
+
+    return distances
+
+  def estimate(self, state: PuzzleState) -> int:
+    row_counts = [0] * (self.rows * self.rows)
+    column_counts = [0] * (self.columns * self.columns)
+    blank_row = 0
+    blank_column = 0
+
+    for index, tile in enumerate(PuzzleProblem.get_tiles(state, self.cells)):
+      (row, column) = divmod(index, self.columns)
+
+      if (tile == 0):
+        blank_row = row
+        blank_column = column
+        continue
+
+      (goal_row, goal_column) = divmod(self.goal_indexes[tile], self.columns)
+      row_counts[row * self.rows + goal_row] += 1
+      column_counts[column * self.columns + goal_column] += 1
+
+    return self.row_distances[(tuple(row_counts), blank_row)] + self.column_distances[(tuple(column_counts), blank_column)]
+
+class PatternDatabaseHeuristic(PuzzleHeuristic):
+  '''
+  The sum of the exact costs of moving each disjoint group of tiles (pattern) to its goal cells,
+  counting only the moves of the tiles of the pattern. See `PuzzlePatternDatabase`.
+
+  Unless given, the databases are built for the canonical goal (see `PuzzleSymmetry.canonicalize_goal`)
+  and shared by every goal with the blank in a symmetric cell. States are mapped to the canonical
+  board as they are estimated.
+
+  The databases of the 8-puzzle build in about a second, so they are built on first use. Those of
+  larger boards are not: a database of 6 tiles on a 4x4 board holds 16 x 15 x ... x 11 placements
+  of 16 blank cells each, about 92 million entries, and takes tens of minutes to build in Python.
+  They must be built ahead with `get_database_paths` (see `--build-pattern-databases`). Boards
+  larger than `MAX_CELLS` have no default patterns.
+  '''
+
+  # The largest board with default patterns: 16 cells for the 15-puzzle.
+  MAX_CELLS = 16
+
+  # The largest board whose databases are built on first use: 9 cells for the 8-puzzle.
+  MAX_BUILT_CELLS = 9
+
+  # The databases built so far, by canonical goal.
+  __databases: dict[tuple[PuzzleState, int, int], list[PuzzlePatternDatabase]] = {}
+
+  # The database of each pattern.
+  databases: list[PuzzlePatternDatabase]
+
+  # The cell of the board of the databases of each cell, by row-major index.
+  database_cells: list[int]
+
+  # The tile of the board of the databases of each tile.
+  database_tiles: list[int]
+
+  def __init__(self, goal_state: list[list[int]], databases: Optional[list[PuzzlePatternDatabase]] = None):
+    super().__init__(goal_state)
+
+    if (databases is None):
+      (database_goal_state, symmetry) = PuzzleSymmetry.canonicalize_goal(goal_state)
+      databases = PatternDatabaseHeuristic.__get_databases(database_goal_state)
+      self.database_cells = symmetry.cells
+      self.database_tiles = symmetry.tiles
+    else:
+      database_goal_state = goal_state
+      self.database_cells = list(range(self.cells))
+      self.database_tiles = list(range(self.cells))
+
+    # Check that the databases were built for the goal state.
+    if any(database.goal_state != database_goal_state for database in databases):
+      raise AssertionError("Pattern database built for another goal state")
+
+    self.databases = databases
+
+  @staticmethod
+  def __get_databases(goal_state: list[list[int]]) -> list[PuzzlePatternDatabase]:
+    '''
+    Get the databases of the default patterns for the goal state, built once per goal.
+    '''
+    key = (PuzzleProblem.encode_state(goal_state), len(goal_state), len(goal_state[0]))
+    databases = PatternDatabaseHeuristic.__databases.get(key)
+
+    if (databases is None):
+      PatternDatabaseHeuristic.__check_build(len(goal_state) * len(goal_state[0]))
+      patterns = PatternDatabaseHeuristic.get_default_patterns(len(goal_state) * len(goal_state[0]))
+      databases = [PuzzlePatternDatabase.build(goal_state, pattern) for pattern in patterns]
+      PatternDatabaseHeuristic.__databases[key] = databases
+
+    return databases
+
+  @staticmethod
+  def get_database_paths(goal_state: list[list[int]], directory: str, build_large_boards: bool = False) -> list[str]:
+    '''
+    Get the files of the databases of the default patterns for the goal state in the directory,
+    building and saving the missing ones, so they are built once and shared by every process and
+    run that loads them.
+
+    The missing databases of boards larger than `MAX_BUILT_CELLS` are only built when asked to,
+    as they take too long to build during a search.
+    '''
+    (rows, columns) = (len(goal_state), len(goal_state[0]))
+    goal_name = '-'.join(str(tile) for row in goal_state for tile in row)
+    paths: list[str] = []
+    os.makedirs(directory, exist_ok=True)
+
+    for pattern in PatternDatabaseHeuristic.get_default_patterns(rows * columns):
+      path = os.path.join(directory, f'pdb-{rows}x{columns}-{goal_name}-p{"-".join(str(tile) for tile in pattern)}.bin')
+
+      if (not os.path.exists(path)):
+        if (not build_large_boards):
+          PatternDatabaseHeuristic.__check_build(rows * columns)
+
+        PuzzlePatternDatabase.build(goal_state, pattern).save(path)
+
+      paths.append(path)
+
+    return paths
+
+  @staticmethod
+  def get_default_patterns(cells: int) -> list[tuple[int, ...]]:
+    '''
+    Split the tiles in consecutive groups: two for the 8-puzzle, groups of six for larger boards,
+    such as 6-6-3 for the 15-puzzle.
+    '''
+    if (cells > PatternDatabaseHeuristic.MAX_CELLS):
+      raise ValueError(f'Pattern databases are limited to boards of {PatternDatabaseHeuristic.MAX_CELLS} cells')
+
+    tiles = list(range(1, cells))
+    pattern_size = (len(tiles) + 1) // 2 if cells <= PatternDatabaseHeuristic.MAX_BUILT_CELLS else 6
+
+    return [tuple(tiles[i:i+pattern_size]) for i in range(0, len(tiles), pattern_size)]
+
+  @staticmethod
+  def __check_build(cells: int) -> None:
+    '''
+    Refuse to build the databases of a board larger than `MAX_BUILT_CELLS` during a search.
+    '''
+    if (cells > PatternDatabaseHeuristic.MAX_BUILT_CELLS):
+      raise ValueError(
+        f'Pattern databases of boards larger than {PatternDatabaseHeuristic.MAX_BUILT_CELLS} cells take too long to build '
+        'during a search: build them with --build-pattern-databases and pass them with --pattern-database'
+      )
+
+  def estimate(self, state: PuzzleState) -> int:
+    positions = [0] * (self.cells)
+    database_cells = self.database_cells
+    database_tiles = self.database_tiles
+
+    for index, tile in enumerate(PuzzleProblem.get_tiles(state, self.cells)):
+      positions[database_tiles[tile]] = database_cells[index]
+
+    return sum(database.estimate(positions) for database in self.databases)
+
+# The heuristic class of each heuristic type.
+_heuristic_classes: dict[PuzzleHeuristicType, type[PuzzleHeuristic]] = {
+  PuzzleHeuristicType.MISPLACED_TILES: MisplacedTilesHeuristic,
+  PuzzleHeuristicType.MANHATTAN_DISTANCE: ManhattanDistanceHeuristic,
+  PuzzleHeuristicType.LINEAR_CONFLICT: LinearConflictHeuristic,
+  PuzzleHeuristicType.WALKING_DISTANCE: WalkingDistanceHeuristic,
+  PuzzleHeuristicType.PATTERN_DATABASE: PatternDatabaseHeuristic,
+}
+
+def longest_increasing_subsequence(items: list[int]) -> int:
+  '''
+  Get the length of the longest strictly increasing subsequence of the items.
+  '''
+  lengths: list[int] = []
+
+  for i, item in enumerate(items):
+    lengths.append(1 + max((lengths[j] for j in range(i) if items[j] < item), default=0))
+
+  return max(lengths, default=0)
+
+def _build_walking_distances(line_count: int, line_size: int, goal_blank_line: int) -> dict[tuple[tuple[int, ...], int], int]:
+  '''
+  Build the walking distances of a board with a breadth-first search from the goal.
+
+  A relaxed state counts, for each line and goal line, the tiles of the line that belong to the
+  goal line (flattened by line), along with the line of the blank tile. A move takes one tile
+  from a line next to the blank line into it.
+  '''
+  goal_counts = [0] * (line_count * line_count)
+
+  for line in range(line_count):
+    goal_counts[line * line_count + line] = line_size - (1 if line == goal_blank_line else 0)
+
+  start = (tuple(goal_counts), goal_blank_line)
+  distances = {start: 0}
+  queue: deque[tuple[tuple[int, ...], int]] = deque([start])
+
+  while len(queue) > 0:
+    state = queue.popleft()
+    (counts, blank_line) = state
+    distance = distances[state]
+
+    for line in (blank_line - 1, blank_line + 1):
+      if (line < 0 or line >= line_count):
+        continue
+
+      for goal_line in range(line_count):
+        if (counts[line * line_count + goal_line] == 0):
+          continue
+
+        # Move a tile of the goal line into the blank line. The blank takes its place.
+        child_counts = list(counts)
+        child_counts[line * line_count + goal_line] -= 1
+        child_counts[blank_line * line_count + goal_line] += 1
+        child = (tuple(child_counts), line)
+
+        if (child not in distances):
+          distances[child] = distance + 1
+          queue.append(child)
+
+  return distances
@@ -1,20 +1,29 @@
 from typing import Optional, Union
 
-from puzzle_problem import PuzzleAction, PuzzleProblem
+from puzzle_heuristic import PuzzleHeuristic
+from puzzle_problem import PuzzleAction, PuzzleProblem, PuzzleState
 
 class PuzzleNode:
   '''
   The node for the puzzle problem.
+
+  Searches create a node per generated state, so nodes are slotted and only keep the encoded state
+  and the link to their parent. Boards and paths are materialized on demand. See `get_states`.
   '''
 
+  __slots__ = ('state', 'blank', 'parent', 'action', 'path_cost', 'cost_to_goal')
+
   # The parent node.
   parent: Optional['PuzzleNode']
 
   # The action that led to this node.
   action: Optional[PuzzleAction]
 
-  # The state of the node.
-  state: list[list[int]]
+  # The encoded state of the node.
+  state: PuzzleState
+
+  # The index of the blank tile in the state.
+  blank: int
 
   # The path cost of the node. Usually noted as g(n)
   path_cost: int
@@ -22,40 +31,94 @@ class PuzzleNode:
   # The cost to reach the goal from the node. Usually noted as h(n)
   cost_to_goal: int
 
-  # The estimated cost of the cheapest solution from the node. Usually noted as f(n)
-  estimated_solution_cost: int
-
-  def __init__(self, state: list[list[int]], parent: Optional['PuzzleNode'] = None, action: Optional[PuzzleAction] = None, path_cost: int = 0, cost_to_goal: int = 0):
+  def __init__(self, state: PuzzleState, blank: int, parent: Optional['PuzzleNode'] = None, action: Optional[PuzzleAction] = None, path_cost: int = 0, cost_to_goal: int = 0):
     self.state = state
+    self.blank = blank
     self.parent = parent
     self.action = action
     self.path_cost = path_cost
     self.cost_to_goal = cost_to_goal
-    self.estimated_solution_cost = path_cost + cost_to_goal
-  
+
+  @property
+  def estimated_solution_cost(self) -> int:
+    '''
+    The estimated cost of the cheapest solution from the node. Usually noted as f(n)
+    '''
+    return self.path_cost + self.cost_to_goal
+
+  @staticmethod
+  def root_node(problem: PuzzleProblem, heuristic: Optional[PuzzleHeuristic] = None) -> 'PuzzleNode':
+    '''
+    Create the node of the initial state of the given problem.
+
+    The cost to the goal is estimated with the heuristic, if any.
+    '''
+    state = problem.encoded_initial_state
+    cost_to_goal = heuristic.estimate(state) if heuristic is not None else 0
+
+    return PuzzleNode(state, PuzzleProblem.get_blank_index(state, problem.cells), path_cost=0, cost_to_goal=cost_to_goal)
+
+  @staticmethod
+  def from_actions(problem: PuzzleProblem, actions: list[PuzzleAction]) -> 'PuzzleNode':
+    '''
+    Create the node reached by applying the actions to the initial state of the given problem.
+    '''
+    node = PuzzleNode.root_node(problem)
+
+    for action in actions:
+      target = next(target for (move_action, target) in problem.moves(node.blank) if move_action == action)
+      node = PuzzleNode.child_node(problem, node, action, target)
+
+    return node
+
   @staticmethod
-  def child_node(problem: PuzzleProblem, parent: 'PuzzleNode', action: PuzzleAction, calculate_cost_to_goal: bool = False) -> 'PuzzleNode':
+  def child_node(problem: PuzzleProblem, parent: 'PuzzleNode', action: PuzzleAction, target: int, heuristic: Optional[PuzzleHeuristic] = None) -> 'PuzzleNode':
     '''
-    Create a child node for the given problem, parent node, and action.
+    Create a child node for the given problem, parent node, and move (action and target index).
+
+    The cost to the goal is estimated with the heuristic, if any.
     '''
-    (step_cost, state) = problem.result(parent.state, action)
+    (step_cost, state) = problem.result(parent.state, parent.blank, target)
 
-    # Estimate the cost optionally.
-    cost_to_goal = problem.estimate_heuristic(state) if calculate_cost_to_goal else 0
+    # Estimate the cost optionally, from the parent cost and the moved tile.
+    cost_to_goal = 0
 
-    return PuzzleNode(state, parent, action, parent.path_cost + step_cost, cost_to_goal)
+    if (heuristic is not None):
+      tile = PuzzleProblem.get_tile(parent.state, target, problem.tile_bits)
+      cost_to_goal = heuristic.update(parent.cost_to_goal, state, tile, target, parent.blank)
+
+    return PuzzleNode(state, target, parent, action, parent.path_cost + step_cost, cost_to_goal)
   
-  def get_states(self) -> list[list[list[int]]]:
+  def get_states(self, problem: PuzzleProblem) -> list[list[list[int]]]:
     '''
     Get the list of states from root node to the current node.
     '''
-    states: list[list[int]] = []
+    states: list[list[list[int]]] = []
     current_node: Union[PuzzleNode, None] = self
 
     while (isinstance(current_node, PuzzleNode)):
-      states.insert(0,current_node.state)
+      states.append(PuzzleProblem.decode_state(current_node.state, problem.rows, problem.columns))
 
       # Set the parent as current node.
-      current_node = current_node.parent;
-    
-    return states
\ No newline at end of file
+      current_node = current_node.parent
+
+    states.reverse()
+
+    return states
+
+  def get_actions(self) -> list[PuzzleAction]:
+    '''
+    Get the list of actions from root node to the current node.
+    '''
+    actions: list[PuzzleAction] = []
+    current_node: Union[PuzzleNode, None] = self
+
+    while (isinstance(current_node, PuzzleNode) and current_node.action is not None):
+      actions.append(current_node.action)
+
+      # Set the parent as current node.
+      current_node = current_node.parent
+
+    actions.reverse()
+
+    return actions
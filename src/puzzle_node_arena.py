@@ -0,0 +1,75 @@
+from array import array
+from typing import Union
+
+from puzzle_problem import PuzzleAction, PuzzleProblem, PuzzleState
+
+class PuzzleNodeArena:
+  '''
+  The nodes of a search stored as parallel typed arrays, one entry per node, and referred to by index.
+
+  Unlike `PuzzleNode` objects, nodes take no allocation of their own: adding one appends a value to
+  each array, which grow geometrically. Encoded states that fit in 64 bits (boards of up to 16 cells)
+  are stored unboxed too.
+  '''
+
+  # The parent index of root nodes.
+  NO_PARENT = -1
+
+  # The action code of root nodes.
+  NO_ACTION = -1
+
+  # The encoded state of each node.
+  states: Union[array, list[PuzzleState]]
+
+  # The index of the blank tile of each node.
+  blanks: array
+
+  # The index of the parent of each node.
+  parents: array
+
+  # The code of the action that led to each node.
+  actions: array
+
+  # The path cost of each node. Usually noted as g(n)
+  path_costs: array
+
+  # The cost to reach the goal from each node. Usually noted as h(n)
+  costs_to_goal: array
+
+  def __init__(self, problem: PuzzleProblem):
+    self.states = array('Q') if problem.cells * problem.tile_bits <= 64 else []
+    self.blanks = array('B')
+    self.parents = array('i')
+    self.actions = array('b')
+    self.path_costs = array('i')
+    self.costs_to_goal = array('i')
+
+  def __len__(self) -> int:
+    return len(self.parents)
+
+  def add(self, state: PuzzleState, blank: int, parent: int, action: int, path_cost: int, cost_to_goal: int) -> int:
+    '''
+    Add a node and get its index.
+    '''
+    self.states.append(state)
+    self.blanks.append(blank)
+    self.parents.append(parent)
+    self.actions.append(action)
+    self.path_costs.append(path_cost)
+    self.costs_to_goal.append(cost_to_goal)
+
+    return len(self.parents) - 1
+
+  def get_actions(self, index: int) -> list[PuzzleAction]:
+    '''
+    Get the actions from the root node to the node.
+    '''
+    actions: list[PuzzleAction] = []
+
+    while (self.actions[index] != PuzzleNodeArena.NO_ACTION):
+      actions.append(PuzzleAction(self.actions[index]))
+      index = self.parents[index]
+
+    actions.reverse()
+
+    return actions
@@ -1,49 +1,89 @@
-from typing import Optional
+import heapq
+from typing import Callable, Optional
 
 from puzzle_node import PuzzleNode
+from puzzle_problem import PuzzleState
 
 class PuzzleNodePriorityQueue:
   '''
   A priority queue for puzzle nodes.
+
+  Backed by a binary heap with lazy deletion: removed or replaced nodes stay in the heap
+  until they reach the top, where they are skipped. A state-keyed index holds the live node
+  for every state in the queue.
+
+  Nodes are popped by lowest estimated solution cost, unless given another priority.
   '''
 
-  # The queue.
-  __queue: list[PuzzleNode] = []
+  # The heap of (priority, insertion order, node) entries.
+  __heap: list[tuple[float, int, PuzzleNode]]
+
+  # The live node for each state in the queue.
+  __nodes: dict[PuzzleState, PuzzleNode]
+
+  # The insertion counter. Breaks ties between equal costs in insertion order.
+  __counter: int
+
+  # The priority of each node, lowest first. None for the estimated solution cost.
+  __priority: Optional[Callable[[PuzzleNode], float]]
+
+  def __init__(self, priority: Optional[Callable[[PuzzleNode], float]] = None):
+    self.__heap = []
+    self.__nodes = {}
+    self.__counter = 0
+    self.__priority = priority
+
+  def __len__(self) -> int:
+    return len(self.__nodes)
 
   def empty(self) -> bool:
     '''
     Wether the queue is empty.
     '''
-    return len(self.__queue) == 0
+    return len(self.__nodes) == 0
 
   def append(self, node: PuzzleNode) -> None:
     '''
     Append a node to the queue.
     '''
-    self.__queue.append(node)
-    self.__queue.sort(key=lambda x: x.estimated_solution_cost)
+    self.__nodes[node.state] = node
+    priority = self.__priority(node) if self.__priority is not None else node.estimated_solution_cost
+    heapq.heappush(self.__heap, (priority, self.__counter, node))
+    self.__counter += 1
+
+  def count_appended(self) -> int:
+    '''
+    Get the number of nodes appended so far, replacements included.
+    '''
+    return self.__counter
 
   def pop(self) -> PuzzleNode:
     '''
-    Pop the node with the lowest estimated solution cost.
+    Pop the node with the lowest priority.
     '''
-    return self.__queue.pop(0)
+    while True:
+      (_, _, node) = heapq.heappop(self.__heap)
+
+      # Skip the entries of removed or replaced nodes.
+      if (self.__nodes.get(node.state) is node):
+        del self.__nodes[node.state]
+        return node
 
   def remove(self, node: PuzzleNode) -> None:
     '''
     Remove a node from the queue.
     '''
-    self.__queue.remove(node)
+    del self.__nodes[node.state]
 
   def replace(self, current_node: PuzzleNode, new_node: PuzzleNode) -> None:
     '''
     Replace a node in the queue.
     '''
-    self.__queue.remove(current_node)
+    self.remove(current_node)
     self.append(new_node)
 
-  def find_by_state(self, target_state: list[list[int]]) -> Optional[PuzzleNode]:
+  def find_by_state(self, target_state: PuzzleState) -> Optional[PuzzleNode]:
     '''
     Find a node in the queue that matches the target state.
     '''
-    return next((node for node in self.__queue if node.state == target_state), None)
\ No newline at end of file
+    return self.__nodes.get(target_state)
@@ -0,0 +1,178 @@
+from collections import deque
+import mmap
+import os
+import struct
+from typing import Union
+
+from puzzle_problem import PuzzleProblem
+
+class PuzzlePatternDatabase:
+  '''
+  The exact cost of moving a group of tiles (pattern) to its goal cells from every placement and
+  blank cell, counting only the moves of the tiles of the pattern.
+
+  The costs are stored one byte per placement and blank cell, indexed by the rank of the placement
+  (see `rank_placement`) and then by the blank cell. Keeping the blank cell, rather than the lowest
+  cost of the placement, keeps the heuristic consistent: the tiles of the pattern can wall the blank
+  off from the cells where the placement is cheapest, in which case a single move would lower the
+  lowest cost by more than one, and A* would close states before finding their shortest path.
+  '''
+
+  # The identifier at the start of a pattern database file.
+  FILE_MAGIC = b'PDB2'
+
+  # The layout of the file header: magic, rows, columns and pattern size.
+  FILE_HEADER = struct.Struct('<4sBBB')
+
+  # The goal state of the board.
+  goal_state: list[list[int]]
+
+  # The tiles of the pattern.
+  pattern: tuple[int, ...]
+
+  # The cost of each placement of the pattern and blank cell. Memory-mapped when loaded from a file.
+  costs: Union[bytearray, memoryview]
+
+  def __init__(self, goal_state: list[list[int]], pattern: tuple[int, ...], costs: Union[bytearray, memoryview]):
+    self.goal_state = goal_state
+    self.pattern = pattern
+    self.costs = costs
+
+  @staticmethod
+  def count_placements(pattern_size: int, cells: int) -> int:
+    '''
+    Get the number of placements of a pattern of the given size.
+    '''
+    placements = 1
+
+    for i in range(pattern_size):
+      placements *= cells - i
+
+    return placements
+
+  @staticmethod
+  def rank_placement(positions: list[int], cells: int) -> int:
+    '''
+    Rank the cells taken by the tiles of a pattern, in pattern order, among all the placements of the pattern.
+    '''
+    rank = 0
+
+    for i, position in enumerate(positions):
+      # The cells still free for the i-th tile, and the index of its cell among them.
+      free_cells = cells - i
+      free_index = position - sum(1 for previous in positions[:i] if previous < position)
+      rank = rank * free_cells + free_index
+
+    return rank
+
+  @staticmethod
+  def build(goal_state: list[list[int]], pattern: tuple[int, ...]) -> 'PuzzlePatternDatabase':
+    '''
+    Build the database of a pattern with a backward breadth-first search from the goal placement.
+
+    Moving the blank over a tile outside of the pattern is free, so the search visits the
+    placements of the pattern along with the blank cell, in 0-1 breadth-first order.
+    '''
+    rows = len(goal_state)
+    columns = len(goal_state[0])
+    cells = rows * columns
+    move_table = PuzzleProblem.get_move_table(rows, columns)
+    goal_tiles = [tile for row in goal_state for tile in row]
+    placements = PuzzlePatternDatabase.count_placements(len(pattern), cells)
+
+    # The cost of each placement along with the blank cell, indexed by placement rank and blank cell.
+    costs = bytearray([255]) * (placements * cells)
+
+    start = tuple(goal_tiles.index(tile) for tile in pattern)
+    start_blank = goal_tiles.index(0)
+    costs[PuzzlePatternDatabase.rank_placement(list(start), cells) * cells + start_blank] = 0
+
+    queue: deque[tuple[tuple[int, ...], int, int]] = deque([(start, start_blank, 0)])
+
+    while len(queue) > 0:
+      (positions, blank, cost) = queue.popleft()
+      rank = PuzzlePatternDatabase.rank_placement(list(positions), cells)
+
+      # Skip the stale entries of already settled states.
+      if (costs[rank * cells + blank] < cost):
+        continue
+
+      for (_, target) in move_table[blank]:
+        if (target in positions):
+          # Move a tile of the pattern into the blank cell.
+          child_positions = tuple(blank if position == target else position for position in positions)
+          child_rank = PuzzlePatternDatabase.rank_placement(list(child_positions), cells)
+          child_cost = cost + 1
+        else:
+          child_positions = positions
+          child_rank = rank
+          child_cost = cost
+
+        if (child_cost < costs[child_rank * cells + target]):
+          costs[child_rank * cells + target] = child_cost
+
+          if (child_cost == cost):
+            queue.appendleft((child_positions, target, child_cost))
+          else:
+            queue.append((child_positions, target, child_cost))
+
+    return PuzzlePatternDatabase(goal_state, pattern, costs)
+
+  @staticmethod
+  def load(path: str) -> 'PuzzlePatternDatabase':
+    '''
+    Load a database saved with `save`.
+
+    The costs are memory-mapped read-only, so every process that loads the same file shares its pages.
+    Raises an `AssertionError` if the file is not a database, or does not hold a cost per placement
+    and blank cell.
+    '''
+    with open(path, 'rb') as file:
+      if (os.fstat(file.fileno()).st_size < PuzzlePatternDatabase.FILE_HEADER.size):
+        raise AssertionError(f'Invalid pattern database file: {path}')
+
+      costs = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (magic, rows, columns, pattern_size) = PuzzlePatternDatabase.FILE_HEADER.unpack_from(costs)
+
+    if (magic != PuzzlePatternDatabase.FILE_MAGIC):
+      raise AssertionError(f'Invalid pattern database file: {path}')
+
+    offset = PuzzlePatternDatabase.FILE_HEADER.size
+    pattern = tuple(costs[offset:offset + pattern_size])
+    offset += pattern_size
+    goal_tiles = list(costs[offset:offset + rows * columns])
+    offset += rows * columns
+
+    # A truncated file would otherwise fail in the middle of a search.
+    if (len(costs) != offset + PuzzlePatternDatabase.count_placements(pattern_size, rows * columns) * rows * columns):
+      raise AssertionError(f'Truncated pattern database file: {path}')
+
+    goal_state = [goal_tiles[i:i+columns] for i in range(0, len(goal_tiles), columns)]
+
+    return PuzzlePatternDatabase(goal_state, pattern, memoryview(costs)[offset:])
+
+  def save(self, path: str) -> None:
+    '''
+    Save the database to a file. The file is written under a temporary name and then renamed, so
+    processes loading it never see a partial file.
+    '''
+    rows = len(self.goal_state)
+    columns = len(self.goal_state[0])
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+
+    with open(temporary_path, 'wb') as file:
+      file.write(PuzzlePatternDatabase.FILE_HEADER.pack(PuzzlePatternDatabase.FILE_MAGIC, rows, columns, len(self.pattern)))
+      file.write(bytes(self.pattern))
+      file.write(bytes(tile for row in self.goal_state for tile in row))
+      file.write(self.costs)
+
+    os.replace(temporary_path, path)
+
+  def estimate(self, positions: list[int]) -> int:
+    '''
+    Get the cost of the pattern given the cell of every tile, indexed by tile, the blank included.
+    '''
+    cells = len(positions)
+
+    return self.costs[PuzzlePatternDatabase.rank_placement([positions[tile] for tile in self.pattern], cells) * cells + positions[0]]
@@ -1,8 +1,6 @@
 from enum import Enum
 import random
 
-import helpers
-
 class PuzzleAction(Enum):
   '''
   The action of the puzzle problem.
@@ -12,20 +10,65 @@ class PuzzleAction(Enum):
   LEFT = 2
   RIGHT = 3
 
+  def reverse(self) -> 'PuzzleAction':
+    '''
+    Get the action that undoes this action.
+    '''
+    if (self == PuzzleAction.UP):
+      return PuzzleAction.DOWN
+
+    if (self == PuzzleAction.DOWN):
+      return PuzzleAction.UP
+
+    if (self == PuzzleAction.LEFT):
+      return PuzzleAction.RIGHT
+
+    return PuzzleAction.LEFT
+
+# The encoded state of the board. See `PuzzleProblem.encode_state`.
+PuzzleState = int
+
 class PuzzleProblem:
   '''
   The puzzle problem.
   '''
   
-  # The size of the board.
+  # The default size of the board.
   BOARD_SIZE = 3
 
+  # The moves for each blank index, by board rows and columns. See `get_move_table`.
+  __move_tables: dict[tuple[int, int], list[list[tuple[PuzzleAction, int]]]] = {}
+
   # The initial state of the board.
   initial_state: list[list[int]]
 
   # The goal state of the board.
   goal_state: list[list[int]]
 
+  # The number of rows of the board.
+  rows: int
+
+  # The number of columns of the board.
+  columns: int
+
+  # The number of cells of the board.
+  cells: int
+
+  # The number of bits used by each tile in an encoded state.
+  tile_bits: int
+
+  # The encoded initial state of the board.
+  encoded_initial_state: PuzzleState
+
+  # The encoded goal state of the board.
+  encoded_goal_state: PuzzleState
+
+  # The parity of the goal state, shared by every state that can reach it. See `can_reach_goal`.
+  goal_parity: int
+
+  # The moves for each blank index of the board.
+  __move_table: list[list[tuple[PuzzleAction, int]]]
+
   def __init__(self, initial_state: list[list[int]], goal_state: list[list[int]]):
     # Check if the initial state is a valid board.
     if not PuzzleProblem.is_valid_board(initial_state):
@@ -35,28 +78,42 @@ class PuzzleProblem:
     if not PuzzleProblem.is_valid_board(goal_state):
       raise AssertionError("Invalid goal state")
 
+    # Check if both boards have the same dimensions.
+    if (len(initial_state) != len(goal_state) or len(initial_state[0]) != len(goal_state[0])):
+      raise AssertionError("The initial and goal states have different dimensions")
+
     self.initial_state = initial_state
     self.goal_state = goal_state
+    self.rows = len(goal_state)
+    self.columns = len(goal_state[0])
+    self.cells = self.rows * self.columns
+    self.tile_bits = PuzzleProblem.get_tile_bits(self.cells)
+    self.encoded_initial_state = PuzzleProblem.encode_state(initial_state)
+    self.encoded_goal_state = PuzzleProblem.encode_state(goal_state)
+    self.goal_parity = PuzzleProblem.get_parity(goal_state)
+    self.__move_table = PuzzleProblem.get_move_table(self.rows, self.columns)
 
   @staticmethod
   def is_valid_board(state: list[list[int]]) -> bool:
     '''
-    Check if the board is a 3x3 grid of integers.
+    Check if the board is a grid of at least 2x2 integers.
     '''
 
-    # Check if the board has the correct number of rows.
-    if (len(state) != PuzzleProblem.BOARD_SIZE):
+    # Check if the board has enough rows.
+    if (len(state) < 2):
       return False
 
-    # Check if the board has the correct number of columns.
-    if (any(len(row) != PuzzleProblem.BOARD_SIZE for row in state)):
+    columns = len(state[0])
+
+    # Check if every row has the same number of columns, and enough of them.
+    if (columns < 2 or any(len(row) != columns for row in state)):
       return False
 
     tiles: set[int] = set()
 
-    max_tile = PuzzleProblem.BOARD_SIZE**2 - 1
+    max_tile = len(state) * columns - 1
 
-    # Check if the board contains only numbers between 0 and 8 and no duplicates.
+    # Check if the board contains only numbers between 0 and the number of cells minus one, and no duplicates.
     for row in state:
       for tile in row:
         if (tile < 0 or tile > max_tile) or (tile in tiles):
@@ -71,44 +128,186 @@ class PuzzleProblem:
   def can_reach_goal(initial_state: list[list[int]], goal_state: list[list[int]]) -> bool:
     '''
     Wether the initial state can reach the goal state.
+
+    Moves preserve the parity of the number of inversions on boards with an odd width. On boards with
+    an even width, each vertical move also flips that parity, so the row of the blank tile is added to it.
+    '''
+    return PuzzleProblem.get_parity(initial_state) == PuzzleProblem.get_parity(goal_state)
+
+  def is_solvable(self) -> bool:
+    '''
+    Wether the initial state can reach the goal state, with the parity of the goal computed with the problem. See `can_reach_goal`.
+    '''
+    return PuzzleProblem.get_parity(self.initial_state) == self.goal_parity
+
+  @staticmethod
+  def get_parity(state: list[list[int]]) -> int:
+    '''
+    Get the parity that is kept by every move of the board. See `can_reach_goal`.
+
+    The parity of the number of inversions of the tiles is the parity of the permutation that sorts
+    them, which is found in linear time from its cycles: a cycle of n tiles takes n - 1 swaps.
     '''
-    initial_tiles = [tile for row in initial_state for tile in row if tile != 0]
-    goal_tiles = [tile for row in goal_state for tile in row if tile != 0]
+    tiles = [tile for row in state for tile in row if tile != 0]
+    visited = bytearray(len(tiles))
+    swaps = 0
+
+    for start in range(len(tiles)):
+      if (visited[start]):
+        continue
+
+      # Follow the cycle from the cell to the goal rank of its tile, back to the cell.
+      index = start
+
+      while (not visited[index]):
+        visited[index] = 1
+        index = tiles[index] - 1
+        swaps += 1
+
+      swaps -= 1
 
-    # If the number of inversions is even, the board is solvable.
-    return helpers.count_inversions(initial_tiles) % 2 == helpers.count_inversions(goal_tiles) % 2
+    if (len(state[0]) % 2 == 0):
+      (blank_row, _) = PuzzleProblem.get_position(state, 0)
+      swaps += blank_row
+
+    return swaps % 2
 
   @staticmethod
-  def generate_random_state() -> list[list[int]]:
+  def generate_random_state(rows: int = BOARD_SIZE, columns: int = BOARD_SIZE) -> list[list[int]]:
     '''
     Generate a random board state.
     '''
-    tiles = list(range(PuzzleProblem.BOARD_SIZE**2))
+    tiles = list(range(rows * columns))
     random.shuffle(tiles)
 
-    return [tiles[i:i+PuzzleProblem.BOARD_SIZE] for i in range(0, len(tiles), PuzzleProblem.BOARD_SIZE)]
+    return [tiles[i:i+columns] for i in range(0, len(tiles), columns)]
 
   @staticmethod
   def generate_random_solvable_state(goal_state: list[list[int]]) -> list[list[int]]:
     '''
-    Generate a random solvable board state.
+    Generate a random solvable board state, uniformly among them.
     '''
-    while True:
-      state = PuzzleProblem.generate_random_state()
-
-      if (PuzzleProblem.can_reach_goal(state, goal_state)):
-        return state
+    return PuzzleProblem.__generate_random_state_with_parity(goal_state, PuzzleProblem.get_parity(goal_state))
 
   @staticmethod
   def generate_random_unsolvable_state(goal_state: list[list[int]]) -> list[list[int]]:
     '''
-    Generate a random unsolvable board state.
+    Generate a random unsolvable board state, uniformly among them.
+    '''
+    return PuzzleProblem.__generate_random_state_with_parity(goal_state, 1 - PuzzleProblem.get_parity(goal_state))
+
+  @staticmethod
+  def __generate_random_state_with_parity(goal_state: list[list[int]], parity: int) -> list[list[int]]:
+    '''
+    Generate a random board state with the given parity. See `get_parity`.
+
+    A random state has the other parity half of the time, and is then fixed by swapping its first
+    two tiles, which flips the parity. Swapping the same two cells pairs the states of both parities
+    one to one, so the states of the given parity are still equally likely.
+    '''
+    state = PuzzleProblem.generate_random_state(len(goal_state), len(goal_state[0]))
+
+    if (PuzzleProblem.get_parity(state) != parity):
+      cells = [(row, column) for row in range(len(state)) for column in range(len(state[0])) if state[row][column] != 0]
+      ((row_a, column_a), (row_b, column_b)) = (cells[0], cells[1])
+      (state[row_a][column_a], state[row_b][column_b]) = (state[row_b][column_b], state[row_a][column_a])
+
+    return state
+
+  @staticmethod
+  def generate_random_walk_state(goal_state: list[list[int]], moves: int) -> list[list[int]]:
+    '''
+    Generate a random solvable board state by making random moves from the goal state, never undoing
+    the previous move. The state can be solved in at most that many moves, and often exactly.
+    '''
+    (rows, columns) = (len(goal_state), len(goal_state[0]))
+    move_table = PuzzleProblem.get_move_table(rows, columns)
+    tiles = [tile for row in goal_state for tile in row]
+    blank = tiles.index(0)
+    previous_blank = -1
+
+    for _ in range(moves):
+      target = random.choice([target for (_, target) in move_table[blank] if target != previous_blank])
+      (tiles[blank], tiles[target]) = (tiles[target], tiles[blank])
+      (previous_blank, blank) = (blank, target)
+
+    return [tiles[i:i+columns] for i in range(0, len(tiles), columns)]
+
+  @staticmethod
+  def get_tile_bits(cells: int) -> int:
+    '''
+    Get the number of bits used by each tile in the encoded states of a board: 4 for the 8- and 15-puzzle.
+    '''
+    return (cells - 1).bit_length()
+
+  @staticmethod
+  def encode_state(state: list[list[int]]) -> PuzzleState:
+    '''
+    Encode the board as an integer with a fixed number of bits per tile, in row-major order.
+    '''
+    tile_bits = PuzzleProblem.get_tile_bits(len(state) * len(state[0]))
+    encoded_state = 0
+
+    for index, tile in enumerate(tile for row in state for tile in row):
+      encoded_state |= tile << (index * tile_bits)
+
+    return encoded_state
+
+  @staticmethod
+  def decode_state(encoded_state: PuzzleState, rows: int, columns: int) -> list[list[int]]:
+    '''
+    Decode an encoded state back into the board.
+    '''
+    tiles = PuzzleProblem.get_tiles(encoded_state, rows * columns)
+
+    return [tiles[i:i+columns] for i in range(0, len(tiles), columns)]
+
+  @staticmethod
+  def get_tiles(encoded_state: PuzzleState, cells: int) -> list[int]:
+    '''
+    Get the tiles of the encoded state in row-major order.
+    '''
+    tile_bits = PuzzleProblem.get_tile_bits(cells)
+
+    return [PuzzleProblem.get_tile(encoded_state, index, tile_bits) for index in range(cells)]
+
+  @staticmethod
+  def get_tile(encoded_state: PuzzleState, index: int, tile_bits: int) -> int:
+    '''
+    Get the tile at the row-major index of the encoded state.
+    '''
+    return (encoded_state >> (index * tile_bits)) & ((1 << tile_bits) - 1)
+
+  @staticmethod
+  def get_blank_index(encoded_state: PuzzleState, cells: int) -> int:
+    '''
+    Get the row-major index of the blank tile in the encoded state.
     '''
-    while True:
-      state = PuzzleProblem.generate_random_state()
+    return PuzzleProblem.get_tiles(encoded_state, cells).index(0)
 
-      if (not PuzzleProblem.can_reach_goal(state, goal_state)):
-        return state
+  @staticmethod
+  def rank_state(encoded_state: PuzzleState, cells: int) -> int:
+    '''
+    Rank the encoded state among all the permutations of its tiles, in lexicographic order.
+    '''
+    tile_bits = PuzzleProblem.get_tile_bits(cells)
+    tile_mask = (1 << tile_bits) - 1
+    rank = 0
+
+    # The tiles already ranked, as a bit set.
+    ranked_tiles = 0
+
+    # Rank the tiles in row-major order. The radix is the number of tiles not ranked yet.
+    for radix in range(cells, 0, -1):
+      tile = encoded_state & tile_mask
+      encoded_state >>= tile_bits
+
+      # The index of the tile among the tiles not ranked yet.
+      smaller_tiles = (1 << tile) - 1
+      rank = rank * radix + tile - (ranked_tiles & smaller_tiles).bit_count()
+      ranked_tiles |= smaller_tiles + 1
+
+    return rank
 
   @staticmethod
   def get_position(state: list[list[int]], target_tile: int) -> tuple[int, int]:
@@ -121,18 +320,11 @@ class PuzzleProblem:
           return (row_index, column_index)
 
   @staticmethod
-  def get_blank_tile_position(state: list[list[int]]) -> tuple[int, int]:
+  def get_swap_tile_position(blank: int, action: PuzzleAction, columns: int) -> tuple[int, int]:
     '''
-    Returns the position of the blank tile in the board.
+    Returns the position of the tile to swap with the blank tile at the given index from the action.
     '''
-    return PuzzleProblem.get_position(state, 0)
-
-  @staticmethod
-  def get_swap_tile_position(state: list[list[int]], action: PuzzleAction) -> tuple[int, int]:
-    '''
-    Returns the position of the tile to swap with the blank tile from the action.
-    '''
-    (x, y) = PuzzleProblem.get_blank_tile_position(state)
+    (x, y) = divmod(blank, columns)
 
     if (action == PuzzleAction.UP):
       return (x, y - 1)
@@ -147,60 +339,49 @@ class PuzzleProblem:
       return (x + 1, y)
 
   @staticmethod
-  def is_valid_position(x: int, y: int) -> bool:
+  def is_valid_position(x: int, y: int, rows: int, columns: int) -> bool:
     '''
     Check if the position is valid for the board.
     '''
-    return (x >= 0 and x <= PuzzleProblem.BOARD_SIZE - 1) and (y >= 0 and y <= PuzzleProblem.BOARD_SIZE - 1)
+    return (x >= 0 and x <= rows - 1) and (y >= 0 and y <= columns - 1)
 
   @staticmethod
-  def is_valid_action(state: list[list[int]], action: PuzzleAction) -> bool:
+  def is_valid_action(blank: int, action: PuzzleAction, rows: int, columns: int) -> bool:
     '''
-    Check if the action is valid for the board.
+    Check if the action is valid for the blank tile at the given index.
     '''
 
     # Find the tile to swap.
-    (x, y) = PuzzleProblem.get_swap_tile_position(state, action)
+    (x, y) = PuzzleProblem.get_swap_tile_position(blank, action, columns)
 
     # Check if the position is valid.
-    return PuzzleProblem.is_valid_position(x, y)
+    return PuzzleProblem.is_valid_position(x, y, rows, columns)
 
   @staticmethod
-  def actions(state: list[list[int]]) -> list[PuzzleAction]:
-    '''
-    Get the available actions for the board in the current state.
+  def get_move_table(rows: int, columns: int) -> list[list[tuple[PuzzleAction, int]]]:
     '''
-    return [action for action in PuzzleAction if PuzzleProblem.is_valid_action(state, action)]
+    Get the moves for each blank index of a board: the valid actions and the index of the tile they swap.
 
-  @staticmethod
-  def state_to_tuple(state: list[list[int]]) -> tuple[tuple[int, ...], ...]:
+    Tables are built once per board dimensions and shared by every problem.
     '''
-    Convert the state to a tuple.
-    '''
-    return tuple(tuple(row) for row in state)
-
-  def __get_manhattan_distance(self, state: list[list[int]]) -> int:
-    '''
-    Get the Manhattan distance of the state.
-    '''
-    distance: int = 0
+    move_table = PuzzleProblem.__move_tables.get((rows, columns))
 
-    for state_x, row in enumerate(state):
-      for state_y, tile in enumerate(row):
-        if (tile == 0):
-          continue
+    if (move_table is None):
+      move_table = []
 
-        (goal_x, goal_y) = self.get_position(self.goal_state, tile)
+      for blank in range(rows * columns):
+        moves: list[tuple[PuzzleAction, int]] = []
 
-        # Calculate the distance in the x-axis.
-        x_distance = 0 if state_x == goal_x else abs(state_x - goal_x)
+        for action in PuzzleAction:
+          if (PuzzleProblem.is_valid_action(blank, action, rows, columns)):
+            (x, y) = PuzzleProblem.get_swap_tile_position(blank, action, columns)
+            moves.append((action, x * columns + y))
 
-        # Calculate the distance in the y-axis.
-        y_distance = 0 if state_y == goal_y else abs(state_y - goal_y)
+        move_table.append(moves)
 
-        distance += x_distance + y_distance
+      PuzzleProblem.__move_tables[(rows, columns)] = move_table
 
-    return distance
+    return move_table
 
   @staticmethod
   def display_state(state: list[list[int]]) -> None:
@@ -208,39 +389,43 @@ class PuzzleProblem:
     Display the state.
     '''
     for row in state:
-      row_format = '|' + ' '.join(['{}'] * PuzzleProblem.BOARD_SIZE) + '|'
-      print(f'{row_format.format(*row)}') 
+      print(PuzzleProblem.format_row(row, len(state) * len(row)))
 
-  def estimate_heuristic(self, state: list[list[int]]) -> int:
+  @staticmethod
+  def format_row(row: list[int], cells: int) -> str:
     '''
-    Estimate the heuristic of the state.
+    Format a row of a board with cells of the same width.
     '''
-    return self.__get_manhattan_distance(state)
+    width = len(str(cells - 1))
+
+    return '|' + ' '.join(str(tile).rjust(width) for tile in row) + '|'
 
-  def goal_test(self, state: list[list[int]]) -> bool:
+  def actions(self, blank: int) -> list[PuzzleAction]:
     '''
-    Check if the state is the goal state.
+    Get the available actions for the blank tile at the given index.
     '''
-    return state == self.goal_state
+    return [action for (action, _) in self.__move_table[blank]]
 
-  def result(self, state: list[list[int]], action: PuzzleAction) -> tuple[int, list[list[int]]]:
+  def moves(self, blank: int) -> list[tuple[PuzzleAction, int]]:
     '''
-    Apply the action to the state and returns the step-cost and the new state.
+    Get the available actions for the blank tile at the given index, along with the index of the tile each one swaps.
     '''
-    if (PuzzleProblem.is_valid_action(state, action) is False):
-      return (0, state)
+    return self.__move_table[blank]
 
-    # Find the blank tile and the tile to swap.
-    (blank_x, blank_y) = PuzzleProblem.get_blank_tile_position(state)
-    (swap_x, swap_y) = PuzzleProblem.get_swap_tile_position(state, action)
+  def goal_test(self, state: PuzzleState) -> bool:
+    '''
+    Check if the state is the goal state.
+    '''
+    return state == self.encoded_goal_state
 
-    # Get the tiles to swap.
-    swap_tile = state[swap_x][swap_y]
-    blank_tile = state[blank_x][blank_y]
+  def result(self, state: PuzzleState, blank: int, target: int) -> tuple[int, PuzzleState]:
+    '''
+    Move the tile at the target index into the blank cell and returns the step-cost and the new state.
 
-    # Swap the tiles.
-    new_state = [row[:] for row in state] 
-    new_state[blank_x][blank_y] = swap_tile
-    new_state[swap_x][swap_y] = blank_tile
+    The target index, taken from `moves`, is the blank index of the new state.
+    '''
+    tile_bits = self.tile_bits
+    tile = PuzzleProblem.get_tile(state, target, tile_bits)
 
-    return (1, new_state)
+    # The blank tile is encoded as zero bits, so only the moved tile changes.
+    return (1, state - (tile << (target * tile_bits)) + (tile << (blank * tile_bits)))
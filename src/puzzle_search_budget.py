@@ -0,0 +1,64 @@
+import sys
+import time
+from typing import Optional
+
+from puzzle_agent_result import PuzzleAgentFailure, PuzzleAgentFailureType
+
+class PuzzleSearchBudget:
+  '''
+  The limits of a single search: expanded nodes, frontier size and time. No limit by default.
+
+  Searches only compare their number of expanded nodes with the next checkpoint in their loop, and
+  check the limits at each checkpoint: every `CHECK_INTERVAL` expanded nodes, and at the expanded
+  nodes limit. The frontier size and time limits can be overrun by up to one interval.
+  '''
+
+  # The number of expanded nodes between two checks of the limits.
+  CHECK_INTERVAL = 1024
+
+  # The checkpoint of searches without a budget: never reached.
+  NO_CHECK = sys.maxsize
+
+  # The maximum number of expanded nodes, if any.
+  max_expanded_nodes: Optional[int]
+
+  # The maximum number of nodes in the frontier, if any.
+  max_frontier_size: Optional[int]
+
+  # The maximum time taken by the search, in seconds, if any.
+  time_limit: Optional[float]
+
+  def __init__(self, max_expanded_nodes: Optional[int] = None, max_frontier_size: Optional[int] = None, time_limit: Optional[float] = None):
+    self.max_expanded_nodes = max_expanded_nodes
+    self.max_frontier_size = max_frontier_size
+    self.time_limit = time_limit
+
+  def get_next_check(self, expanded_nodes: int) -> int:
+    '''
+    Get the number of expanded nodes at which the limits are checked next.
+    '''
+    next_check = expanded_nodes + PuzzleSearchBudget.CHECK_INTERVAL
+
+    if (self.max_expanded_nodes is not None):
+      next_check = min(next_check, max(self.max_expanded_nodes, expanded_nodes + 1))
+
+    return next_check
+
+  def check(self, start_time: float, expanded_nodes: int, frontier_size: int) -> Optional[PuzzleAgentFailure]:
+    '''
+    Check the limits of a search started at the given `time.perf_counter` time, returning the
+    failure of the search with its partial stats if any limit is exceeded.
+    '''
+    limit: Optional[str] = None
+
+    if (self.max_expanded_nodes is not None and expanded_nodes >= self.max_expanded_nodes):
+      limit = 'expanded nodes'
+    elif (self.max_frontier_size is not None and frontier_size >= self.max_frontier_size):
+      limit = 'frontier size'
+    elif (self.time_limit is not None and time.perf_counter() - start_time >= self.time_limit):
+      limit = 'time'
+
+    if (limit is None):
+      return None
+
+    return PuzzleAgentFailure(PuzzleAgentFailureType.BUDGET_EXCEEDED, expanded_nodes=expanded_nodes, frontier_size=frontier_size, limit=limit)
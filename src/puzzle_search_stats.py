@@ -0,0 +1,160 @@
+import time
+from typing import Any, Callable, Optional
+
+from puzzle_heuristic import PuzzleHeuristic
+from puzzle_problem import PuzzleState
+
+class PuzzleSearchStats:
+  '''
+  The stats of a single search, collected when the agent has a `PuzzleSearchInstrumentation`.
+
+  Times are in seconds and split the search in three: the heuristic, including building it, the
+  operations on the frontier, and the rest, which is mostly generating states and checking for
+  duplicates. Searches without a heuristic or a queue report no time for them.
+
+  Searches count the children of each node as it is expanded, and count their duplicates from the
+  nodes they stored once they end. Breadth-first searches, which stop as soon as they generate the
+  goal, count the children of the last node after the goal as duplicates.
+  '''
+
+  # The number of nodes generated from expanded nodes.
+  generated_nodes: int
+
+  # The number of generated nodes dropped because their state was explored or already in the frontier
+  # with a path cost at least as low.
+  duplicate_nodes: int
+
+  # The number of frontier nodes replaced by a generated node with a lower path cost.
+  replaced_nodes: int
+
+  # The largest number of nodes in the frontier, or the deepest path of depth-first searches.
+  max_frontier_size: int
+
+  # The time taken by the heuristic.
+  heuristic_time: float
+
+  # The time taken by the rest of the search.
+  expansion_time: float
+
+  # The time taken to push, pop and find nodes in the frontier.
+  queue_time: float
+
+  def __init__(self):
+    self.generated_nodes = 0
+    self.duplicate_nodes = 0
+    self.replaced_nodes = 0
+    self.max_frontier_size = 0
+    self.heuristic_time = 0.0
+    self.expansion_time = 0.0
+    self.queue_time = 0.0
+
+  def to_dict(self) -> dict[str, Any]:
+    '''
+    Get the stats as a dictionary, for reports.
+    '''
+    return {
+      'generated_nodes': self.generated_nodes,
+      'duplicate_nodes': self.duplicate_nodes,
+      'replaced_nodes': self.replaced_nodes,
+      'max_frontier_size': self.max_frontier_size,
+      'heuristic_time': self.heuristic_time,
+      'expansion_time': self.expansion_time,
+      'queue_time': self.queue_time,
+    }
+
+  def time_heuristic(self, heuristic: PuzzleHeuristic) -> PuzzleHeuristic:
+    '''
+    Get a heuristic that adds the time taken by the given one to the heuristic time.
+    '''
+    return _TimedHeuristic(heuristic, self)
+
+  def time_queue(self, *functions: Callable[..., Any]) -> tuple[Callable[..., Any], ...]:
+    '''
+    Get functions that add the time taken by the given frontier functions to the queue time.
+    '''
+    return tuple(self.__time_queue_function(function) for function in functions)
+
+  def __time_queue_function(self, function: Callable[..., Any]) -> Callable[..., Any]:
+    '''
+    Get a function that adds the time taken by the given frontier function to the queue time.
+    '''
+    clock = time.perf_counter
+
+    def timed_function(*arguments: Any) -> Any:
+      start_time = clock()
+      result = function(*arguments)
+      self.queue_time += clock() - start_time
+
+      return result
+
+    return timed_function
+
+class _TimedHeuristic(PuzzleHeuristic):
+  '''
+  Stands in for a heuristic, adding the time it takes to the heuristic time of the stats. Other
+  attributes are read from the heuristic.
+  '''
+
+  # The heuristic being timed.
+  __heuristic: PuzzleHeuristic
+
+  # The stats the time is added to.
+  __stats: PuzzleSearchStats
+
+  def __init__(self, heuristic: PuzzleHeuristic, stats: PuzzleSearchStats):
+    super().__init__(heuristic.goal_state)
+    self.__heuristic = heuristic
+    self.__stats = stats
+
+  def __getattr__(self, name: str) -> Any:
+    # Only called for the attributes of the heuristic type, such as its tables. The heuristic itself
+    # is missing before `__init__`, such as while unpickling.
+    if (name == '_TimedHeuristic__heuristic'):
+      raise AttributeError(name)
+
+    return getattr(self.__heuristic, name)
+
+  def estimate(self, state: PuzzleState) -> int:
+    start_time = time.perf_counter()
+    cost_to_goal = self.__heuristic.estimate(state)
+    self.__stats.heuristic_time += time.perf_counter() - start_time
+
+    return cost_to_goal
+
+  def update(self, cost_to_goal: int, state: PuzzleState, tile: int, from_index: int, to_index: int) -> int:
+    start_time = time.perf_counter()
+    cost_to_goal = self.__heuristic.update(cost_to_goal, state, tile, from_index, to_index)
+    self.__stats.heuristic_time += time.perf_counter() - start_time
+
+    return cost_to_goal
+
+class PuzzleSearchInstrumentation:
+  '''
+  The instrumentation of the searches of an agent: collects `PuzzleSearchStats` on each result, and
+  calls the given callbacks with each expanded and generated state and each solution.
+
+  The callbacks are looked up once per search. Without instrumentation, searches skip the counters
+  and callbacks, which costs them a check per expanded node and none per generated node. Timing is
+  added only with instrumentation. Beam searches collect them a layer at a time, and anytime
+  searches call the solution callback with each better solution as soon as it is found. Distance
+  table lookups search nothing, and report empty stats.
+  '''
+
+  # Called with the encoded state of each expanded node, if any.
+  on_expand: Optional[Callable[[PuzzleState], None]]
+
+  # Called with the encoded state of each generated node, duplicates included, if any.
+  on_generate: Optional[Callable[[PuzzleState], None]]
+
+  # Called with each solution found, if any.
+  on_solution: Optional[Callable[[Any], None]]
+
+  def __init__(
+    self,
+    on_expand: Optional[Callable[[PuzzleState], None]] = None,
+    on_generate: Optional[Callable[[PuzzleState], None]] = None,
+    on_solution: Optional[Callable[[Any], None]] = None,
+  ):
+    self.on_expand = on_expand
+    self.on_generate = on_generate
+    self.on_solution = on_solution
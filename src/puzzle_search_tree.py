@@ -0,0 +1,161 @@
+from array import array
+import math
+import threading
+from typing import Optional
+
+from puzzle_problem import PuzzleAction, PuzzleProblem, PuzzleState
+
+class PuzzleSearchTree:
+  '''
+  The states seen by a search, each with the state it was reached from and the action that reached it.
+
+  States are referred to by key: the state itself. See `PuzzleRankedSearchTree` for compact keys.
+  '''
+
+  # The parent key and action of each seen state, by key.
+  __parents: dict[int, tuple[int, Optional[PuzzleAction]]]
+
+  def __init__(self):
+    self.__parents = {}
+
+  @staticmethod
+  def create(problem: PuzzleProblem) -> 'PuzzleSearchTree':
+    '''
+    Create the most compact search tree for the board of the problem.
+    '''
+    if (problem.cells <= PuzzleRankedSearchTree.MAX_CELLS):
+      return PuzzleRankedSearchTree(problem.cells)
+
+    return PuzzleSearchTree()
+
+  def __len__(self) -> int:
+    return len(self.__parents)
+
+  def __contains__(self, key: int) -> bool:
+    return key in self.__parents
+
+  def key(self, state: PuzzleState) -> int:
+    '''
+    Get the key of the state.
+    '''
+    return state
+
+  def add(self, key: int, parent_key: int, action: Optional[PuzzleAction]) -> None:
+    '''
+    Add a state reached from the parent state with the action. The root state has no action.
+    '''
+    self.__parents[key] = (parent_key, action)
+
+  def get_actions(self, key: int) -> list[PuzzleAction]:
+    '''
+    Get the actions from the root state to the state.
+    '''
+    actions: list[PuzzleAction] = []
+    (key, action) = self.__parents[key]
+
+    while (action is not None):
+      actions.append(action)
+      (key, action) = self.__parents[key]
+
+    actions.reverse()
+
+    return actions
+
+  def close(self) -> None:
+    '''
+    Release the storage of the tree once the search is done with it. The tree must not be used after.
+    '''
+
+class PuzzleRankedSearchTree(PuzzleSearchTree):
+  '''
+  A search tree for small boards that refers to states by permutation rank, and stores the parent
+  rank and action of every possible state in flat arrays: 5 bytes per state, about 1.8 MB for the 8-puzzle.
+
+  The arrays are allocated for the number of cells of the board, and kept per thread once the tree
+  is closed, so the next search of the thread reuses them instead of allocating them again. Only
+  the actions are reset, from a template, as the parents of unseen states are never read.
+  '''
+
+  # The largest board that is ranked. Larger boards have too many permutations to preallocate.
+  MAX_CELLS = 9
+
+  # The action code of states not seen yet.
+  UNSEEN = 255
+
+  # The action code of the root state.
+  ROOT = 254
+
+  # The action codes of a tree with no seen state, by number of cells, copied to reset the actions.
+  __unseen_actions: dict[int, bytes] = {}
+
+  # The arrays of the closed trees of each thread, by number of cells, in its `tables` attribute.
+  __spare_tables = threading.local()
+
+  # The number of cells of the board.
+  cells: int
+
+  # The number of seen states.
+  __size: int
+
+  # The parent rank of each state, by rank.
+  __parents: array
+
+  # The action code that reached each state, by rank.
+  __actions: bytearray
+
+  def __init__(self, cells: int):
+    self.cells = cells
+    self.__size = 0
+
+    spare_tables = PuzzleRankedSearchTree.__get_spare_tables()
+    tables = spare_tables.pop(cells, None)
+
+    if (tables is not None):
+      (self.__parents, self.__actions) = tables
+      self.__actions[:] = PuzzleRankedSearchTree.__unseen_actions[cells]
+    else:
+      permutations = math.factorial(cells)
+      self.__parents = array('i', bytes(4 * permutations))
+      self.__actions = bytearray([PuzzleRankedSearchTree.UNSEEN]) * permutations
+      PuzzleRankedSearchTree.__unseen_actions.setdefault(cells, bytes(self.__actions))
+
+  @staticmethod
+  def __get_spare_tables() -> dict[int, tuple[array, bytearray]]:
+    '''
+    Get the arrays of the closed trees of the current thread, by number of cells.
+    '''
+    spare_tables = getattr(PuzzleRankedSearchTree.__spare_tables, 'tables', None)
+
+    if (spare_tables is None):
+      spare_tables = {}
+      PuzzleRankedSearchTree.__spare_tables.tables = spare_tables
+
+    return spare_tables
+
+  def __len__(self) -> int:
+    return self.__size
+
+  def __contains__(self, key: int) -> bool:
+    return self.__actions[key] != PuzzleRankedSearchTree.UNSEEN
+
+  def key(self, state: PuzzleState) -> int:
+    return PuzzleProblem.rank_state(state, self.cells)
+
+  def add(self, key: int, parent_key: int, action: Optional[PuzzleAction]) -> None:
+    self.__parents[key] = parent_key
+    self.__actions[key] = action.value if action is not None else PuzzleRankedSearchTree.ROOT
+    self.__size += 1
+
+  def get_actions(self, key: int) -> list[PuzzleAction]:
+    actions: list[PuzzleAction] = []
+
+    while (self.__actions[key] != PuzzleRankedSearchTree.ROOT):
+      actions.append(PuzzleAction(self.__actions[key]))
+      key = self.__parents[key]
+
+    actions.reverse()
+
+    return actions
+
+  def close(self) -> None:
+    PuzzleRankedSearchTree.__get_spare_tables()[self.cells] = (self.__parents, self.__actions)
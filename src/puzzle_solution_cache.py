@@ -0,0 +1,136 @@
+from collections import OrderedDict
+import sqlite3
+from typing import Any, Optional
+
+from puzzle_problem import PuzzleAction, PuzzleProblem
+from puzzle_symmetry import PuzzleSymmetry
+
+class PuzzleSolutionCache:
+  '''
+  The actions that solve the problems already solved, by initial state, goal state and agent type.
+
+  Solutions are stored for the canonical problem (see `PuzzleSymmetry.canonicalize`), so problems
+  that only differ by a symmetry of the board or a relabeling of the tiles share a single entry.
+
+  The most recently used solutions are kept in memory, up to a maximum size. When given a path,
+  every solution is also stored in a sqlite database, so it survives restarts and is shared by
+  every process that opens the same file.
+  '''
+
+  # The default number of solutions kept in memory.
+  DEFAULT_MAX_SIZE = 4096
+
+  # The maximum number of solutions kept in memory.
+  max_size: int
+
+  # The path of the database file, if any.
+  path: Optional[str]
+
+  # The number of lookups that found a solution.
+  hits: int
+
+  # The number of lookups that found no solution.
+  misses: int
+
+  # The actions of the most recently used solutions, encoded one byte per action, from least to most recent.
+  __solutions: OrderedDict[str, bytes]
+
+  # The connection to the database file, opened on first use.
+  __connection: Optional[sqlite3.Connection]
+
+  def __init__(self, max_size: int = DEFAULT_MAX_SIZE, path: Optional[str] = None):
+    if (max_size < 0):
+      raise ValueError(f'The maximum size of the cache must not be negative: {max_size}')
+
+    self.max_size = max_size
+    self.path = path
+    self.hits = 0
+    self.misses = 0
+    self.__solutions = OrderedDict()
+    self.__connection = None
+
+  def __len__(self) -> int:
+    return len(self.__solutions)
+
+  def __getstate__(self) -> dict[str, Any]:
+    # The connection belongs to the process that opened it.
+    state = self.__dict__.copy()
+    state['_PuzzleSolutionCache__connection'] = None
+
+    return state
+
+  @staticmethod
+  def key(problem: PuzzleProblem, algorithm: str) -> str:
+    '''
+    Get the key of the solution of the problem by the algorithm. The problem must be canonical.
+    '''
+    return f'{algorithm}:{problem.rows}x{problem.columns}:{problem.encoded_initial_state:x}:{problem.encoded_goal_state:x}'
+
+  def get(self, problem: PuzzleProblem, algorithm: str) -> Optional[list[PuzzleAction]]:
+    '''
+    Get the actions that solve the problem, as found by the algorithm, or None if it was not solved yet.
+    '''
+    (canonical_problem, symmetry) = PuzzleSymmetry.canonicalize(problem)
+    key = PuzzleSolutionCache.key(canonical_problem, algorithm)
+    actions = self.__solutions.get(key)
+
+    if (actions is not None):
+      self.__solutions.move_to_end(key)
+    elif (self.path is not None):
+      row = self.__connect().execute('SELECT actions FROM solutions WHERE key = ?', (key,)).fetchone()
+
+      if (row is not None):
+        actions = bytes(row[0])
+        self.__remember(key, actions)
+
+    if (actions is None):
+      self.misses += 1
+
+      return None
+
+    self.hits += 1
+
+    return symmetry.restore_actions([PuzzleAction(value) for value in actions])
+
+  def put(self, problem: PuzzleProblem, algorithm: str, actions: list[PuzzleAction]) -> None:
+    '''
+    Store the actions that solve the problem, as found by the algorithm.
+    '''
+    (canonical_problem, symmetry) = PuzzleSymmetry.canonicalize(problem)
+    key = PuzzleSolutionCache.key(canonical_problem, algorithm)
+    encoded_actions = bytes(action.value for action in symmetry.apply_actions(actions))
+    self.__remember(key, encoded_actions)
+
+    if (self.path is not None):
+      connection = self.__connect()
+      connection.execute('INSERT OR REPLACE INTO solutions (key, actions) VALUES (?, ?)', (key, encoded_actions))
+      connection.commit()
+
+  def clear(self) -> None:
+    '''
+    Forget the solutions kept in memory and reset the counters. The database file is left untouched.
+    '''
+    self.__solutions.clear()
+    self.hits = 0
+    self.misses = 0
+
+  def __remember(self, key: str, actions: bytes) -> None:
+    '''
+    Keep the solution in memory, evicting the least recently used one when full.
+    '''
+    self.__solutions[key] = actions
+    self.__solutions.move_to_end(key)
+
+    while len(self.__solutions) > self.max_size:
+      self.__solutions.popitem(last=False)
+
+  def __connect(self) -> sqlite3.Connection:
+    '''
+    Get the connection to the database file, creating its table if needed.
+    '''
+    if (self.__connection is None):
+      self.__connection = sqlite3.connect(self.path)
+      self.__connection.execute('CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, actions BLOB NOT NULL)')
+      self.__connection.commit()
+
+    return self.__connection
@@ -0,0 +1,184 @@
+from collections import deque
+import csv
+import json
+import sys
+from typing import Any, Iterator, Optional, TextIO, Union
+
+from puzzle_agent import PuzzleAgent
+from puzzle_agent_result import PuzzleAgentFailure, PuzzleAgentSolution
+from puzzle_problem import PuzzleProblem
+
+# The columns of the results written as CSV.
+RESULT_COLUMNS = ['line', 'id', 'status', 'moves', 'path_cost', 'expanded_nodes', 'time', 'reason']
+
+# The largest number of invalid records held back while the problems before them are being solved.
+MAX_HELD_INVALID_RECORDS = 1024
+
+def parse_board(text: str) -> list[list[int]]:
+  '''
+  Parse a board written as rows separated by slashes and tiles separated by spaces, such as "1 2 3/8 0 4/7 6 5".
+  '''
+  return [[int(tile) for tile in row.split()] for row in text.split('/')]
+
+def format_board(state: list[list[int]]) -> str:
+  '''
+  Format a board as rows separated by slashes and tiles separated by spaces. See `parse_board`.
+  '''
+  return '/'.join(' '.join(str(tile) for tile in row) for row in state)
+
+def read_records(input: TextIO, format: str) -> Iterator[tuple[int, Union[str, dict[str, str]]]]:
+  '''
+  Read the raw problem records of a JSONL or CSV stream, one at a time, along with their line number.
+  '''
+  if (format == 'csv'):
+    reader = csv.DictReader(input)
+
+    for record in reader:
+      yield (reader.line_num, record)
+
+    return
+
+  for line_number, line in enumerate(input, start=1):
+    if (line.strip() != ''):
+      yield (line_number, line)
+
+def parse_record(record: Union[str, dict[str, str]], default_goal_state: list[list[int]]) -> tuple[Optional[str], PuzzleProblem]:
+  '''
+  Parse a raw problem record into its id and problem.
+
+  JSONL records hold the boards as lists of rows. CSV records hold the boards as text (see `parse_board`).
+  Records have an `initial` board, and optionally a `goal` board and an `id`.
+  '''
+  if (isinstance(record, str)):
+    fields = json.loads(record)
+    initial_state = fields['initial']
+    goal_state = fields.get('goal')
+  else:
+    fields = record
+    initial_state = parse_board(fields['initial'])
+    goal_state = parse_board(fields['goal']) if fields.get('goal') else None
+
+  # Only a missing goal falls back to the default one: an empty goal board is invalid.
+  if (goal_state is None):
+    goal_state = default_goal_state
+
+  return (fields.get('id'), PuzzleProblem(initial_state, goal_state))
+
+def parse_record_id(record: Union[str, dict[str, str]]) -> Optional[str]:
+  '''
+  Get the id of a raw problem record, if the record itself can be parsed, whatever its boards.
+  '''
+  if (isinstance(record, dict)):
+    return record.get('id')
+
+  try:
+    fields = json.loads(record)
+  except ValueError:
+    return None
+
+  return fields.get('id') if isinstance(fields, dict) else None
+
+def format_result(line_number: int, id: Optional[str], result: Union[PuzzleAgentSolution, PuzzleAgentFailure, Exception]) -> dict[str, Any]:
+  '''
+  Format the result of a problem record.
+  '''
+  output: dict[str, Any] = {'line': line_number, 'id': id}
+
+  if (isinstance(result, PuzzleAgentSolution)):
+    output.update({
+      'status': 'solved',
+      'moves': [action.name for action in result.get_actions()],
+      'path_cost': result.node.path_cost,
+      'expanded_nodes': result.expanded_nodes,
+      'time': result.time_taken,
+    })
+  elif (isinstance(result, PuzzleAgentFailure)):
+    output.update({'status': result.type.name.lower(), 'reason': result.get_reason(), 'expanded_nodes': result.expanded_nodes, 'time': result.time_taken})
+  else:
+    output.update({'status': 'invalid', 'reason': str(result)})
+
+  return output
+
+def format_error(line_number: int, id: Optional[str], error: Exception) -> dict[str, Any]:
+  '''
+  Format the error raised while solving a problem record.
+  '''
+  return {'line': line_number, 'id': id, 'status': 'error', 'reason': f'{type(error).__name__}: {error}'}
+
+def solve_stream(agent: PuzzleAgent, input: TextIO, output: TextIO, format: str, default_goal_state: list[list[int]], workers: int = 1) -> None:
+  '''
+  Solve the problem records of a JSONL or CSV stream, writing one result line per record in the same format.
+
+  Records are read as the solver needs them and results are written as soon as their turn comes,
+  so memory stays bounded whatever the size of the stream. Invalid records are written in line
+  order too, unless more than `MAX_HELD_INVALID_RECORDS` of them are read while a problem before
+  them is being solved, in which case the earliest ones are written ahead of it. An error solving
+  a problem is written as the result of its record.
+  '''
+  # The line number and id of each problem submitted and not written yet, by problem index.
+  records: dict[int, tuple[int, Optional[str]]] = {}
+
+  # The invalid records read while problems before them were being solved, written in line order.
+  invalid_records: deque[tuple[int, Optional[str], Exception]] = deque()
+
+  writer = csv.DictWriter(output, RESULT_COLUMNS, extrasaction='ignore') if format == 'csv' else None
+
+  if (writer is not None):
+    writer.writeheader()
+
+  def write(result: dict[str, Any]) -> None:
+    if (writer is not None):
+      writer.writerow({**result, 'moves': ' '.join(result.get('moves', []))})
+    else:
+      output.write(json.dumps(result) + '\n')
+
+    output.flush()
+
+  def read_problems() -> Iterator[PuzzleProblem]:
+    index = 0
+
+    for line_number, record in read_records(input, format):
+      try:
+        (id, problem) = parse_record(record, default_goal_state)
+      except (AssertionError, KeyError, TypeError, ValueError, AttributeError) as error:
+        id = parse_record_id(record)
+
+        # Write the invalid record right away, unless it has to wait for the problems before it.
+        if (len(records) == 0):
+          write(format_result(line_number, id, error))
+        else:
+          if (len(invalid_records) >= MAX_HELD_INVALID_RECORDS):
+            write(format_result(*invalid_records.popleft()))
+
+          invalid_records.append((line_number, id, error))
+
+        continue
+
+      records[index] = (line_number, id)
+      index += 1
+
+      yield problem
+
+  for index, result in agent.solve_many(read_problems(), workers=workers, return_exceptions=True):
+    (line_number, id) = records.pop(index)
+
+    # Write the invalid records read before this one.
+    while len(invalid_records) > 0 and invalid_records[0][0] < line_number:
+      write(format_result(*invalid_records.popleft()))
+
+    if (isinstance(result, Exception)):
+      write(format_error(line_number, id, result))
+    else:
+      write(format_result(line_number, id, result))
+
+  for invalid_record in invalid_records:
+    write(format_result(*invalid_record))
+
+def open_stream(path: str, mode: str) -> TextIO:
+  '''
+  Open a file, or the standard input or output for "-".
+  '''
+  if (path == '-'):
+    return sys.stdin if mode == 'r' else sys.stdout
+
+  return open(path, mode, newline='')
@@ -0,0 +1,197 @@
+import itertools
+from typing import Optional
+
+from puzzle_problem import PuzzleAction, PuzzleProblem
+
+class PuzzleSymmetry:
+  '''
+  A symmetry of the board: an optional transposition, then optional flips of the rows and columns,
+  then a relabeling of the tiles so the goal state reads 1, 2, 3... in row-major order around the blank.
+
+  Moves commute with symmetries, so a problem and its image have solutions of the same cost, and
+  the actions of one map to the actions of the other. Problems that only differ by a symmetry share
+  a single canonical problem. See `canonicalize`.
+  '''
+
+  # The number of rows of the board.
+  rows: int
+
+  # The number of columns of the board.
+  columns: int
+
+  # Whether the rows and columns are swapped, before flipping.
+  transpose: bool
+
+  # Whether the order of the rows is reversed.
+  flip_rows: bool
+
+  # Whether the order of the columns is reversed.
+  flip_columns: bool
+
+  # The number of rows of the transformed board.
+  transformed_rows: int
+
+  # The number of columns of the transformed board.
+  transformed_columns: int
+
+  # The row-major index of the transformed cell of each cell, by row-major index.
+  cells: list[int]
+
+  # The label of each tile on the transformed board, by tile.
+  tiles: list[int]
+
+  def __init__(self, goal_state: list[list[int]], transpose: bool, flip_rows: bool, flip_columns: bool):
+    self.rows = len(goal_state)
+    self.columns = len(goal_state[0])
+    self.transpose = transpose
+    self.flip_rows = flip_rows
+    self.flip_columns = flip_columns
+    (self.transformed_rows, self.transformed_columns) = (self.columns, self.rows) if transpose else (self.rows, self.columns)
+    self.cells = [self.__transform_cell(index) for index in range(self.rows * self.columns)]
+
+    # Label the tiles in the row-major order of their transformed goal cells.
+    transformed_goal_tiles = [0] * (self.rows * self.columns)
+
+    for index, tile in enumerate(tile for row in goal_state for tile in row):
+      transformed_goal_tiles[self.cells[index]] = tile
+
+    self.tiles = [0] * len(transformed_goal_tiles)
+    label = 1
+
+    for tile in transformed_goal_tiles:
+      if (tile != 0):
+        self.tiles[tile] = label
+        label += 1
+
+  @staticmethod
+  def get_symmetries(goal_state: list[list[int]]) -> list['PuzzleSymmetry']:
+    '''
+    Get the symmetries of the board of the goal state: the 8 symmetries of the square for square
+    boards, and the 4 that give boards with no more rows than columns otherwise.
+    '''
+    rows = len(goal_state)
+    columns = len(goal_state[0])
+    symmetries: list[PuzzleSymmetry] = []
+
+    for (transpose, flip_rows, flip_columns) in itertools.product((False, True), repeat=3):
+      (transformed_rows, transformed_columns) = (columns, rows) if transpose else (rows, columns)
+
+      if (transformed_rows <= transformed_columns):
+        symmetries.append(PuzzleSymmetry(goal_state, transpose, flip_rows, flip_columns))
+
+    return symmetries
+
+  @staticmethod
+  def canonicalize(problem: PuzzleProblem) -> tuple[PuzzleProblem, 'PuzzleSymmetry']:
+    '''
+    Get the canonical problem of the problem, along with the symmetry that maps the problem to it.
+
+    The canonical problem is the image with the lowest encoded goal state, then the lowest encoded
+    initial state. Its goal only depends on the cell of the blank in the goal state.
+    '''
+    best: Optional[tuple[tuple[int, int], list[list[int]], list[list[int]], PuzzleSymmetry]] = None
+
+    for symmetry in PuzzleSymmetry.get_symmetries(problem.goal_state):
+      goal_state = symmetry.apply(problem.goal_state)
+      initial_state = symmetry.apply(problem.initial_state)
+      key = (PuzzleProblem.encode_state(goal_state), PuzzleProblem.encode_state(initial_state))
+
+      if (best is None or key < best[0]):
+        best = (key, initial_state, goal_state, symmetry)
+
+    (_, initial_state, goal_state, symmetry) = best
+
+    return (PuzzleProblem(initial_state, goal_state), symmetry)
+
+  @staticmethod
+  def canonicalize_goal(goal_state: list[list[int]]) -> tuple[list[list[int]], 'PuzzleSymmetry']:
+    '''
+    Get the canonical goal state of the goal state, along with the symmetry that maps the goal state to it.
+    '''
+    best: Optional[tuple[int, list[list[int]], PuzzleSymmetry]] = None
+
+    for symmetry in PuzzleSymmetry.get_symmetries(goal_state):
+      transformed_goal_state = symmetry.apply(goal_state)
+      key = PuzzleProblem.encode_state(transformed_goal_state)
+
+      if (best is None or key < best[0]):
+        best = (key, transformed_goal_state, symmetry)
+
+    (_, transformed_goal_state, symmetry) = best
+
+    return (transformed_goal_state, symmetry)
+
+  def apply(self, state: list[list[int]]) -> list[list[int]]:
+    '''
+    Get the image of the state.
+    '''
+    transformed_tiles = [0] * (self.rows * self.columns)
+
+    for index, tile in enumerate(tile for row in state for tile in row):
+      transformed_tiles[self.cells[index]] = self.tiles[tile]
+
+    columns = self.transformed_columns
+
+    return [transformed_tiles[i:i+columns] for i in range(0, len(transformed_tiles), columns)]
+
+  def apply_actions(self, actions: list[PuzzleAction]) -> list[PuzzleAction]:
+    '''
+    Get the image of the actions: the actions that move the blank the same way on the transformed board.
+    '''
+    return [self.__transform_action(action, inverse=False) for action in actions]
+
+  def restore_actions(self, actions: list[PuzzleAction]) -> list[PuzzleAction]:
+    '''
+    Get the actions on the board from their image on the transformed board. See `apply_actions`.
+    '''
+    return [self.__transform_action(action, inverse=True) for action in actions]
+
+  def __transform_cell(self, index: int) -> int:
+    '''
+    Get the row-major index of the transformed cell of the cell at the row-major index.
+    '''
+    (row, column) = divmod(index, self.columns)
+
+    if (self.transpose):
+      (row, column) = (column, row)
+
+    if (self.flip_rows):
+      row = self.transformed_rows - 1 - row
+
+    if (self.flip_columns):
+      column = self.transformed_columns - 1 - column
+
+    return row * self.transformed_columns + column
+
+  def __transform_action(self, action: PuzzleAction, inverse: bool) -> PuzzleAction:
+    '''
+    Get the action that moves the blank along the image of the move of the action, or along its
+    preimage when inverse.
+    '''
+    (row_step, column_step) = _action_steps[action]
+
+    # Flips and transposition are their own inverse, so the inverse applies them in reverse order.
+    if (self.transpose and not inverse):
+      (row_step, column_step) = (column_step, row_step)
+
+    if (self.flip_rows):
+      row_step = -row_step
+
+    if (self.flip_columns):
+      column_step = -column_step
+
+    if (self.transpose and inverse):
+      (row_step, column_step) = (column_step, row_step)
+
+    return _step_actions[(row_step, column_step)]
+
+# The move of the blank, in rows and columns, of each action. See `PuzzleProblem.get_swap_tile_position`.
+_action_steps: dict[PuzzleAction, tuple[int, int]] = {
+  PuzzleAction.UP: (0, -1),
+  PuzzleAction.DOWN: (0, 1),
+  PuzzleAction.LEFT: (-1, 0),
+  PuzzleAction.RIGHT: (1, 0),
+}
+
+# The action of each move of the blank.
+_step_actions: dict[tuple[int, int], PuzzleAction] = {step: action for action, step in _action_steps.items()}
@@ -1,8 +1,10 @@
 from enum import Enum
+import random
 import time
 
 from puzzle_agent import PuzzleAgent, PuzzleAgentType
 from puzzle_agent_result import PuzzleAgentSolution
+from puzzle_heuristic import PuzzleHeuristicType
 from puzzle_problem import PuzzleProblem
 
 class TestType(Enum):
@@ -27,6 +29,35 @@ def main() -> None:
     test(GOAL_STATE, 25, test_type)
     print()
 
+  test_long_solution_in_workers()
+
+def test_long_solution_in_workers() -> None:
+  '''
+  When a solution with a long path is returned from a worker process.
+  '''
+  goal_state = [
+    [1, 2, 3, 4],
+    [5, 6, 7, 8],
+    [9, 10, 11, 12],
+    [13, 14, 15, 0]
+  ]
+
+  print('# Solving a 4x4 problem with greedy search in worker processes\n')
+
+  # Greedy search with the misplaced tiles finds a path of hundreds of moves for this seed.
+  random.seed(18)
+  problem = PuzzleProblem(PuzzleProblem.generate_random_solvable_state(goal_state), goal_state)
+  agent = PuzzleAgent(PuzzleAgentType.GREEDY, PuzzleHeuristicType.MISPLACED_TILES)
+
+  expected_result = agent.solve(problem)
+  (_, result) = next(agent.solve_many([problem], workers=2, return_exceptions=True))
+
+  assert isinstance(result, PuzzleAgentSolution), f'The worker failed: {result!r}'
+  assert result.get_actions() == expected_result.get_actions(), 'The worker returned another solution'
+  assert result.node.state == problem.encoded_goal_state, 'The solution node does not reach the goal'
+
+  print(f'> Greedy: {len(result.get_actions())} moves returned from a worker\n')
+
 
 def test(goal_state: list[list[int]], num_problems: int, test_type: TestType) -> None:
 
@@ -59,7 +90,7 @@ def test(goal_state: list[list[int]], num_problems: int, test_type: TestType) ->
     elif (test_type == TestType.UNSOLVABLE):
       initial_state = PuzzleProblem.generate_random_unsolvable_state(goal_state)
     else:
-      initial_state = PuzzleProblem.generate_random_state()
+      initial_state = PuzzleProblem.generate_random_state(len(goal_state), len(goal_state[0]))
 
     problem = PuzzleProblem(initial_state, goal_state)
 
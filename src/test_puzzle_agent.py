@@ -0,0 +1,128 @@
+import random
+
+import pytest
+
+from puzzle_agent import PuzzleAgent, PuzzleAgentType, PuzzleNodeStorage
+from puzzle_agent_result import PuzzleAgentFailure, PuzzleAgentFailureType, PuzzleAgentSolution
+from puzzle_distance_table import PuzzleDistanceTable
+from puzzle_heuristic import PuzzleHeuristicType
+from puzzle_node import PuzzleNode
+from puzzle_problem import PuzzleProblem
+from puzzle_search_budget import PuzzleSearchBudget
+
+GOAL_STATE = [[1, 2, 3], [8, 0, 4], [7, 6, 5]]
+
+# The agent types that search within a budget.
+BUDGETED_AGENT_TYPES = [
+  PuzzleAgentType.INFORMED,
+  PuzzleAgentType.UNINFORMED,
+  PuzzleAgentType.ITERATIVE_DEEPENING,
+  PuzzleAgentType.BIDIRECTIONAL,
+  PuzzleAgentType.WEIGHTED,
+  PuzzleAgentType.GREEDY,
+  PuzzleAgentType.ANYTIME,
+]
+
+def get_problems(count: int, moves: int, seed: int = 0) -> list[PuzzleProblem]:
+  '''
+  Get random problems solved by random walks from the goal state.
+  '''
+  random.seed(seed)
+
+  return [PuzzleProblem(PuzzleProblem.generate_random_walk_state(GOAL_STATE, moves), GOAL_STATE) for _ in range(count)]
+
+def solves(problem: PuzzleProblem, result: PuzzleAgentSolution) -> bool:
+  '''
+  Whether the actions of the solution lead from the initial state of the problem to its goal state.
+  '''
+  return PuzzleNode.from_actions(problem, result.get_actions()).state == problem.encoded_goal_state
+
+@pytest.mark.parametrize('agent_type', BUDGETED_AGENT_TYPES)
+def test_expanded_nodes_budget(agent_type):
+  problem = PuzzleProblem([[5, 6, 7], [4, 0, 8], [3, 2, 1]], GOAL_STATE)
+  result = PuzzleAgent(agent_type, budget=PuzzleSearchBudget(max_expanded_nodes=10)).solve(problem)
+
+  assert isinstance(result, PuzzleAgentFailure)
+  assert result.type == PuzzleAgentFailureType.BUDGET_EXCEEDED
+  assert result.limit == 'expanded nodes'
+  assert result.expanded_nodes == 10
+
+def test_budget_within_limits():
+  (problem,) = get_problems(1, 10)
+  result = PuzzleAgent(PuzzleAgentType.INFORMED, budget=PuzzleSearchBudget(max_expanded_nodes=10000, time_limit=60)).solve(problem)
+
+  assert isinstance(result, PuzzleAgentSolution)
+
+@pytest.mark.parametrize('agent_type', [PuzzleAgentType.INFORMED, PuzzleAgentType.UNINFORMED, PuzzleAgentType.WEIGHTED, PuzzleAgentType.GREEDY])
+def test_arena_storage_matches_objects(agent_type):
+  table = PuzzleDistanceTable.create(GOAL_STATE)
+  objects_agent = PuzzleAgent(agent_type, storage=PuzzleNodeStorage.OBJECTS)
+  arena_agent = PuzzleAgent(agent_type, storage=PuzzleNodeStorage.ARENA)
+
+  for problem in get_problems(5, 20):
+    objects_result = objects_agent.solve(problem)
+    arena_result = arena_agent.solve(problem)
+
+    assert solves(problem, objects_result) and solves(problem, arena_result)
+    assert arena_result.node.path_cost == objects_result.node.path_cost
+
+    if (agent_type in (PuzzleAgentType.INFORMED, PuzzleAgentType.UNINFORMED)):
+      assert arena_result.node.path_cost == table.get_distance(problem.encoded_initial_state)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_solve_many_in_order(workers):
+  problems = get_problems(8, 20)
+  agent = PuzzleAgent(PuzzleAgentType.INFORMED)
+  results = list(agent.solve_many(problems, workers=workers))
+
+  assert [index for (index, _) in results] == list(range(len(problems)))
+
+  for (index, result) in results:
+    assert solves(problems[index], result)
+
+def test_solve_many_as_completed():
+  problems = get_problems(8, 20)
+  results = list(PuzzleAgent(PuzzleAgentType.INFORMED).solve_many(problems, workers=2, ordered=False))
+
+  assert sorted(index for (index, _) in results) == list(range(len(problems)))
+
+  for (index, result) in results:
+    assert solves(problems[index], result)
+
+def test_solve_many_returns_exceptions(tmp_path):
+  goal_state = [[1, 2, 3], [4, 5, 0]]
+  large_goal_state = [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12], [13, 14, 15, 0]]
+  problems = [PuzzleProblem(goal_state, goal_state), PuzzleProblem(large_goal_state, large_goal_state), PuzzleProblem(goal_state, goal_state)]
+  agent = PuzzleAgent(PuzzleAgentType.INFORMED, PuzzleHeuristicType.PATTERN_DATABASE, pattern_database_directory=str(tmp_path))
+  results = list(agent.solve_many(problems, workers=2, return_exceptions=True))
+
+  assert [index for (index, _) in results] == [0, 1, 2]
+  assert isinstance(results[0][1], PuzzleAgentSolution)
+  assert isinstance(results[1][1], ValueError)
+  assert isinstance(results[2][1], PuzzleAgentSolution)
+
+  with pytest.raises(ValueError):
+    list(agent.solve_many(problems, workers=2))
+
+def test_solve_many_builds_files_once_per_goal(tmp_path, monkeypatch):
+  goal_state = [[1, 2, 3], [4, 5, 0]]
+  builds: list[PuzzleProblem] = []
+  build_files = PuzzleAgent.build_files
+
+  def count_build(agent: PuzzleAgent, problem: PuzzleProblem) -> None:
+    builds.append(problem)
+    build_files(agent, problem)
+
+  monkeypatch.setattr(PuzzleAgent, 'build_files', count_build)
+  random.seed(0)
+  problems = [PuzzleProblem(PuzzleProblem.generate_random_solvable_state(goal_state), goal_state) for _ in range(6)]
+  agent = PuzzleAgent(PuzzleAgentType.INFORMED, PuzzleHeuristicType.PATTERN_DATABASE, pattern_database_directory=str(tmp_path))
+  results = list(agent.solve_many(problems, workers=2))
+
+  assert len(builds) == 1
+  assert all(solves(problems[index], result) for (index, result) in results)
+
+  del builds[:]
+  list(PuzzleAgent(PuzzleAgentType.INFORMED).solve_many(problems, workers=2))
+
+  assert len(builds) == 0
@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from puzzle_agent import PuzzleAgent, PuzzleAgentType
+from puzzle_agent_result import PuzzleAgentSolution
+from puzzle_async_solver import PuzzleAsyncSolver, QueueFull
+from puzzle_problem import PuzzleProblem
+
+GOAL_STATE = [[1, 2, 3], [8, 0, 4], [7, 6, 5]]
+
+# Problems with different initial states, one move from the goal state.
+PROBLEMS = [
+  PuzzleProblem([[1, 2, 3], [8, 4, 0], [7, 6, 5]], GOAL_STATE),
+  PuzzleProblem([[1, 0, 3], [8, 2, 4], [7, 6, 5]], GOAL_STATE),
+  PuzzleProblem([[1, 2, 3], [0, 8, 4], [7, 6, 5]], GOAL_STATE),
+]
+
+class BlockingExecutor(ThreadPoolExecutor):
+  '''
+  A thread pool that counts the searches submitted to it, and only runs them once released.
+  '''
+
+  # The number of searches submitted.
+  submitted: int
+
+  # Set to let the searches run.
+  released: threading.Event
+
+  def __init__(self):
+    super().__init__(max_workers=4)
+    self.submitted = 0
+    self.released = threading.Event()
+
+  def submit(self, function, *args, **kwargs):
+    self.submitted += 1
+
+    def run():
+      self.released.wait()
+
+      return function(*args, **kwargs)
+
+    return super().submit(run)
+
+  def shutdown(self, *args, **kwargs):
+    self.released.set()
+    super().shutdown(*args, **kwargs)
+
+def test_identical_requests_share_search():
+  async def run() -> None:
+    with BlockingExecutor() as executor:
+      async with PuzzleAsyncSolver(PuzzleAgent(PuzzleAgentType.INFORMED), executor=executor) as solver:
+        requests = [asyncio.ensure_future(solver.solve(PROBLEMS[0])) for _ in range(5)]
+        await asyncio.sleep(0.1)
+
+        assert len(solver) == 1
+
+        executor.released.set()
+        results = await asyncio.gather(*requests)
+
+        assert executor.submitted == 1
+        assert all(result is results[0] for result in results)
+        assert isinstance(results[0], PuzzleAgentSolution)
+        assert len(solver) == 0
+
+  asyncio.run(run())
+
+def test_new_searches_rejected_when_queue_full():
+  async def run() -> None:
+    with BlockingExecutor() as executor:
+      async with PuzzleAsyncSolver(PuzzleAgent(PuzzleAgentType.INFORMED), executor=executor, max_pending=1, max_queued=1) as solver:
+        requests = [asyncio.ensure_future(solver.solve(problem)) for problem in PROBLEMS[:2]]
+        await asyncio.sleep(0.1)
+
+        with pytest.raises(QueueFull):
+          await solver.solve(PROBLEMS[2])
+
+        # Joining a search in flight is not rejected.
+        requests.append(asyncio.ensure_future(solver.solve(PROBLEMS[1])))
+        await asyncio.sleep(0.1)
+
+        assert executor.submitted == 1
+
+        executor.released.set()
+        results = await asyncio.gather(*requests)
+
+        assert executor.submitted == 2
+        assert results[1] is results[2]
+        assert all(isinstance(result, PuzzleAgentSolution) for result in results)
+
+  asyncio.run(run())
+
+def test_timed_out_request_withdrawn_before_start():
+  async def run() -> None:
+    with BlockingExecutor() as executor:
+      async with PuzzleAsyncSolver(PuzzleAgent(PuzzleAgentType.INFORMED), executor=executor, max_pending=1) as solver:
+        request = asyncio.ensure_future(solver.solve(PROBLEMS[0]))
+        await asyncio.sleep(0.1)
+
+        with pytest.raises(asyncio.TimeoutError):
+          await solver.solve(PROBLEMS[1], timeout=0.1)
+
+        # The withdrawn search is forgotten once its cancellation completes.
+        await asyncio.sleep(0.1)
+
+        assert len(solver) == 1
+
+        executor.released.set()
+
+        assert isinstance(await request, PuzzleAgentSolution)
+        assert executor.submitted == 1
+
+  asyncio.run(run())
+
+@pytest.mark.parametrize('arguments', [{'workers': 0}, {'max_pending': 0}, {'max_queued': 0}])
+def test_invalid_limits(arguments):
+  with pytest.raises(ValueError):
+    PuzzleAsyncSolver(PuzzleAgent(PuzzleAgentType.INFORMED), **({'workers': 1} | arguments))
@@ -0,0 +1,67 @@
+import os
+import random
+
+import pytest
+
+from puzzle_distance_table import PuzzleDistanceTable
+from puzzle_node import PuzzleNode
+from puzzle_problem import PuzzleProblem
+
+GOAL_STATE = [[1, 2, 3], [4, 5, 0]]
+
+def test_distances_and_actions():
+  table = PuzzleDistanceTable.build(GOAL_STATE)
+  random.seed(0)
+
+  assert table.get_distance(PuzzleProblem.encode_state(GOAL_STATE)) == 0
+
+  for _ in range(20):
+    problem = PuzzleProblem(PuzzleProblem.generate_random_solvable_state(GOAL_STATE), GOAL_STATE)
+    actions = table.get_actions(problem)
+
+    assert len(actions) == table.get_distance(problem.encoded_initial_state)
+    assert PuzzleNode.from_actions(problem, actions).state == problem.encoded_goal_state
+
+def test_unreachable_states():
+  table = PuzzleDistanceTable.build(GOAL_STATE)
+  problem = PuzzleProblem(PuzzleProblem.generate_random_unsolvable_state(GOAL_STATE), GOAL_STATE)
+
+  assert table.get_distance(problem.encoded_initial_state) is None
+  assert table.get_actions(problem) is None
+
+def test_boards_above_max_cells():
+  with pytest.raises(AssertionError):
+    PuzzleDistanceTable.build([[1, 2, 3, 4, 5], [6, 7, 8, 9, 0]])
+
+def test_save_and_load(tmp_path):
+  table = PuzzleDistanceTable.build(GOAL_STATE)
+  path = str(tmp_path / 'table.bin')
+  table.save(path)
+  loaded_table = PuzzleDistanceTable.load(path)
+
+  assert loaded_table.goal_state == GOAL_STATE
+  assert bytes(loaded_table.entries) == bytes(table.entries)
+  assert [file.name for file in tmp_path.iterdir()] == ['table.bin']
+
+def test_load_invalid_files(tmp_path):
+  path = str(tmp_path / 'table.bin')
+  PuzzleDistanceTable.build(GOAL_STATE).save(path)
+
+  with open(path, 'rb') as file:
+    content = file.read()
+
+  for invalid_content in [b'', b'PDB2' + content[4:], content[:-1]]:
+    with open(path, 'wb') as file:
+      file.write(invalid_content)
+
+    with pytest.raises(AssertionError):
+      PuzzleDistanceTable.load(path)
+
+def test_get_path_builds_missing_tables_once(tmp_path):
+  goal_state = [[0, 1, 2], [3, 4, 5]]
+  path = PuzzleDistanceTable.get_path(goal_state, str(tmp_path))
+  modified_time = os.stat(path).st_mtime_ns
+
+  assert PuzzleDistanceTable.get_path(goal_state, str(tmp_path)) == path
+  assert os.stat(path).st_mtime_ns == modified_time
+  assert PuzzleDistanceTable.load(path).goal_state == goal_state
@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Iterator
+
+import pytest
+
+from puzzle_distance_table import PuzzleDistanceTable
+from puzzle_heuristic import PatternDatabaseHeuristic, PuzzleHeuristic, PuzzleHeuristicType, WalkingDistanceHeuristic
+from puzzle_problem import PuzzleProblem, PuzzleState
+
+def get_goal_state(rows: int, columns: int) -> list[list[int]]:
+  '''
+  Get the goal state with the tiles in order and the blank in the last cell.
+  '''
+  tiles = list(range(1, rows * columns)) + [0]
+
+  return [tiles[i:i+columns] for i in range(0, len(tiles), columns)]
+
+def test_walking_distance_up_to_max_cells():
+  goal_state = get_goal_state(4, 4)
+  heuristic = PuzzleHeuristic.create(PuzzleHeuristicType.WALKING_DISTANCE, goal_state)
+
+  assert heuristic.estimate(PuzzleProblem.encode_state(goal_state)) == 0
+
+def test_walking_distance_above_max_cells():
+  with pytest.raises(ValueError):
+    WalkingDistanceHeuristic(get_goal_state(5, 5))
+
+def test_default_patterns_by_board_size():
+  assert PatternDatabaseHeuristic.get_default_patterns(9) == [(1, 2, 3, 4), (5, 6, 7, 8)]
+  assert PatternDatabaseHeuristic.get_default_patterns(16) == [(1, 2, 3, 4, 5, 6), (7, 8, 9, 10, 11, 12), (13, 14, 15)]
+
+  with pytest.raises(ValueError):
+    PatternDatabaseHeuristic.get_default_patterns(25)
+
+def test_pattern_databases_not_built_during_search_on_large_boards(tmp_path):
+  with pytest.raises(ValueError):
+    PatternDatabaseHeuristic(get_goal_state(4, 4))
+
+  with pytest.raises(ValueError):
+    PatternDatabaseHeuristic.get_database_paths(get_goal_state(4, 4), str(tmp_path))
+
+def get_reachable_states(goal_state: list[list[int]]) -> Iterator[tuple[PuzzleState, int]]:
+  '''
+  Get every state that can reach the goal state, along with its blank index.
+  '''
+  problem = PuzzleProblem(goal_state, goal_state)
+  state = problem.encoded_goal_state
+  blank = PuzzleProblem.get_blank_index(state, problem.cells)
+  seen = {state}
+  queue = deque([(state, blank)])
+
+  while len(queue) > 0:
+    (state, blank) = queue.popleft()
+
+    yield (state, blank)
+
+    for (_, target) in problem.moves(blank):
+      (_, child_state) = problem.result(state, blank, target)
+
+      if (child_state not in seen):
+        seen.add(child_state)
+        queue.append((child_state, target))
+
+@pytest.mark.parametrize('heuristic_type', list(PuzzleHeuristicType))
+@pytest.mark.parametrize('rows, columns', [(2, 3), (3, 2)])
+def test_heuristics_are_admissible(heuristic_type, rows, columns):
+  goal_state = get_goal_state(rows, columns)
+  heuristic = PuzzleHeuristic.create(heuristic_type, goal_state)
+  table = PuzzleDistanceTable.build(goal_state)
+
+  for (state, _) in get_reachable_states(goal_state):
+    assert 0 <= heuristic.estimate(state) <= table.get_distance(state)
+
+  assert heuristic.estimate(PuzzleProblem.encode_state(goal_state)) == 0
+
+@pytest.mark.parametrize('heuristic_type', list(PuzzleHeuristicType))
+def test_heuristic_updates_match_estimates(heuristic_type):
+  goal_state = get_goal_state(2, 3)
+  problem = PuzzleProblem(goal_state, goal_state)
+  heuristic = PuzzleHeuristic.create(heuristic_type, goal_state)
+
+  for (state, blank) in get_reachable_states(goal_state):
+    cost_to_goal = heuristic.estimate(state)
+
+    for (_, target) in problem.moves(blank):
+      (_, child_state) = problem.result(state, blank, target)
+      tile = PuzzleProblem.get_tile(state, target, problem.tile_bits)
+      child_cost_to_goal = heuristic.update(cost_to_goal, child_state, tile, target, blank)
+
+      assert child_cost_to_goal == heuristic.estimate(child_state)
+      assert abs(child_cost_to_goal - cost_to_goal) <= 1
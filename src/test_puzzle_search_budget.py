@@ -0,0 +1,24 @@
+import time
+
+from puzzle_agent_result import PuzzleAgentFailureType
+from puzzle_search_budget import PuzzleSearchBudget
+
+def test_next_check():
+  assert PuzzleSearchBudget().get_next_check(0) == PuzzleSearchBudget.CHECK_INTERVAL
+  assert PuzzleSearchBudget(max_expanded_nodes=100).get_next_check(0) == 100
+  assert PuzzleSearchBudget(max_expanded_nodes=100).get_next_check(100) == 101
+  assert PuzzleSearchBudget(max_expanded_nodes=5000).get_next_check(1024) == 2048
+
+def test_check_within_limits():
+  budget = PuzzleSearchBudget(max_expanded_nodes=100, max_frontier_size=100, time_limit=60)
+
+  assert budget.check(time.perf_counter(), 99, 99) is None
+
+def test_check_exceeded_limits():
+  start_time = time.perf_counter()
+  failure = PuzzleSearchBudget(max_expanded_nodes=100).check(start_time, 100, 10)
+
+  assert failure.type == PuzzleAgentFailureType.BUDGET_EXCEEDED
+  assert (failure.expanded_nodes, failure.frontier_size, failure.limit) == (100, 10, 'expanded nodes')
+  assert PuzzleSearchBudget(max_frontier_size=10).check(start_time, 100, 10).limit == 'frontier size'
+  assert PuzzleSearchBudget(time_limit=1).check(start_time - 1, 100, 10).limit == 'time'
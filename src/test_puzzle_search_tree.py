@@ -0,0 +1,33 @@
+from puzzle_problem import PuzzleAction
+from puzzle_search_tree import PuzzleRankedSearchTree, PuzzleSearchTree
+
+def fill(tree: PuzzleSearchTree) -> None:
+  '''
+  Add a root state and a path of two states to the tree.
+  '''
+  tree.add(5, -1, None)
+  tree.add(7, 5, PuzzleAction.UP)
+  tree.add(3, 7, PuzzleAction.LEFT)
+
+def test_get_actions():
+  for tree in [PuzzleSearchTree(), PuzzleRankedSearchTree(6)]:
+    fill(tree)
+
+    assert len(tree) == 3
+    assert 7 in tree and 8 not in tree
+    assert tree.get_actions(3) == [PuzzleAction.UP, PuzzleAction.LEFT]
+    assert tree.get_actions(5) == []
+
+def test_closed_ranked_trees_reset_when_reused():
+  tree = PuzzleRankedSearchTree(6)
+  fill(tree)
+  tree.close()
+
+  reused_tree = PuzzleRankedSearchTree(6)
+
+  assert len(reused_tree) == 0
+  assert all(key not in reused_tree for key in (3, 5, 7))
+
+  reused_tree.add(3, -1, None)
+
+  assert reused_tree.get_actions(3) == []
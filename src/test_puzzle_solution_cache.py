@@ -0,0 +1,84 @@
+import pytest
+
+from puzzle_node import PuzzleNode
+from puzzle_problem import PuzzleAction, PuzzleProblem
+from puzzle_solution_cache import PuzzleSolutionCache
+from puzzle_symmetry import PuzzleSymmetry
+
+GOAL_STATE = [[1, 2, 3], [8, 0, 4], [7, 6, 5]]
+
+def get_problem(actions: list[PuzzleAction]) -> PuzzleProblem:
+  '''
+  Get the problem whose goal state is reached from the initial state by the actions.
+  '''
+  goal_problem = PuzzleProblem(GOAL_STATE, GOAL_STATE)
+  reversed_actions = [action.reverse() for action in reversed(actions)]
+  state = PuzzleNode.from_actions(goal_problem, reversed_actions).state
+
+  return PuzzleProblem(PuzzleProblem.decode_state(state, 3, 3), GOAL_STATE)
+
+def test_negative_max_size():
+  with pytest.raises(ValueError):
+    PuzzleSolutionCache(max_size=-1)
+
+def test_get_and_put():
+  cache = PuzzleSolutionCache()
+  actions = [PuzzleAction.UP, PuzzleAction.LEFT]
+  problem = get_problem(actions)
+
+  assert cache.get(problem, 'A*') is None
+
+  cache.put(problem, 'A*', actions)
+
+  assert cache.get(problem, 'A*') == actions
+  assert cache.get(problem, 'BFS') is None
+  assert (cache.hits, cache.misses) == (1, 2)
+
+def test_symmetric_problems_share_entry():
+  cache = PuzzleSolutionCache()
+  actions = [PuzzleAction.UP, PuzzleAction.LEFT, PuzzleAction.DOWN]
+  problem = get_problem(actions)
+  cache.put(problem, 'A*', actions)
+
+  for symmetry in PuzzleSymmetry.get_symmetries(GOAL_STATE):
+    image = PuzzleProblem(symmetry.apply(problem.initial_state), symmetry.apply(problem.goal_state))
+
+    assert cache.get(image, 'A*') == symmetry.apply_actions(actions)
+
+  assert len(cache) == 1
+
+def test_least_recently_used_solution_evicted():
+  cache = PuzzleSolutionCache(max_size=2)
+  solutions = [[PuzzleAction.UP], [PuzzleAction.UP, PuzzleAction.LEFT], [PuzzleAction.UP, PuzzleAction.LEFT, PuzzleAction.DOWN]]
+  problems = [get_problem(actions) for actions in solutions]
+  cache.put(problems[0], 'A*', solutions[0])
+  cache.put(problems[1], 'A*', solutions[1])
+  cache.get(problems[0], 'A*')
+  cache.put(problems[2], 'A*', solutions[2])
+
+  assert len(cache) == 2
+  assert cache.get(problems[0], 'A*') == solutions[0]
+  assert cache.get(problems[1], 'A*') is None
+  assert cache.get(problems[2], 'A*') == solutions[2]
+
+def test_zero_max_size_keeps_nothing_in_memory():
+  cache = PuzzleSolutionCache(max_size=0)
+  cache.put(get_problem([PuzzleAction.UP]), 'A*', [PuzzleAction.UP])
+
+  assert len(cache) == 0
+  assert cache.get(get_problem([PuzzleAction.UP]), 'A*') is None
+
+def test_database_survives_restarts(tmp_path):
+  path = str(tmp_path / 'solutions.db')
+  actions = [PuzzleAction.UP, PuzzleAction.LEFT]
+  problem = get_problem(actions)
+  PuzzleSolutionCache(path=path).put(problem, 'A*', actions)
+
+  cache = PuzzleSolutionCache(max_size=0, path=path)
+
+  assert cache.get(problem, 'A*') == actions
+  assert cache.get(problem, 'BFS') is None
+
+  cache.clear()
+
+  assert cache.get(problem, 'A*') == actions
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+
+import pytest
+
+from puzzle_agent import PuzzleAgent, PuzzleAgentType
+from puzzle_stream_solver import format_board, parse_board, parse_record, solve_stream
+
+GOAL_STATE = [[1, 2, 3], [8, 0, 4], [7, 6, 5]]
+
+def test_parse_and_format_board():
+  assert parse_board('1 2 3/8 0 4/7 6 5') == GOAL_STATE
+  assert format_board(GOAL_STATE) == '1 2 3/8 0 4/7 6 5'
+
+def test_parse_records():
+  (id, problem) = parse_record('{"id": "a", "initial": [[1, 2, 3], [8, 4, 0], [7, 6, 5]]}', GOAL_STATE)
+
+  assert id == 'a'
+  assert problem.goal_state == GOAL_STATE
+
+  (id, problem) = parse_record({'initial': '1 2/0 3', 'goal': '1 2/3 0'}, GOAL_STATE)
+
+  assert id is None
+  assert (problem.initial_state, problem.goal_state) == ([[1, 2], [0, 3]], [[1, 2], [3, 0]])
+
+def test_parse_empty_goal():
+  with pytest.raises(AssertionError):
+    parse_record('{"initial": [[1, 2, 3], [8, 4, 0], [7, 6, 5]], "goal": []}', GOAL_STATE)
+
+def test_solve_jsonl_stream():
+  input = io.StringIO('\n'.join([
+    json.dumps({'id': 'a', 'initial': [[1, 2, 3], [8, 4, 0], [7, 6, 5]]}),
+    '',
+    'not json',
+    json.dumps({'id': 'b', 'initial': [[1, 2, 3], [8, 0, 4], [7, 6, 5]]}),
+    json.dumps({'id': 'c', 'initial': [[2, 1, 3], [8, 0, 4], [7, 6, 5]]}),
+    json.dumps({'id': 'd', 'initial': [[1, 2, 3], [8, 0, 4], [7, 6, 9]]}),
+  ]) + '\n')
+  output = io.StringIO()
+  solve_stream(PuzzleAgent(PuzzleAgentType.INFORMED), input, output, 'jsonl', GOAL_STATE)
+  results = [json.loads(line) for line in output.getvalue().splitlines()]
+
+  assert [(result['line'], result['id'], result['status']) for result in results] == [
+    (1, 'a', 'solved'),
+    (3, None, 'invalid'),
+    (4, 'b', 'solved'),
+    (5, 'c', 'unsolvable'),
+    (6, 'd', 'invalid'),
+  ]
+  assert results[0]['moves'] == ['UP']
+  assert results[2]['moves'] == []
+
+def test_solve_csv_stream():
+  input = io.StringIO('id,initial,goal\na,1 2 3/8 4 0/7 6 5,\nb,1 2/0 3,1 2/3 0\nc,1 2/x 3,\n')
+  output = io.StringIO()
+  solve_stream(PuzzleAgent(PuzzleAgentType.INFORMED), input, output, 'csv', GOAL_STATE, workers=2)
+  results = list(csv.DictReader(io.StringIO(output.getvalue())))
+
+  assert [(result['line'], result['id'], result['status'], result['moves']) for result in results] == [
+    ('2', 'a', 'solved', 'UP'),
+    ('3', 'b', 'solved', 'DOWN'),
+    ('4', 'c', 'invalid', ''),
+  ]
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from puzzle_agent import PuzzleAgent, PuzzleAgentType
+from puzzle_node import PuzzleNode
+from puzzle_problem import PuzzleAction, PuzzleProblem
+from puzzle_symmetry import PuzzleSymmetry
+
+GOAL_STATE = [[1, 2, 3], [8, 0, 4], [7, 6, 5]]
+
+def solves(problem: PuzzleProblem, actions: list[PuzzleAction]) -> bool:
+  '''
+  Whether the actions lead from the initial state of the problem to its goal state.
+  '''
+  return PuzzleNode.from_actions(problem, actions).state == problem.encoded_goal_state
+
+def test_symmetries_by_board_shape():
+  assert len(PuzzleSymmetry.get_symmetries(GOAL_STATE)) == 8
+  assert len(PuzzleSymmetry.get_symmetries([[1, 2, 3], [4, 5, 0]])) == 4
+  assert len(PuzzleSymmetry.get_symmetries([[1, 2], [3, 4], [5, 0]])) == 4
+
+  for symmetry in PuzzleSymmetry.get_symmetries([[1, 2], [3, 4], [5, 0]]):
+    assert len(symmetry.apply([[1, 2], [3, 4], [5, 0]])) == 2
+
+@pytest.mark.parametrize('seed', range(5))
+def test_images_share_canonical_problem(seed):
+  random.seed(seed)
+  problem = PuzzleProblem(PuzzleProblem.generate_random_walk_state(GOAL_STATE, 20), GOAL_STATE)
+  (canonical_problem, _) = PuzzleSymmetry.canonicalize(problem)
+
+  for symmetry in PuzzleSymmetry.get_symmetries(GOAL_STATE):
+    image = PuzzleProblem(symmetry.apply(problem.initial_state), symmetry.apply(problem.goal_state))
+    (canonical_image, _) = PuzzleSymmetry.canonicalize(image)
+
+    assert canonical_image.encoded_initial_state == canonical_problem.encoded_initial_state
+    assert canonical_image.encoded_goal_state == canonical_problem.encoded_goal_state
+
+@pytest.mark.parametrize('seed', range(5))
+def test_canonical_solutions_restore_to_solutions(seed):
+  random.seed(seed)
+  problem = PuzzleProblem(PuzzleProblem.generate_random_walk_state(GOAL_STATE, 20), GOAL_STATE)
+  (canonical_problem, symmetry) = PuzzleSymmetry.canonicalize(problem)
+  agent = PuzzleAgent(PuzzleAgentType.INFORMED)
+  solution = agent.solve(problem)
+  canonical_solution = agent.solve(canonical_problem)
+
+  assert canonical_solution.node.path_cost == solution.node.path_cost
+  assert solves(problem, symmetry.restore_actions(canonical_solution.get_actions()))
+  assert solves(canonical_problem, symmetry.apply_actions(solution.get_actions()))
+
+def test_canonical_goal_only_depends_on_blank_cell():
+  (canonical_goal_state, _) = PuzzleSymmetry.canonicalize_goal(GOAL_STATE)
+  (other_canonical_goal_state, _) = PuzzleSymmetry.canonicalize_goal([[8, 6, 4], [1, 0, 5], [2, 3, 7]])
+
+  assert canonical_goal_state == other_canonical_goal_state
+  assert canonical_goal_state == [[1, 2, 3], [4, 0, 5], [6, 7, 8]]
+
+  (rectangle_goal_state, _) = PuzzleSymmetry.canonicalize_goal([[0, 2], [3, 4], [5, 1]])
+
+  assert len(rectangle_goal_state) == 2
+  assert sum(row.count(0) for row in rectangle_goal_state) == 1